@@ -1,15 +1,37 @@
+import itertools
+import os
+import re
 from http import HTTPStatus
+from typing import Any, Callable, Dict, Iterator
 
 from fastmcp import FastMCP
 from qiskit import QuantumCircuit, qasm2
 from starlette import requests, responses
 
+from src.app.services import cache_service
+
 mcp = FastMCP(name="qiskit-circuit-generator")
 
+# the parameterized tools' QASM is kept up to this many bytes in all, evicting the least recently used
+QASM_CACHE_BYTES = int(os.getenv("QASM_CACHE_BYTES", 64 * 2**20))
+# and larger QASM, of circuits big enough to be streamed, is not kept at all
+QASM_CACHE_MAX_ITEM_BYTES = int(os.getenv("QASM_CACHE_MAX_ITEM_BYTES", 256 * 2**10))
+
+qasm_cache = cache_service.LRUCache(maxweight=QASM_CACHE_BYTES, weigh=len)
+
+
+def cached_qasm(key: str, build: Callable[[], str]) -> str:
+    qasm = qasm_cache.get(key)
+    if qasm is None:
+        qasm = build()
+        if len(qasm) <= QASM_CACHE_MAX_ITEM_BYTES:
+            qasm_cache.put(key, qasm)
+    return qasm
+
 
 @mcp.custom_route(path="/health", methods=["GET"])
 async def health_check(_: requests.Request) -> responses.Response:
-    return responses.PlainTextResponse(HTTPStatus.OK)
+    return responses.PlainTextResponse(HTTPStatus.OK.phrase)
 
 
 @mcp.tool()
@@ -58,7 +80,7 @@ def deutsch_balanced() -> str:
     return qasm2.dumps(qc)
 
 
-@mcp.tool()
+@mcp.tool(meta={"qasm_stream": "/qasm/bernstein_vazirani"})
 def bernstein_vazirani(s: str = "0101") -> str:
     """
     Returns the OpenQASM 2.0 string representation of the Bernstein Vazirani, with an oracle function encoding a secret bitstring.
@@ -66,18 +88,48 @@ def bernstein_vazirani(s: str = "0101") -> str:
     Args:
         s: bit string secret
     """
+    return bernstein_vazirani_qasm(secret_bits(s))
+
+
+def secret_bits(s: Any) -> str:
+    s = str(s)
+    if not re.fullmatch(r"[01]+", s):
+        raise ValueError(f"s must be a non-empty string of 0s and 1s, not {s[:80]!r}")
+    return s
+
+
+def num_states(n: Any) -> int:
+    n = int(n)
+    if n < 1:
+        raise ValueError(f"n must be at least 1, not {n}")
+    return n
+
+
+def qasm_header(num_qubits: int, num_clbits: int) -> Iterator[str]:
+    # as written by qasm2.dumps
+    yield "OPENQASM 2.0;"
+    yield 'include "qelib1.inc";'
+    if num_qubits:
+        yield f"qreg q[{num_qubits}];"
+    if num_clbits:
+        yield f"creg c[{num_clbits}];"
+
+
+def bernstein_vazirani_qasm(s: str) -> str:
+    return cached_qasm(
+        f"bernstein_vazirani:{s}", lambda: "\n".join(bernstein_vazirani_statements(s))
+    )
+
+
+def bernstein_vazirani_statements(s: str) -> Iterator[str]:
     n = len(s)
-    qc = QuantumCircuit(n + 1, n)
-    qc.h(list(range(n + 1)))
-    qc.z(n)
+    yield from qasm_header(n + 1, n)
+    yield from (f"h q[{i}];" for i in range(n + 1))
+    yield f"z q[{n}];"
     # oracle
-    for i, c in enumerate(s):
-        if c == "1":
-            qc.cx(i, n)
-
-    qc.h(list(range(n)))
-    qc.measure(list(range(n)), list(range(n)))
-    return qasm2.dumps(qc)
+    yield from (f"cx q[{i}],q[{n}];" for i, c in enumerate(s) if c == "1")
+    yield from (f"h q[{i}];" for i in range(n))
+    yield from (f"measure q[{i}] -> c[{i}];" for i in range(n))
 
 
 @mcp.tool()
@@ -110,7 +162,7 @@ def three_qubit_bitflip_code() -> str:
     return qasm2.dumps(qc)
 
 
-@mcp.tool()
+@mcp.tool(meta={"qasm_stream": "/qasm/quantum_teleportation"})
 def quantum_teleportation(n: int = 1) -> str:
     """
     Returns the OpenQASM 2.0 string representation of a quantum teleportation scheme of n qubits
@@ -118,30 +170,72 @@ def quantum_teleportation(n: int = 1) -> str:
     Args:
         n: the number of quantum states to be transmitted
     """
-    qc = QuantumCircuit(3 * n, 3 * n)
+    return quantum_teleportation_qasm(num_states(n))
+
+
+def quantum_teleportation_qasm(n: int) -> str:
+    return cached_qasm(
+        f"quantum_teleportation:{n}",
+        lambda: "\n".join(quantum_teleportation_statements(n)),
+    )
+
+
+def quantum_teleportation_statements(n: int) -> Iterator[str]:
+    yield from qasm_header(3 * n, 3 * n)
+    alice, epr, bob = range(0, 3 * n, 3), range(1, 3 * n, 3), range(2, 3 * n, 3)
     # prepare EPR pairs
-    for i in range(n):
-        qc.h(1 + 3 * i)
-        qc.cx(1 + 3 * i, 2 + 3 * i)
+    yield from (f"h q[{i}];" for i in epr)
+    yield from (f"cx q[{i}],q[{j}];" for i, j in zip(epr, bob))
 
     # Alice state encoding
-    for i in range(n):
-        qc.cx(0 + 3 * i, 1 + 3 * i)
-        qc.h(0 + 3 * i)
+    yield from (f"cx q[{i}],q[{j}];" for i, j in zip(alice, epr))
+    yield from (f"h q[{i}];" for i in alice)
 
     # Bob state recovery
-    for i in range(n):
-        qc.cx(1 + 3 * i, 2 + 3 * i)
-        qc.cz(0 + 3 * i, 2 + 3 * i)
+    yield from (f"cx q[{i}],q[{j}];" for i, j in zip(epr, bob))
+    yield from (f"cz q[{i}],q[{j}];" for i, j in zip(alice, bob))
 
-    for i in range(n):
-        # Alice measurements, deferred - https://en.wikipedia.org/wiki/Deferred_measurement_principle
-        qc.measure(0 + 3 * i, 0 + 3 * i)
-        qc.measure(1 + 3 * i, 1 + 3 * i)
-        # Bob measurement
-        qc.measure(2 + 3 * i, 2 + 3 * i)
+    # Alice measurements, deferred - https://en.wikipedia.org/wiki/Deferred_measurement_principle, then Bob's
+    yield from (f"measure q[{i}] -> c[{i}];" for i in range(3 * n))
 
-    return qasm2.dumps(qc)
+
+# the parameterized tools' QASM, one statement at a time, for streaming; the args are checked before the first one
+QASM_STATEMENTS: Dict[str, Callable[..., Iterator[str]]] = {
+    "bernstein_vazirani": lambda s="0101": bernstein_vazirani_statements(
+        secret_bits(s)
+    ),
+    "quantum_teleportation": lambda n=1: quantum_teleportation_statements(
+        num_states(n)
+    ),
+}
+
+
+def qasm_chunks(statements: Iterator[str], size: int = 4096) -> Iterator[str]:
+    """
+    Joins `statements` like the tools do, `size` statements at a time.
+    """
+    separator = ""
+    while batch := list(itertools.islice(statements, size)):
+        yield separator + "\n".join(batch)
+        separator = "\n"
+
+
+@mcp.custom_route(path="/qasm/{name}", methods=["POST"])
+async def stream_qasm(request: requests.Request) -> responses.Response:
+    """
+    Streams a parameterized tool's QASM, taking the tool's args as a JSON object, so that neither side holds the whole
+    string of a very large circuit.
+    """
+    name = request.path_params["name"]
+    if name not in QASM_STATEMENTS:
+        return responses.PlainTextResponse(
+            HTTPStatus.NOT_FOUND.phrase, status_code=HTTPStatus.NOT_FOUND
+        )
+    try:
+        statements = QASM_STATEMENTS[name](**await request.json())
+    except (TypeError, ValueError) as e:
+        return responses.PlainTextResponse(str(e), status_code=HTTPStatus.BAD_REQUEST)
+    return responses.StreamingResponse(qasm_chunks(statements), media_type="text/plain")
 
 
 if __name__ == "__main__":
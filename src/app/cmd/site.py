@@ -1,21 +1,109 @@
 import asyncio
+import contextlib
+import dataclasses
+import os
 from datetime import timedelta
-from typing import Any, Coroutine
-from uuid import uuid4
+from typing import Any, Coroutine, List, Optional, Set, cast, get_args
 
-from fasthtml.common import fast_app, serve, Meta, Titled, Div
+from fasthtml.common import (
+    fast_app,
+    serve,
+    sse_message,
+    EventStream,
+    Meta,
+    Script,
+    Titled,
+    Div,
+)
 from temporalio.client import (
     WorkflowHandle,
-    WorkflowExecutionStatus,
-    WorkflowFailureError,
+    WorkflowUpdateFailedError,
+)
+from temporalio.common import (
+    RetryPolicy,
+    WorkflowIDConflictPolicy,
+    WorkflowIDReusePolicy,
 )
-from temporalio.common import RetryPolicy
-from temporalio.service import RPCError
+from temporalio.service import RPCError, RPCStatusCode
 
-from src.app.services import temporal_service
+from src.app.services import (
+    blob_service,
+    cache_service,
+    llm_service,
+    temporal_service,
+)
 from src.app.site import components
 from src.app.temporal import models, constants, workflow
 
+
+STATUS_MESSAGES = {
+    "list_tools": "Getting available MCP tools",
+    "choose_tool": "Picking the best tool",
+    "use_tool": "Generating OpenQASM",
+    "plan_and_generate": "Picking a tool and generating OpenQASM",
+    "verify_qasm": "Checking correctness",
+    "generate_diagram": "Drawing your QuantumCircuit",
+    "simulate": "Running simulation",
+    "render": "Drawing and simulating your QuantumCircuit",
+}
+
+QASM_PREVIEW_BYTES = 64 * 2**10
+
+# the outputs of recently completed jobs, which identical requests are answered with until they are this many seconds old
+results = cache_service.LRUCache(
+    maxsize=256, ttl=float(os.getenv("RESULT_TTL_SECONDS", 300))
+)
+
+
+@dataclasses.dataclass
+class JobState:
+    """
+    What the site knows of a job, kept current by its watcher so that polls are answered without calling Temporal.
+    """
+
+    # "running", "done" or "failed"
+    status: str = "running"
+    steps: List[str] = dataclasses.field(default_factory=list)
+    message: str = "Thinking..."
+    # set and replaced on every update
+    changed: asyncio.Event = dataclasses.field(default_factory=asyncio.Event)
+    watcher: Optional[asyncio.Task] = None
+
+    def update(self, step: str = "", status: str = "") -> None:
+        if step:
+            self.steps.append(step)
+            if step in STATUS_MESSAGES:
+                self.message = f"{STATUS_MESSAGES[step]}...!"
+        self.status = status or self.status
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+
+# the state of recent jobs; a job evicted while running is watched again on its next poll
+jobs = cache_service.LRUCache(maxsize=1024)
+# the running watchers, which the event loop itself holds only weakly
+watchers: Set[asyncio.Task] = set()
+
+
+def request_job_id(input: models.DAQWorkflowInput) -> str:
+    """
+    The workflow ID of a job, which is the same for every request with the same options and the same prompt up to case,
+    compatibility forms and whitespace, so that identical requests share one workflow run.
+    """
+    request = dataclasses.asdict(input) | {
+        "prompt": llm_service.normalize_prompt(input.prompt)
+    }
+    return f"{constants.WORKFLOW_KEY}-{cache_service.content_key(request)[:32]}"
+
+
+@contextlib.asynccontextmanager
+async def lifespan(_: Any):
+    yield
+    for watcher in watchers:
+        watcher.cancel()
+    temporal_service.TemporalService.forget_all()
+
+
 app, _ = fast_app(
     htmlkw={"lang": "en"},
     hdrs=(
@@ -24,9 +112,11 @@ app, _ = fast_app(
             name="description",
             content="Resilient quantum circuit generation with Qiskit, Temporal, Google GenAI, and FastMCP",
         ),
+        Script(src="https://cdn.jsdelivr.net/npm/htmx-ext-sse@2.2.2/sse.js"),
     ),
     static_path="src/app/site/static/",
     live=False,
+    lifespan=lifespan,
 )
 app: Any
 
@@ -45,58 +135,150 @@ def get_index() -> Any:
 
 
 @app.post("/generate")
-async def post_generate(prompt: str, mock: bool = False) -> Any:
-    client = await temporal_service.TemporalService().connect()
+async def post_generate(
+    prompt: str,
+    mock: bool = False,
+    diagram_format: str = "png",
+    plot_format: str = "png",
+    diagram: bool = False,
+    simulation: bool = False,
+) -> Any:
+    if diagram_format not in get_args(models.DiagramFormat) or (
+        plot_format not in get_args(models.PlotFormat)
+    ):
+        return components.failed_result()
+
+    input = models.DAQWorkflowInput(
+        prompt=prompt,
+        mock=mock,
+        cached_tools=True,
+        speculative_render=True,
+        diagram_format=cast(models.DiagramFormat, diagram_format),
+        plot_format=cast(models.PlotFormat, plot_format),
+        # unchecked checkboxes are left out of the form data
+        want_diagram=diagram,
+        want_simulation=simulation,
+        plan_and_generate=True,
+    )
+    job_id = request_job_id(input)
+    output = results.get(job_id)
+    if output is not None:
+        return components.circuit_result(output)
+
+    client = await temporal_service.TemporalService().shared_client()
 
     coro: Coroutine[
         None, None, WorkflowHandle[workflow.DAQWorkflow, models.DAQWorkflowOutput]
     ] = client.start_workflow(
         workflow.DAQWorkflow.run,
-        args=[models.DAQWorkflowInput(prompt=prompt, mock=mock)],
-        id=f"{constants.WORKFLOW_KEY}-{uuid4()}",
+        args=[input],
+        id=job_id,
+        # an identical request attaches to the run in flight, and once it has finished starts another
+        id_conflict_policy=WorkflowIDConflictPolicy.USE_EXISTING,
+        id_reuse_policy=WorkflowIDReusePolicy.ALLOW_DUPLICATE,
         task_queue=constants.TASK_QUEUE,
-        execution_timeout=timedelta(seconds=30),
+        # outlasts the worst case: both plan_and_generate attempts (2 x 45s), then verify_qasm (10s) and the renders (5s)
+        execution_timeout=timedelta(minutes=2),
         retry_policy=RetryPolicy(maximum_attempts=1),
     )
     handle = await asyncio.create_task(coro)
+    watch(handle.id, started=True)
+
+    return components.streaming_progress(
+        job_id=handle.id, step_description="Thinking..."
+    )
+
 
-    return components.polling_progress(job_id=handle.id, step_description="Thinking...")
+async def watch_job(job_id: str, job: JobState) -> None:
+    """
+    Follows a job's steps as the workflow pushes them, then fetches its output once into `results`.
+    """
+    service = temporal_service.TemporalService()
+    handle = (await service.shared_client()).get_workflow_handle(workflow_id=job_id)
+
+    step = ""
+    while step != "done":
+        try:
+            step = await handle.execute_update("wait_for_step", step, result_type=str)
+        except (RPCError, WorkflowUpdateFailedError):
+            # the workflow finished, failed, or is unreachable; fetching its result tells which
+            break
+        job.update(step=step)
+
+    try:
+        workflow_output = await handle.result()
+        # the QASM of a very large circuit is left in the blob store, so show only its beginning
+        workflow_output["qasm"] = blob_service.preview(
+            workflow_output["qasm"], QASM_PREVIEW_BYTES
+        )
+    except Exception as e:
+        if isinstance(e, RPCError) and e.status == RPCStatusCode.UNAVAILABLE:
+            service.invalidate()
+        job.update(status="failed")
+        return
+    results.put(job_id, workflow_output)
+    job.update(status="done")
+
+
+def watch(job_id: str, started: bool = False) -> JobState:
+    """
+    Returns the job's state, starting the one watcher that keeps it current unless one is already running. A job just
+    `started` again after finishing is a new workflow run, and a finished job whose output has left `results` is
+    fetched again, so both start from a new state.
+    """
+    job = jobs.get(job_id)
+    if (
+        job is None
+        or (started and job.status != "running")
+        or (job.status == "done" and results.get(job_id) is None)
+    ):
+        job = JobState()
+        jobs.put(job_id, job)
+    if job.status == "running" and (job.watcher is None or job.watcher.done()):
+        job.watcher = asyncio.create_task(watch_job(job_id, job))
+        watchers.add(job.watcher)
+        job.watcher.add_done_callback(watchers.discard)
+    return job
 
 
 @app.get("/job/{job_id}")
 async def get_job(job_id: str) -> Any:
-    client = await temporal_service.TemporalService().connect()
-    handle = client.get_workflow_handle(workflow_id=job_id)
+    # served from memory, without calling Temporal
+    output = results.get(job_id)
+    if output is not None:
+        return components.circuit_result(output)
 
-    try:
-        description = await handle.describe()
-    except RPCError:
+    job = watch(job_id)
+    if job.status != "running":
         return components.failed_result()
+    return components.polling_progress(job_id=job_id, step_description=job.message)
 
-    status_message = {
-        "list_tools": "Getting available MCP tools",
-        "choose_tool": "Picking the best tool",
-        "use_tool": "Generating OpenQASM",
-        "verify_qasm": "Checking correctness",
-        "generate_diagram": "Drawing your QuantumCircuit",
-        "simulate": "Running simulation",
-    }
 
-    if description.status == WorkflowExecutionStatus.FAILED:
-        return components.failed_result()
-    elif description.status == WorkflowExecutionStatus.RUNNING:
-        pending = description.raw_description.pending_activities
-        loading_text = status_message[pending[0].activity_type.name] if pending else ""
-        return components.polling_progress(
-            job_id=job_id, step_description=f"{loading_text}...!"
-        )
+@app.get("/job/{job_id}/events")
+async def get_job_events(job_id: str) -> Any:
+    job = watch(job_id)
 
-    try:
-        workflow_output = await handle.result()
-    except WorkflowFailureError | Exception:
-        return components.failed_result()
+    async def step_changes():
+        sent = 0
+        while True:
+            # read the steps and the next change together, so that no step is missed in between
+            steps, changed = job.steps[sent:], job.changed
+            for step in steps:
+                if step in STATUS_MESSAGES:
+                    yield sse_message(
+                        components.progress_status(f"{STATUS_MESSAGES[step]}...!"),
+                        event="step",
+                    )
+            sent += len(steps)
+            # the workflow's last step comes before its output is in `results`, so wait for the watcher to finish
+            if job.status != "running":
+                break
+            await changed.wait()
+
+        # /job/{job_id} renders the output or the failure
+        yield sse_message(Div(), event="done")
 
-    return components.circuit_result(workflow_output)
+    return EventStream(step_changes())
 
 
 if __name__ == "__main__":
@@ -1,34 +1,181 @@
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from datetime import timedelta
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 
-from temporalio.worker import Worker, workflow_sandbox
+from temporalio.client import Client
+from temporalio.worker import SharedStateManager, Worker, workflow_sandbox
 
-from src.app.services import temporal_service
+from src.app.services import (
+    artifact_service,
+    blob_service,
+    llm_service,
+    mcp_service,
+    qiskit_service,
+    temporal_service,
+    verify_service,
+)
 from src.app.temporal import activities, constants, workflow
 
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# heartbeats are sent to the server at most this often, the rest only once the interval has passed
+HEARTBEAT_THROTTLE_INTERVAL = timedelta(seconds=1)
+
+CPU_ACTIVITIES = [
+    activities.generate_diagram,
+    activities.simulate,
+    activities.simulate_batch,
+]
+
+
+def warm_up() -> None:
+    """
+    Imports and exercises Qiskit and Matplotlib once, so that a new process does not pay for it on its first activity,
+    and stores the artifacts of the tools that take no args.
+    """
+    artifact_service.artifact_store.warm()
+
+
+def cache_stats() -> dict:
+    """
+    The stats of this process's caches, keyed by cache.
+    """
+    return {
+        "circuits": qiskit_service.circuit_cache.stats(),
+        "transpiled": qiskit_service.transpiled_cache.stats(),
+        "distributions": qiskit_service.distribution_cache.stats(),
+        "artifacts": artifact_service.artifact_store.stats(),
+        "routes": llm_service.routing_cache.stats(),
+        # not a cache, but how often the structural check spares verify_qasm the LLM is read the same way
+        "verifier": verify_service.VerifyService.stats(),
+    }
+
+
+def log_cache_stats() -> None:
+    logger.info("cache stats of process %d: %s", os.getpid(), cache_stats())
+
+
+async def log_stats(interval: float = 10 * 60) -> None:
+    """
+    Logs the cache stats of the worker process every `interval` seconds.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        log_cache_stats()
+
+
+def start_cpu_process(stats_interval: float = 10 * 60) -> None:
+    """
+    Warms up a CPU activity process, then logs its cache stats every `stats_interval` seconds, as its caches are its
+    own and not the worker process's.
+    """
+    logging.basicConfig(level=logging.ERROR)
+    warm_up()
+
+    def log_every_interval() -> None:
+        while True:
+            time.sleep(stats_interval)
+            log_cache_stats()
+
+    threading.Thread(target=log_every_interval, daemon=True).start()
+
+
+def cpu_activity_executor(kind: str, processes: int) -> Executor:
+    if kind == "thread":
+        return ThreadPoolExecutor(max_workers=processes)
+    # forking the multi-threaded worker process may deadlock, so start clean processes instead
+    executor = ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=start_cpu_process,
+    )
+    # start every process now rather than on the first activities
+    for future in [executor.submit(int) for _ in range(processes)]:
+        future.result()
+    return executor
+
+
+def cpu_worker(
+    client: Client, task_queue: str, executor: Executor, max_concurrent_activities: int
+) -> Worker:
+    """
+    A worker for CPU-bound activities only, taking at most one activity per executor slot so that tasks are not left
+    queued behind the executor until they time out.
+    """
+    return Worker(
+        client,
+        task_queue=task_queue,
+        activities=CPU_ACTIVITIES,
+        activity_executor=executor,
+        max_concurrent_activities=max_concurrent_activities,
+        shared_state_manager=(
+            # the manager runs in a process of its own, which is spawned for the same reason as the executor's
+            SharedStateManager.create_from_multiprocessing(
+                multiprocessing.get_context("spawn").Manager()
+            )
+            if isinstance(executor, ProcessPoolExecutor)
+            else None
+        ),
+    )
+
+
+async def sweep_blobs(interval: float = 60 * 60) -> None:
+    """
+    Deletes the blobs past their retention period every `interval` seconds.
+    """
+    store = blob_service.default_blob_store()
+    while True:
+        await asyncio.to_thread(store.sweep)
+        await asyncio.sleep(interval)
+
 
 async def start():
     client = await temporal_service.TemporalService().connect()
+    # use_tool runs in this process, and so do the CPU-bound activities on a thread pool
+    warm_up()
+    processes = int(os.getenv("CPU_ACTIVITY_PROCESSES", os.cpu_count() or 1))
+    executor = cpu_activity_executor(
+        os.getenv("CPU_ACTIVITY_EXECUTOR", "process"), processes
+    )
     worker = Worker(
         client,
         task_queue=constants.TASK_QUEUE,
-        workflows=[workflow.DAQWorkflow],
+        workflows=[workflow.DAQWorkflow, workflow.DAQBatchWorkflow],
         activities=[
             activities.list_tools,
             activities.choose_tool,
             activities.use_tool,
+            activities.plan_and_generate,
             activities.verify_qasm,
-            activities.generate_diagram,
-            activities.simulate,
+            # still scheduled here by workflows started before the CPU task queue
+            *CPU_ACTIVITIES,
         ],
         activity_executor=ThreadPoolExecutor(),
+        # plan_and_generate heartbeats only once per step, and a retry resumes from the last one the server recorded
+        max_heartbeat_throttle_interval=HEARTBEAT_THROTTLE_INTERVAL,
         workflow_runner=workflow_sandbox.SandboxedWorkflowRunner(
             restrictions=workflow_sandbox.SandboxedWorkflowRunner.restrictions.with_passthrough_modules(
                 "beartype"
             )
         ),
     )
-    await worker.run()
+    try:
+        await asyncio.gather(
+            worker.run(),
+            cpu_worker(client, constants.CPU_TASK_QUEUE, executor, processes).run(),
+            sweep_blobs(),
+            log_stats(),
+        )
+    finally:
+        executor.shutdown(cancel_futures=True)
+        await mcp_service.close_pools()
+        await llm_service.close_clients()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,84 @@
+import os
+from typing import Any, Callable, Dict
+
+from src.app.services import cache_service, qiskit_service, verify_service
+
+
+def tool_key(name: str, args: Dict[str, Any], mock: bool, revision: int = 0) -> str:
+    return cache_service.content_key("qasm", name, args, mock, revision)
+
+
+def diagram_key(
+    qasm: str, output_format: str, service: qiskit_service.QiskitService
+) -> str:
+    return cache_service.content_key(
+        "diagram",
+        qiskit_service.canonical_qasm(qasm),
+        output_format,
+        service.dpi,
+        service.diagram_width,
+    )
+
+
+def plot_key(
+    qasm: str, output_format: str, service: qiskit_service.QiskitService
+) -> str:
+    return cache_service.content_key(
+        "plot",
+        qiskit_service.canonical_qasm(qasm),
+        output_format,
+        service.dpi,
+        service.plot_size,
+    )
+
+
+class ArtifactStore:
+    """
+    A worker-local, content-addressed store of the artifacts fixed by their inputs: the QASM a tool returns for its
+    args, and the diagram and mock-seeded histogram rendered from a QASM string.
+    """
+
+    cache: cache_service.LRUCache
+
+    def __init__(self, maxweight: float = float("inf")) -> None:
+        self.cache = cache_service.LRUCache(maxweight=maxweight, weigh=len)
+
+    def get(self, key: str) -> str | None:
+        return self.cache.get(key)
+
+    def put(self, key: str, artifact: str) -> None:
+        self.cache.put(key, artifact)
+
+    def fetch(self, key: str, create: Callable[[], str]) -> str:
+        """
+        Returns the artifact stored under `key`, creating and storing it first if there is none.
+        """
+        artifact = self.cache.get(key)
+        if artifact is None:
+            artifact = create()
+            self.cache.put(key, artifact)
+        return artifact
+
+    def warm(self) -> None:
+        """
+        Stores the QASM of every tool that takes no args, along with its default diagram and mock histogram.
+        """
+        service = qiskit_service.QiskitService(mock=True)
+        for name, tool in verify_service.TOOLS.items():
+            if tool.parameters.get("properties"):
+                continue
+            qasm = self.fetch(tool_key(name, {}, mock=False), tool.fn)
+            qc = qiskit_service.circuit(qasm)
+            self.fetch(diagram_key(qasm, "png", service), lambda: service.draw(qc))
+            self.fetch(
+                plot_key(qasm, "png", service),
+                lambda: service.plot(service.run_qasm(qasm)),
+            )
+
+    def stats(self) -> dict:
+        return self.cache.stats()
+
+
+artifact_store = ArtifactStore(
+    maxweight=int(os.getenv("ARTIFACT_STORE_BYTES", 64 * 2**20))
+)
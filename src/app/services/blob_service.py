@@ -0,0 +1,254 @@
+import contextlib
+import functools
+import hashlib
+import os
+import re
+import tempfile
+import time
+from typing import Any, AsyncIterable, AsyncIterator, BinaryIO, Iterator, Tuple
+
+BLOB_PREFIX = "blob:"
+
+# text longer than this is spilled to the blob store rather than passed around whole
+SPILL_THRESHOLD = int(os.getenv("BLOB_SPILL_BYTES", 256 * 2**10))
+
+# blobs unused for longer than this are deleted; workflow histories refer to blobs until the namespace's retention
+# period (24h by default) has passed since the workflow closed, so this must be longer than that plus the longest run
+RETENTION_SECONDS = int(os.getenv("BLOB_RETENTION_SECONDS", 25 * 60 * 60))
+
+
+def is_ref(text: str) -> bool:
+    return text.startswith(BLOB_PREFIX)
+
+
+def digest(ref: str) -> str:
+    digest = ref.removeprefix(BLOB_PREFIX)
+    if not is_ref(ref) or not re.fullmatch(r"[0-9a-f]{64}", digest):
+        raise ValueError(f"Not a blob reference: {ref[:80]}")
+    return digest
+
+
+class BlobStore:
+    """
+    A content-addressed store of blobs as files under `root`, shared by every process that can see the directory.
+    Blobs are referred to as `blob:<sha256>`, and storing the same content twice keeps one copy. A blob's modification
+    time is when it was last stored or touched, and `sweep` deletes those older than the retention period.
+    """
+
+    root: str
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, ref: str) -> str:
+        return os.path.join(self.root, digest(ref))
+
+    def put(self, data: bytes) -> str:
+        ref = BLOB_PREFIX + hashlib.sha256(data).hexdigest()
+        if not self.touch(ref):
+            with self._temporary_file() as (file, temporary):
+                file.write(data)
+            os.replace(temporary, self.path(ref))
+        return ref
+
+    async def put_stream(self, chunks: AsyncIterable[bytes]) -> str:
+        """
+        Stores the concatenated `chunks`, writing each to disk as it arrives.
+        """
+        sha = hashlib.sha256()
+        with self._temporary_file() as (file, temporary):
+            async for chunk in chunks:
+                sha.update(chunk)
+                file.write(chunk)
+        ref = BLOB_PREFIX + sha.hexdigest()
+        os.replace(temporary, self.path(ref))
+        return ref
+
+    def get(self, ref: str) -> bytes:
+        with open(self.path(ref), "rb") as file:
+            return file.read()
+
+    def read(self, ref: str, size: int) -> bytes:
+        with open(self.path(ref), "rb") as file:
+            return file.read(size)
+
+    def size(self, ref: str) -> int:
+        return os.path.getsize(self.path(ref))
+
+    def touch(self, ref: str) -> bool:
+        """
+        Restarts the retention period of the blob `ref`, returning whether it is still stored.
+        """
+        try:
+            os.utime(self.path(ref))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def sweep(self, max_age: float = RETENTION_SECONDS) -> int:
+        """
+        Deletes the blobs, and the temporary files of abandoned writes, not stored or touched in the last `max_age`
+        seconds, returning how many were deleted.
+        """
+        cutoff, deleted = time.time() - max_age, 0
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file() and entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+                        deleted += 1
+                except FileNotFoundError:
+                    # deleted by another process sweeping the same directory
+                    pass
+        return deleted
+
+    @contextlib.contextmanager
+    def _temporary_file(self) -> Iterator[Tuple[BinaryIO, str]]:
+        # blobs are written to a temporary file and renamed into place, so that readers never see a partial blob
+        fd, temporary = tempfile.mkstemp(dir=self.root, prefix=".")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                yield file, temporary
+        except BaseException:
+            os.remove(temporary)
+            raise
+
+
+class S3BlobStore:
+    """
+    The same store as `BlobStore`, with each blob an object under `prefix` in an S3-compatible bucket. `client` is a
+    boto3 S3 client, or anything with its put_object, get_object, head_object and copy_object methods.
+
+    Blobs are deleted by a lifecycle rule on the bucket rather than by `sweep`, expiring the objects under `prefix` a
+    day after the retention period, as S3 expires objects in whole days since they were last written:
+
+        {"Rules": [{"ID": "daq-blobs", "Status": "Enabled", "Filter": {"Prefix": "daq/"}, "Expiration": {"Days": 2}}]}
+
+    Storing or touching a blob again writes its object again, which restarts its expiration.
+    """
+
+    client: Any
+    bucket: str
+    prefix: str
+
+    def __init__(self, client: Any, bucket: str, prefix: str = "") -> None:
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def key(self, ref: str) -> str:
+        return self.prefix + digest(ref)
+
+    def put(self, data: bytes) -> str:
+        ref = BLOB_PREFIX + hashlib.sha256(data).hexdigest()
+        if not self.touch(ref):
+            self.client.put_object(Bucket=self.bucket, Key=self.key(ref), Body=data)
+        return ref
+
+    async def put_stream(self, chunks: AsyncIterable[bytes]) -> str:
+        # an object's key is the digest of its content, so the chunks are staged on disk until every one has arrived
+        sha = hashlib.sha256()
+        with tempfile.TemporaryFile() as file:
+            async for chunk in chunks:
+                sha.update(chunk)
+                file.write(chunk)
+            ref = BLOB_PREFIX + sha.hexdigest()
+            if not self.touch(ref):
+                file.seek(0)
+                self.client.put_object(Bucket=self.bucket, Key=self.key(ref), Body=file)
+        return ref
+
+    def get(self, ref: str) -> bytes:
+        return self._get(ref)
+
+    def read(self, ref: str, size: int) -> bytes:
+        return self._get(ref, Range=f"bytes=0-{size - 1}") if size > 0 else b""
+
+    def size(self, ref: str) -> int:
+        return self.client.head_object(Bucket=self.bucket, Key=self.key(ref))[
+            "ContentLength"
+        ]
+
+    def touch(self, ref: str) -> bool:
+        # copying an object onto itself, which S3 only allows when replacing its metadata, makes it a new object
+        try:
+            self.client.copy_object(
+                Bucket=self.bucket,
+                Key=self.key(ref),
+                CopySource={"Bucket": self.bucket, "Key": self.key(ref)},
+                MetadataDirective="REPLACE",
+            )
+        except self.client.exceptions.ClientError:
+            return False
+        return True
+
+    def sweep(self, max_age: float = RETENTION_SECONDS) -> int:
+        # the bucket's lifecycle rule expires the blobs
+        return 0
+
+    def _get(self, ref: str, **kwargs: Any) -> bytes:
+        return self.client.get_object(Bucket=self.bucket, Key=self.key(ref), **kwargs)[
+            "Body"
+        ].read()
+
+
+@functools.cache
+def default_blob_store() -> BlobStore | S3BlobStore:
+    """
+    The blob store shared by the workers and the site: the bucket `BLOB_STORE_BUCKET` if set, at `BLOB_STORE_ENDPOINT`
+    for S3-compatible stores other than S3, otherwise the directory `BLOB_STORE_PATH`.
+    """
+    bucket = os.getenv("BLOB_STORE_BUCKET")
+    if bucket:
+        # boto3 is only needed, and so only installed, where the blob store is a bucket
+        import boto3  # pyrefly: ignore[missing-import]
+
+        client = boto3.client("s3", endpoint_url=os.getenv("BLOB_STORE_ENDPOINT"))
+        return S3BlobStore(client, bucket, os.getenv("BLOB_STORE_PREFIX", "daq/"))
+    return BlobStore(
+        os.getenv("BLOB_STORE_PATH", os.path.join(tempfile.gettempdir(), "daq-blobs"))
+    )
+
+
+async def spill(chunks: AsyncIterator[str], threshold: int = SPILL_THRESHOLD) -> str:
+    """
+    Collects the text from `chunks`, returning it as is up to `threshold` bytes. Longer text is written to the blob
+    store as it arrives and a reference to it returned instead, so that it is never held in memory whole.
+    """
+    buffered, size = [], 0
+    async for chunk in chunks:
+        buffered.append(chunk.encode())
+        size += len(buffered[-1])
+        if size > threshold:
+
+            async def rest() -> AsyncIterator[bytes]:
+                for data in buffered:
+                    yield data
+                buffered.clear()
+                async for chunk in chunks:
+                    yield chunk.encode()
+
+            return await default_blob_store().put_stream(rest())
+    return b"".join(buffered).decode()
+
+
+def resolve(text: str) -> str:
+    """
+    Returns the text `text` refers to if it is a blob reference, otherwise `text` itself.
+    """
+    if not is_ref(text):
+        return text
+    return default_blob_store().get(text).decode()
+
+
+def preview(text: str, size: int) -> str:
+    """
+    Like `resolve`, but reads no more than `size` bytes of a blob, noting how much was left out.
+    """
+    if not is_ref(text):
+        return text
+    store = default_blob_store()
+    head = store.read(text, size).decode(errors="ignore")
+    remaining = store.size(text) - size
+    return head + f"\n// ... {remaining} more bytes" if remaining > 0 else head
@@ -0,0 +1,176 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Protocol
+
+
+def content_key(*parts: Any) -> str:
+    """
+    A stable SHA-256 key for JSON-serializable `parts`.
+    """
+    return hashlib.sha256(
+        json.dumps(parts, sort_keys=True, separators=(",", ":")).encode()
+    ).hexdigest()
+
+
+class Cache(Protocol):
+    def get(self, key: str) -> Any | None: ...
+
+    def put(self, key: str, value: Any) -> None: ...
+
+    def stats(self) -> dict: ...
+
+
+class LRUCache:
+    """
+    A thread-safe in-memory cache holding at most `maxsize` entries, evicting the least recently used. With a `weigh`
+    function, entries are also evicted once their total weight exceeds `maxweight`, and with a `ttl`, once they are
+    `ttl` seconds old.
+    """
+
+    maxsize: int
+    maxweight: float
+    weigh: Callable[[Any], float] | None
+    ttl: float
+    weight: float
+    hits: int
+    misses: int
+    evictions: int
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        maxweight: float = float("inf"),
+        weigh: Callable[[Any], float] | None = None,
+        ttl: float = float("inf"),
+    ) -> None:
+        self.maxsize = maxsize
+        self.maxweight = maxweight
+        self.weigh = weigh
+        self.ttl = ttl
+        self._entries: OrderedDict[str, Any] = OrderedDict()
+        self._weights: dict[str, float] = {}
+        self._expires: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.weight = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            if key in self._entries and self._expires[key] <= time.monotonic():
+                self._remove(key)
+                self.evictions += 1
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key: str, value: Any) -> None:
+        weight = self.weigh(value) if self.weigh is not None else 0
+        with self._lock:
+            self.weight += weight - self._weights.get(key, 0)
+            self._entries[key] = value
+            self._weights[key] = weight
+            self._expires[key] = time.monotonic() + self.ttl
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize or (
+                self.weight > self.maxweight and len(self._entries) > 1
+            ):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._weights.clear()
+            self._expires.clear()
+            self.weight = 0
+
+    def _remove(self, key: str) -> None:
+        del self._entries[key]
+        del self._expires[key]
+        self.weight -= self._weights.pop(key)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "weight": self.weight,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class SQLiteCache:
+    """
+    A JSON value cache in an SQLite file, shared by every process that opens the same `path`. Beyond `maxsize` rows
+    the oldest writes are evicted.
+    """
+
+    path: str
+    maxsize: int
+    hits: int
+    misses: int
+
+    def __init__(self, path: str, maxsize: int = 100_000) -> None:
+        self.path = path
+        self.maxsize = maxsize
+        self._local = threading.local()
+        self.hits = self.misses = 0
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+            )
+
+    def get(self, key: str) -> Any | None:
+        row = (
+            self._connection()
+            .execute("SELECT value FROM cache WHERE key = ?", (key,))
+            .fetchone()
+        )
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Any) -> None:
+        with self._connection() as connection:
+            # replacing a key moves it to the newest rowid
+            connection.execute(
+                "INSERT OR REPLACE INTO cache (key, value) VALUES (?, ?)",
+                (key, json.dumps(value)),
+            )
+            connection.execute(
+                "DELETE FROM cache WHERE rowid <= (SELECT MAX(rowid) FROM cache) - ?",
+                (self.maxsize,),
+            )
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        (size,) = self._connection().execute("SELECT COUNT(*) FROM cache").fetchone()
+        return {
+            "size": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections may not be shared across threads, so keep one per thread
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
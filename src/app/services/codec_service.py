@@ -0,0 +1,191 @@
+import asyncio
+import dataclasses
+import os
+import zlib
+from typing import Any, List, Sequence
+
+from temporalio import converter
+from temporalio.api.common.v1 import Payload, Payloads
+
+from src.app.services import blob_service
+
+CLAIM_CHECK_ENCODING = b"binary/claim-check"
+ZLIB_ENCODING = b"binary/zlib"
+
+# payloads larger than this are compressed, which mostly pays off for the JSON of tool schemas, QASM and SVGs
+COMPRESSION_THRESHOLD = int(os.getenv("COMPRESSION_BYTES", 2**10))
+
+# payloads larger than this are left in the blob store, and only a reference to them is written to workflow history
+CLAIM_CHECK_THRESHOLD = int(os.getenv("CLAIM_CHECK_BYTES", 2 * 2**10))
+
+
+class BinaryFieldsPayloadConverter(converter.EncodingPayloadConverter):
+    """
+    Encodes a dataclass with `bytes` fields, such as the diagram and histogram of a DAQWorkflowOutput, as the JSON of
+    its other fields followed by the bytes as they are, rather than as JSON arrays of numbers.
+    """
+
+    json: converter.JSONPlainPayloadConverter
+
+    def __init__(self) -> None:
+        self.json = converter.JSONPlainPayloadConverter()
+
+    @property
+    def encoding(self) -> str:
+        return "binary/dataclass-fields"
+
+    def to_payload(self, value: Any) -> Payload | None:
+        if not dataclasses.is_dataclass(value) or isinstance(value, type):
+            return None
+        binary = {
+            field.name: getattr(value, field.name)
+            for field in dataclasses.fields(value)
+            if isinstance(getattr(value, field.name), bytes)
+        }
+        if not binary:
+            return None
+        # the JSON of the dataclass, with its bytes fields left empty
+        rest = self.json.to_payload(dataclasses.replace(value, **dict.fromkeys(binary)))
+        if rest is None:
+            return None
+        parts = [rest] + [
+            Payload(metadata={"field": name.encode()}, data=data)
+            for name, data in binary.items()
+        ]
+        return Payload(
+            metadata={"encoding": self.encoding.encode()},
+            data=Payloads(payloads=parts).SerializeToString(),
+        )
+
+    def from_payload(self, payload: Payload, type_hint: type | None = None) -> Any:
+        rest, *binary = Payloads.FromString(payload.data).payloads
+        value = self.json.from_payload(rest, type_hint)
+        for part in binary:
+            if isinstance(value, dict):
+                value[part.metadata["field"].decode()] = part.data
+            else:
+                setattr(value, part.metadata["field"].decode(), part.data)
+        return value
+
+
+class PayloadConverter(converter.CompositePayloadConverter):
+    """
+    The default payload converter, with dataclasses that have `bytes` fields encoded by BinaryFieldsPayloadConverter.
+    """
+
+    def __init__(self) -> None:
+        *default, json = (
+            converter.DefaultPayloadConverter.default_encoding_payload_converters
+        )
+        # the JSON converter stays last, as it raises on the values it cannot encode
+        super().__init__(*default, BinaryFieldsPayloadConverter(), json)
+
+
+class CompressionCodec(converter.PayloadCodec):
+    """
+    Compresses each payload over `threshold` bytes with zlib, where that makes it smaller.
+    """
+
+    threshold: int
+    level: int
+
+    def __init__(self, threshold: int = COMPRESSION_THRESHOLD, level: int = 1) -> None:
+        self.threshold = threshold
+        self.level = level
+
+    async def encode(self, payloads: Sequence[Payload]) -> List[Payload]:
+        return [await self._encode(payload) for payload in payloads]
+
+    async def decode(self, payloads: Sequence[Payload]) -> List[Payload]:
+        return [await self._decode(payload) for payload in payloads]
+
+    async def _encode(self, payload: Payload) -> Payload:
+        if payload.ByteSize() <= self.threshold:
+            return payload
+        data = await asyncio.to_thread(
+            zlib.compress, payload.SerializeToString(), self.level
+        )
+        if len(data) >= payload.ByteSize():
+            return payload
+        return Payload(metadata={"encoding": ZLIB_ENCODING}, data=data)
+
+    async def _decode(self, payload: Payload) -> Payload:
+        if payload.metadata.get("encoding") != ZLIB_ENCODING:
+            return payload
+        return Payload.FromString(
+            await asyncio.to_thread(zlib.decompress, payload.data)
+        )
+
+
+class CodecChain(converter.PayloadCodec):
+    """
+    Encodes with each of `codecs` in turn, and decodes with them in reverse.
+    """
+
+    codecs: List[converter.PayloadCodec]
+
+    def __init__(self, *codecs: converter.PayloadCodec) -> None:
+        self.codecs = list(codecs)
+
+    async def encode(self, payloads: Sequence[Payload]) -> List[Payload]:
+        for codec in self.codecs:
+            payloads = await codec.encode(payloads)
+        return list(payloads)
+
+    async def decode(self, payloads: Sequence[Payload]) -> List[Payload]:
+        for codec in reversed(self.codecs):
+            payloads = await codec.decode(payloads)
+        return list(payloads)
+
+
+class ClaimCheckCodec(converter.PayloadCodec):
+    """
+    Replaces each payload over `threshold` bytes with a reference to it in the blob store, so that workflow histories
+    hold references rather than the QASM, diagrams and plots themselves. The store is content-addressed, so a payload
+    written several times, such as an activity's input on each retry, is stored once. Payloads without a reference,
+    such as those of workflows started before the codec, decode as they are.
+    """
+
+    threshold: int
+
+    def __init__(self, threshold: int = CLAIM_CHECK_THRESHOLD) -> None:
+        self.threshold = threshold
+
+    async def encode(self, payloads: Sequence[Payload]) -> List[Payload]:
+        return [await self._encode(payload) for payload in payloads]
+
+    async def decode(self, payloads: Sequence[Payload]) -> List[Payload]:
+        return [await self._decode(payload) for payload in payloads]
+
+    async def _encode(self, payload: Payload) -> Payload:
+        if payload.ByteSize() <= self.threshold:
+            return payload
+        ref = await asyncio.to_thread(
+            blob_service.default_blob_store().put, payload.SerializeToString()
+        )
+        return Payload(metadata={"encoding": CLAIM_CHECK_ENCODING}, data=ref.encode())
+
+    async def _decode(self, payload: Payload) -> Payload:
+        if payload.metadata.get("encoding") != CLAIM_CHECK_ENCODING:
+            return payload
+        data = await asyncio.to_thread(
+            blob_service.default_blob_store().get, payload.data.decode()
+        )
+        return Payload.FromString(data)
+
+
+def data_converter(
+    claim_check_threshold: int = CLAIM_CHECK_THRESHOLD,
+    compression_threshold: int = COMPRESSION_THRESHOLD,
+) -> converter.DataConverter:
+    """
+    The data converter every client of the workflows must share: bytes fields are kept binary, and large payloads are
+    compressed and then, if still large, claim-checked.
+    """
+    return converter.DataConverter(
+        payload_converter_class=PayloadConverter,
+        payload_codec=CodecChain(
+            CompressionCodec(compression_threshold),
+            ClaimCheckCodec(claim_check_threshold),
+        ),
+    )
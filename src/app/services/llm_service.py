@@ -1,9 +1,20 @@
+import asyncio
+import functools
 import os
-from typing import Optional, List, Tuple
+import re
+import time
+import unicodedata
+import weakref
+import zlib
+from collections import OrderedDict
+from typing import Optional, List, Tuple, Dict, NamedTuple, Set
 
+import numpy as np
 from dotenv import load_dotenv
 from google import genai
 
+from src.app.services import cache_service, qiskit_service
+
 
 def genai_tool_from(mcp_tool: dict) -> genai.types.Tool:
     return genai.types.Tool(
@@ -17,31 +28,266 @@ def genai_tool_from(mcp_tool: dict) -> genai.types.Tool:
     )
 
 
+NUMBER_WORDS = frozenset(
+    "zero one two three four five six seven eight nine ten eleven twelve thirteen fourteen fifteen sixteen "
+    "seventeen eighteen nineteen twenty".split()
+)
+
+# filler words dropped before vectorizing, so that polite rewordings of a prompt score as identical
+STOP_WORDS = frozenset(
+    "a an the of to for me please with using that this and in on my i can you some show give".split()
+)
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Folds case, compatibility forms and whitespace, keeping every letter and symbol, so that only prompts that differ
+    in those respects share a key.
+    """
+    return " ".join(unicodedata.normalize("NFKC", prompt).casefold().split())
+
+
+def prompt_words(key: str) -> List[str]:
+    return re.findall(r"\w+", key)
+
+
+class Route(NamedTuple):
+    name: str
+    args: dict
+    row: int
+    # numbers and bitstrings in the prompt, which must match exactly for a similar prompt to reuse the route
+    literals: frozenset[str]
+
+
+class RoutingCache:
+    """
+    Remembers which function call the LLM routed a prompt to. Lookups try the normalized prompt first, then the most
+    similar cached prompt by cosine similarity of hashed character trigram vectors, accepted above `threshold`.
+    Least recently used routes are evicted beyond `maxsize`. Routes are put once their QASM passes verification, and
+    evicted if it fails.
+    """
+
+    maxsize: int
+    threshold: float
+    dimensions: int
+    exact_hits: int
+    similar_hits: int
+    misses: int
+    lookup_seconds: float
+
+    def __init__(
+        self, maxsize: int = 1024, threshold: float = 0.9, dimensions: int = 2048
+    ) -> None:
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self.dimensions = dimensions
+        self._routes: OrderedDict[str, Route] = OrderedDict()
+        self._vectors = np.zeros((maxsize, dimensions), dtype=np.float32)
+        self._row_keys: List[str | None] = [None] * maxsize
+        # rows of evicted routes, reused before new rows are taken
+        self._free_rows: List[int] = []
+        self.exact_hits = self.similar_hits = self.misses = 0
+        self.lookup_seconds = 0.0
+
+    def get(
+        self, prompt: str, tool_names: Set[str]
+    ) -> Optional[genai.types.FunctionCall]:
+        start = time.perf_counter()
+        key = normalize_prompt(prompt)
+        route = self._routes.get(key)
+
+        if route is not None and route.name in tool_names:
+            self.exact_hits += 1
+        else:
+            route = self._similar(key, tool_names)
+            if route is not None:
+                self.similar_hits += 1
+            else:
+                self.misses += 1
+
+        if route is not None:
+            self._routes.move_to_end(self._row_keys[route.row] or key)
+        self.lookup_seconds += time.perf_counter() - start
+
+        if route is None:
+            return None
+        return genai.types.FunctionCall(name=route.name, args=dict(route.args))
+
+    def put(self, prompt: str, function_call: genai.types.FunctionCall) -> None:
+        if not function_call.name:
+            return
+        key = normalize_prompt(prompt)
+
+        if key in self._routes:
+            row = self._routes.pop(key).row
+        elif self._free_rows:
+            row = self._free_rows.pop()
+        elif len(self._routes) < self.maxsize:
+            row = len(self._routes)
+        else:
+            _, evicted = self._routes.popitem(last=False)
+            row = evicted.row
+
+        self._vectors[row] = self._vectorize(key)
+        self._row_keys[row] = key
+        self._routes[key] = Route(
+            name=function_call.name,
+            args=dict(function_call.args or {}),
+            row=row,
+            literals=self._literals(key),
+        )
+
+    def evict(self, prompt: str, function_call: genai.types.FunctionCall) -> None:
+        """
+        Forgets the route `get` would return for `prompt` if it is `function_call`, such as one that failed verification.
+        """
+        key = normalize_prompt(prompt)
+        route = self._routes.get(key) or self._similar(key, {function_call.name or ""})
+        if (
+            route is None
+            or route.name != function_call.name
+            or route.args != dict(function_call.args or {})
+        ):
+            return
+        self._routes.pop(self._row_keys[route.row] or key)
+        self._vectors[route.row] = 0
+        self._row_keys[route.row] = None
+        self._free_rows.append(route.row)
+
+    def stats(self) -> dict:
+        lookups = self.exact_hits + self.similar_hits + self.misses
+        return {
+            "size": len(self._routes),
+            "exact_hits": self.exact_hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "hit_rate": (self.exact_hits + self.similar_hits) / lookups
+            if lookups
+            else 0.0,
+            "mean_lookup_ms": self.lookup_seconds / lookups * 1000 if lookups else 0.0,
+        }
+
+    def _similar(self, key: str, tool_names: Set[str]) -> Optional[Route]:
+        if not self._routes:
+            return None
+
+        rows = len(self._routes) + len(self._free_rows)
+        scores = self._vectors[:rows] @ self._vectorize(key)
+        literals = self._literals(key)
+        for row in np.argsort(scores)[::-1]:
+            if scores[row] < self.threshold:
+                break
+            row_key = self._row_keys[row]
+            if row_key is None:
+                continue
+            route = self._routes[row_key]
+            if route.literals == literals and route.name in tool_names:
+                return route
+        return None
+
+    def _vectorize(self, key: str) -> np.ndarray:
+        padded = f" {' '.join(w for w in prompt_words(key) if w not in STOP_WORDS)} "
+        indices = [
+            zlib.crc32(padded[i : i + 3].encode()) % self.dimensions
+            for i in range(len(padded) - 2)
+        ]
+        vector = np.bincount(indices, minlength=self.dimensions).astype(np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    @staticmethod
+    def _literals(key: str) -> frozenset[str]:
+        return frozenset(
+            token
+            for token in prompt_words(key)
+            if token.isdigit() or token in NUMBER_WORDS
+        )
+
+
+routing_cache = RoutingCache()
+
+
+@functools.cache
+def load_env() -> None:
+    load_dotenv()
+
+
+@functools.cache
+def default_verdict_cache() -> cache_service.Cache:
+    """
+    Shares accepted verdicts across worker processes through SQLite when `VERDICT_CACHE_PATH` is set, otherwise keeps
+    them in memory.
+    """
+    load_env()
+    path = os.getenv("VERDICT_CACHE_PATH")
+    return cache_service.SQLiteCache(path) if path else cache_service.LRUCache()
+
+
+# clients are per event loop, as their async HTTP connection pools cannot be shared across loops
+_clients: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, Dict[str, genai.Client]
+] = weakref.WeakKeyDictionary()
+
+
+def shared_client(api_key: str) -> genai.Client:
+    """
+    Returns a process-wide client for `api_key`, keeping its HTTP connections alive across calls.
+    """
+    clients = _clients.setdefault(asyncio.get_running_loop(), {})
+    if api_key not in clients:
+        clients[api_key] = genai.Client(api_key=api_key)
+    return clients[api_key]
+
+
+async def close_clients() -> None:
+    for genai_client in _clients.pop(asyncio.get_running_loop(), {}).values():
+        await genai_client.aio.aclose()
+        genai_client.close()
+
+
 class LLMService:
     api_key: str
     model: str
     model_temperature: float
     mock: bool
+    routing_cache: Optional[RoutingCache]
+    verdict_cache: cache_service.Cache
 
     def __init__(
         self,
         model: str = "gemini-3-flash-preview",
         model_temperature: float = 0.5,
         mock: bool = False,
+        routing_cache: Optional[RoutingCache] = routing_cache,
+        verdict_cache: Optional[cache_service.Cache] = None,
     ) -> None:
-        load_dotenv()
+        load_env()
         self.api_key = os.getenv("GOOGLE_API_KEY", "")
         assert self.api_key, "`GOOGLE_API_KEY` is a required environment variable"
         self.model = model
         self.model_temperature = model_temperature
         self.mock = mock
+        self.routing_cache = routing_cache
+        self.verdict_cache = (
+            verdict_cache if verdict_cache is not None else default_verdict_cache()
+        )
 
     async def choose_tool(
-        self, prompt: str, available_tools: List[dict]
+        self,
+        prompt: str,
+        available_tools: List[dict],
+        genai_tools: Optional[List[genai.types.Tool]] = None,
     ) -> Optional[list[genai.types.FunctionCall]]:
         if self.mock:
             return [genai.types.FunctionCall(args={}, name="bell_state")]
 
+        if self.routing_cache is not None:
+            cached = self.routing_cache.get(
+                prompt, tool_names={t["name"] for t in available_tools}
+            )
+            if cached is not None:
+                return [cached]
+
         system_instruction = """\
 You are a specialized router for Quantum Computing algorithms.
 Your sole task is to map the user's request to the single most appropriate tool from the provided list.
@@ -53,25 +299,20 @@ RULES:
 4. Ensure the tool arguments match the types defined in the tool schema.
 """
 
-        with (
-            genai.Client(  # pyrefly: ignore[bad-context-manager] # false positive within dependency
-                api_key=self.api_key
-            ) as genai_client
-        ):
-            response = await genai_client.aio.models.generate_content(
-                model=self.model,
-                contents=genai.types.Part.from_text(text=prompt),
-                config=genai.types.GenerateContentConfig(
-                    system_instruction=system_instruction,
-                    tools=[genai_tool_from(t) for t in available_tools],
-                    tool_config=genai.types.ToolConfig(
-                        function_calling_config=genai.types.FunctionCallingConfig(
-                            mode=genai.types.FunctionCallingConfigMode.AUTO
-                        ),
+        response = await shared_client(self.api_key).aio.models.generate_content(
+            model=self.model,
+            contents=genai.types.Part.from_text(text=prompt),
+            config=genai.types.GenerateContentConfig(
+                system_instruction=system_instruction,
+                tools=genai_tools or [genai_tool_from(t) for t in available_tools],
+                tool_config=genai.types.ToolConfig(
+                    function_calling_config=genai.types.FunctionCallingConfig(
+                        mode=genai.types.FunctionCallingConfigMode.AUTO
                     ),
-                    temperature=self.model_temperature,
                 ),
-            )
+                temperature=self.model_temperature,
+            ),
+        )
 
         return response.function_calls
 
@@ -81,6 +322,17 @@ RULES:
         if self.mock:
             return True, ""
 
+        verdict_key = cache_service.content_key(
+            "verdict",
+            normalize_prompt(user_prompt),
+            qiskit_service.canonical_qasm(tool_output),
+            self.model,
+            self.model_temperature,
+        )
+        cached_text = self.verdict_cache.get(verdict_key)
+        if cached_text is not None:
+            return True, cached_text
+
         system_instruction = """\
 You are an expert Quantum Computing Verification Assistant. 
 Your sole task is to verify if the provided OpenQASM code matches the user's requirements.
@@ -107,19 +359,19 @@ QASM OUTPUT:
 ```
 """
 
-        with (
-            genai.Client(  # pyrefly: ignore[bad-context-manager] # false positive within dependency
-                api_key=self.api_key
-            ) as genai_client
-        ):
-            response = await genai_client.aio.models.generate_content(
-                model=self.model,
-                contents=genai.types.Part.from_text(text=validation_input),
-                config=genai.types.GenerateContentConfig(
-                    response_schema=genai.types.Schema(type=genai.types.Type.BOOLEAN),
-                    system_instruction=system_instruction,
-                    temperature=self.model_temperature,
-                ),
-            )
+        response = await shared_client(self.api_key).aio.models.generate_content(
+            model=self.model,
+            contents=genai.types.Part.from_text(text=validation_input),
+            config=genai.types.GenerateContentConfig(
+                response_schema=genai.types.Schema(type=genai.types.Type.BOOLEAN),
+                system_instruction=system_instruction,
+                temperature=self.model_temperature,
+            ),
+        )
+
+        is_valid = bool(response.parsed)
+        if is_valid:
+            # rejections are not cached, so that a retry gets a fresh verdict
+            self.verdict_cache.put(verdict_key, response.text)
 
-        return bool(response.parsed), response.text
+        return is_valid, response.text
@@ -1,10 +1,220 @@
-from typing import List, Any
+import asyncio
+import contextlib
+import time
+import weakref
+from typing import List, Any, AsyncIterator, Awaitable, Callable, Dict
 
-from fastmcp import Client as FastMCPClient
-from fastmcp.client import client
+import httpx
+from fastmcp import Client as FastMCPClient, FastMCP
+from fastmcp.client import client, messages
+from google import genai
 from mcp import types as mcp_types
 
 from src.app.cmd.mcp import bell_state
+from src.app.services import llm_service
+
+
+class ToolCatalog:
+    """
+    A worker-local copy of an MCP server's tool list, along with the GenAI declarations converted from it. `revision`
+    is bumped whenever the server reports or returns a changed list, so anything cached against the old tools can be
+    told apart.
+    """
+
+    ttl: float
+    revision: int
+
+    def __init__(self, ttl: float = 300) -> None:
+        self.ttl = ttl
+        self.revision = 0
+        self._tools: List[mcp_types.Tool] = []
+        self._tool_dicts: List[dict] = []
+        self._genai_tools: List[genai.types.Tool] | None = None
+        self._expires_at = 0.0
+
+    @property
+    def tools(self) -> List[mcp_types.Tool]:
+        return self._tools
+
+    @property
+    def tool_dicts(self) -> List[dict]:
+        # the same shape Temporal serializes `mcp_types.Tool` to
+        return self._tool_dicts
+
+    @property
+    def genai_tools(self) -> List[genai.types.Tool]:
+        if self._genai_tools is None:
+            self._genai_tools = [
+                llm_service.genai_tool_from(t) for t in self._tool_dicts
+            ]
+        return self._genai_tools
+
+    def qasm_stream(self, name: str) -> str | None:
+        """
+        The path the server streams the tool's QASM from, if it advertises one.
+        """
+        for tool in self._tools:
+            if tool.name == name:
+                return (tool.meta or {}).get("qasm_stream")
+        return None
+
+    def is_fresh(self) -> bool:
+        return time.monotonic() < self._expires_at
+
+    def update(self, tools: List[mcp_types.Tool]) -> None:
+        tool_dicts = [t.model_dump() for t in tools]
+        if self._tool_dicts and tool_dicts != self._tool_dicts:
+            self.revision += 1
+        self._tools = tools
+        self._tool_dicts = tool_dicts
+        self._genai_tools = None
+        self._expires_at = time.monotonic() + self.ttl
+
+    def invalidate(self) -> None:
+        self._expires_at = 0.0
+        self.revision += 1
+
+
+class ToolListChangedHandler(messages.MessageHandler):
+    catalog: ToolCatalog
+
+    def __init__(self, catalog: ToolCatalog) -> None:
+        self.catalog = catalog
+
+    async def on_tool_list_changed(
+        self, message: mcp_types.ToolListChangedNotification
+    ) -> None:
+        self.catalog.invalidate()
+
+
+class MCPClientPool:
+    """
+    A long-lived, reconnecting MCP session shared by every caller on one event loop. Calls are multiplexed over the
+    session, bounded by `max_concurrency`, and the session is closed after `idle_timeout` seconds without use.
+    """
+
+    server: str | FastMCP
+    max_concurrency: int
+    idle_timeout: float
+    message_handler: messages.MessageHandler | None
+
+    def __init__(
+        self,
+        server: str | FastMCP,
+        max_concurrency: int = 16,
+        idle_timeout: float = 60,
+        message_handler: messages.MessageHandler | None = None,
+    ) -> None:
+        self.server = server
+        self.max_concurrency = max_concurrency
+        self.idle_timeout = idle_timeout
+        self.message_handler = message_handler
+        self._client: FastMCPClient | None = None
+        self._lock = asyncio.Lock()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._in_use = 0
+        self._idle_handle: asyncio.TimerHandle | None = None
+
+    @contextlib.asynccontextmanager
+    async def session(self) -> AsyncIterator[FastMCPClient]:
+        async with self._semaphore:
+            self._in_use += 1
+            if self._idle_handle is not None:
+                self._idle_handle.cancel()
+                self._idle_handle = None
+            try:
+                yield await self._connected_client()
+            finally:
+                self._in_use -= 1
+                if not self._in_use:
+                    self._idle_handle = asyncio.get_running_loop().call_later(
+                        self.idle_timeout,
+                        lambda: asyncio.ensure_future(self._close_if_idle()),
+                    )
+
+    async def run[T](self, call: Callable[[FastMCPClient], Awaitable[T]]) -> T:
+        """
+        Runs `call(client)` on the shared session, reconnecting and retrying once if the session was lost.
+        """
+        async with self.session() as fastmcp_client:
+            try:
+                return await call(fastmcp_client)
+            except Exception:
+                if fastmcp_client.is_connected():
+                    raise
+                await self._reset(fastmcp_client)
+
+        async with self.session() as fastmcp_client:
+            return await call(fastmcp_client)
+
+    def is_connected(self) -> bool:
+        return self._client is not None and self._client.is_connected()
+
+    async def close(self) -> None:
+        if self._idle_handle is not None:
+            self._idle_handle.cancel()
+            self._idle_handle = None
+        if self._client is not None:
+            fastmcp_client, self._client = self._client, None
+            await fastmcp_client.close()
+
+    async def _connected_client(self) -> FastMCPClient:
+        async with self._lock:
+            if self._client is not None and not self._client.is_connected():
+                await self._reset(self._client)
+            if self._client is None:
+                fastmcp_client = FastMCPClient(
+                    self.server, message_handler=self.message_handler
+                )
+                # hold the session open between calls; released by close()
+                await fastmcp_client.__aenter__()
+                self._client = fastmcp_client
+            return self._client
+
+    async def _reset(self, stale: FastMCPClient) -> None:
+        if self._client is stale:
+            self._client = None
+            with contextlib.suppress(Exception):
+                await stale.close()
+
+    async def _close_if_idle(self) -> None:
+        if not self._in_use:
+            await self.close()
+
+
+_catalogs: Dict[str, ToolCatalog] = {}
+
+
+def stream_client() -> httpx.AsyncClient:
+    # streamed responses may pause while the server generates the next chunk
+    return httpx.AsyncClient(timeout=httpx.Timeout(30))
+
+
+# pools are per event loop, as asyncio primitives cannot be shared across loops
+_pools: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, Dict[str, MCPClientPool]
+] = weakref.WeakKeyDictionary()
+
+
+def tool_catalog(server_addr: str) -> ToolCatalog:
+    if server_addr not in _catalogs:
+        _catalogs[server_addr] = ToolCatalog()
+    return _catalogs[server_addr]
+
+
+def client_pool(server_addr: str) -> MCPClientPool:
+    pools = _pools.setdefault(asyncio.get_running_loop(), {})
+    if server_addr not in pools:
+        pools[server_addr] = MCPClientPool(
+            server_addr,
+            message_handler=ToolListChangedHandler(tool_catalog(server_addr)),
+        )
+    return pools[server_addr]
+
+
+async def close_pools() -> None:
+    for pool in _pools.pop(asyncio.get_running_loop(), {}).values():
+        await pool.close()
 
 
 class MCPService:
@@ -17,11 +227,23 @@ class MCPService:
         self.server_addr = server_addr
         self.mock = mock
 
-    async def get_available_tools(self) -> List[mcp_types.Tool]:
+    async def get_tool_catalog(self) -> ToolCatalog:
         if self.mock:
-            return [bell_state.to_mcp_tool()]
-        async with FastMCPClient(self.server_addr) as fastmcp_client:
-            return await fastmcp_client.list_tools()
+            catalog = ToolCatalog()
+            catalog.update([bell_state.to_mcp_tool()])
+            return catalog
+
+        catalog = tool_catalog(self.server_addr)
+        if not catalog.is_fresh():
+            catalog.update(
+                await client_pool(self.server_addr).run(
+                    lambda fastmcp_client: fastmcp_client.list_tools()
+                )
+            )
+        return catalog
+
+    async def get_available_tools(self) -> List[mcp_types.Tool]:
+        return (await self.get_tool_catalog()).tools
 
     async def call_tool(self, name: str, args: dict[str, Any]) -> client.CallToolResult:
         if self.mock:
@@ -32,5 +254,19 @@ class MCPService:
                 structured_content={},
                 meta={},
             )
-        async with FastMCPClient(self.server_addr) as fastmcp_client:
-            return await fastmcp_client.call_tool(name=name, arguments=args)
+        return await client_pool(self.server_addr).run(
+            lambda fastmcp_client: fastmcp_client.call_tool(name=name, arguments=args)
+        )
+
+    async def stream_tool(self, path: str, args: dict[str, Any]) -> AsyncIterator[str]:
+        """
+        Streams the text of a tool's result from `path` on the MCP server, as advertised by `ToolCatalog.qasm_stream`.
+        """
+        url = httpx.URL(self.server_addr).copy_with(path=path)
+        async with (
+            stream_client() as http_client,
+            http_client.stream("POST", url, json=args) as response,
+        ):
+            response.raise_for_status()
+            async for chunk in response.aiter_text():
+                yield chunk
@@ -1,53 +1,526 @@
 import base64
+import hashlib
 import io
+import json
+import os
+import pickle
+import re
+import threading
+from typing import Dict, List, Optional, Tuple, cast
 
-from matplotlib import figure, pyplot as plt  # pyrefly: ignore[untyped-import]
+import numpy as np
+
+from matplotlib import (  # pyrefly: ignore[untyped-import]
+    rcParams,
+    axes,
+    figure,
+    lines,
+    patches,
+    text,
+    ticker,
+)
+from matplotlib.backends import backend_agg  # pyrefly: ignore[untyped-import]
 from qiskit import QuantumCircuit, transpile
+from qiskit.circuit import ControlledGate, Gate
+from qiskit.circuit.exceptions import CircuitError
+from qiskit.exceptions import QiskitError
 from qiskit.providers import basic_provider
-from qiskit.visualization import plot_histogram
+from qiskit.quantum_info import StabilizerState
+from qiskit.result import Result
+
+from src.app.services import cache_service
+
+
+def canonical_qasm(qasm: str) -> str:
+    """
+    Strips comments, blank lines, and insignificant whitespace, so that equivalent QASM strings compare equal.
+    """
+    lines = (
+        re.sub(r"\s+", " ", line.split("//")[0]).strip() for line in qasm.splitlines()
+    )
+    return "\n".join(line for line in lines if line)
+
+
+def qasm_key(qasm: str) -> str:
+    return hashlib.sha256(qasm.encode()).hexdigest()
+
+
+def circuit_size(qc: QuantumCircuit) -> int:
+    """
+    Approximates the memory held by `qc` by its pickled size.
+    """
+    return len(pickle.dumps(qc))
+
+
+# worker-local caches bounded by the approximate bytes they hold; cached circuits are shared and must not be mutated
+circuit_cache = cache_service.LRUCache(
+    maxweight=int(os.getenv("CIRCUIT_CACHE_BYTES", 32 * 2**20)), weigh=circuit_size
+)
+transpiled_cache = cache_service.LRUCache(
+    maxweight=int(os.getenv("CIRCUIT_CACHE_BYTES", 32 * 2**20)), weigh=circuit_size
+)
+
+
+def circuit(qasm: str) -> QuantumCircuit:
+    """
+    Parses `qasm`, reusing the circuit parsed from an identical string earlier.
+    """
+    key = qasm_key(qasm)
+    qc = circuit_cache.get(key)
+    if qc is None:
+        qc = QuantumCircuit.from_qasm_str(qasm)
+        circuit_cache.put(key, qc)
+    return qc
+
+
+# beyond this the statevector outgrows memory, and BasicSimulator refuses the circuit anyway
+MAX_STATEVECTOR_QUBITS = 24
+
+# the outcomes of one independent subsystem: the clbits it writes, the bits each outcome writes to them in that order,
+# and the outcomes' probabilities
+type Factor = Tuple[np.ndarray, np.ndarray, np.ndarray]
+# the outcome distribution of a circuit, as its number of clbits and the independent factors it is the product of
+type Distribution = Tuple[int, List[Factor]]
+
+# subsystems this small are quicker to simulate as dense statevectors, even when they are Clifford
+MAX_SMALL_SUBSYSTEM_QUBITS = 12
+# a stabilizer subsystem with more random outcome bits than this has too many outcomes to list
+MAX_RANDOM_OUTCOME_BITS = 20
+
+distribution_cache = cache_service.LRUCache(
+    maxweight=int(os.getenv("CIRCUIT_CACHE_BYTES", 32 * 2**20)),
+    weigh=lambda d: sum(array.nbytes for factor in d[1] for array in factor),
+)
+
+
+def terminal_measurements(qc: QuantumCircuit) -> Optional[Dict[int, int]]:
+    """
+    Maps each measured qubit to its clbit, if every measurement follows all the gates on its qubit and writes a
+    distinct clbit, and the circuit has nothing but gates, barriers and measurements.
+    """
+    measured: Dict[int, int] = {}
+    for instruction in qc.data:
+        name = instruction.operation.name
+        if name == "barrier":
+            continue
+        qubits = [qc.find_bit(qubit).index for qubit in instruction.qubits]
+        if any(qubit in measured for qubit in qubits):
+            return None
+        if name == "measure":
+            clbit = qc.find_bit(instruction.clbits[0]).index
+            if clbit in measured.values():
+                return None
+            measured[qubits[0]] = clbit
+        elif not isinstance(instruction.operation, Gate) or instruction.clbits:
+            return None
+    return measured
+
+
+def apply_gate(psi: np.ndarray, matrix: np.ndarray, axes: List[int]) -> None:
+    """
+    Applies `matrix` in place to `axes` of the state tensor `psi`, listed like the matrix's qubits, most significant
+    first. Diagonal gates, X and single-qubit gates avoid the copies of a general tensor contraction.
+    """
+    k = len(axes)
+    diagonal = np.diagonal(matrix)
+    if np.count_nonzero(matrix) == np.count_nonzero(diagonal):
+        shape = [1] * psi.ndim
+        for axis in axes:
+            shape[axis] = 2
+        psi *= diagonal.reshape((2,) * k).transpose(np.argsort(axes)).reshape(shape)
+    elif k == 1 and np.array_equal(matrix, [[0, 1], [1, 0]]):
+        psi[...] = np.flip(psi, axes[0])
+    elif k == 1:
+        # slices rather than indices, which would copy out a scalar from a single qubit
+        a0 = psi[(slice(None),) * axes[0] + (slice(0, 1),)]
+        a1 = psi[(slice(None),) * axes[0] + (slice(1, 2),)]
+        a0_copy = a0.copy()
+        a0 *= matrix[0, 0]
+        a0 += matrix[0, 1] * a1
+        a1 *= matrix[1, 1]
+        a1 += matrix[1, 0] * a0_copy
+    else:
+        contracted = np.tensordot(
+            matrix.reshape((2,) * 2 * k), psi, axes=(list(range(k, 2 * k)), axes)
+        )
+        psi[...] = np.moveaxis(contracted, list(range(k)), axes)
+
+
+def statevector(qc: QuantumCircuit) -> np.ndarray:
+    """
+    Evolves |0...0> through the gates of `qc`, ignoring measurements and barriers. Axis `i` of the returned tensor is
+    qubit `num_qubits - 1 - i`, so that it flattens to Qiskit's little-endian statevector.
+    """
+    n = qc.num_qubits
+    psi = np.zeros((2,) * n, dtype=np.complex128)
+    psi[(0,) * n] = 1
+
+    for instruction in qc.data:
+        operation = instruction.operation
+        if operation.name in ("measure", "barrier"):
+            continue
+        axes = [n - 1 - qc.find_bit(qubit).index for qubit in instruction.qubits]
+        matrix = operation.to_matrix()
+        if (
+            isinstance(operation, ControlledGate)
+            and operation.ctrl_state == 2**operation.num_ctrl_qubits - 1
+        ):
+            # only the amplitudes with every control set change, by the block of the matrix where they are set
+            num_controls = operation.num_ctrl_qubits
+            controls, targets = axes[:num_controls], axes[num_controls:]
+            block = 2**num_controls - 1 + (np.arange(2 ** len(targets)) << num_controls)
+            index = tuple(1 if axis in controls else slice(None) for axis in range(n))
+            apply_gate(
+                psi[index],
+                matrix[np.ix_(block, block)],
+                [t - sum(c < t for c in controls) for t in reversed(targets)],
+            )
+        else:
+            apply_gate(psi, matrix, list(reversed(axes)))
+    return psi
+
+
+def subsystems(qc: QuantumCircuit) -> List[List[int]]:
+    """
+    Splits the qubits of `qc` into the smallest groups that no instruction acts across, by union-find over the qubits
+    of each instruction.
+    """
+    parent = list(range(qc.num_qubits))
+
+    def find(qubit: int) -> int:
+        while parent[qubit] != qubit:
+            parent[qubit] = parent[parent[qubit]]
+            qubit = parent[qubit]
+        return qubit
+
+    for instruction in qc.data:
+        if instruction.operation.name == "barrier":
+            continue
+        roots = [find(qc.find_bit(qubit).index) for qubit in instruction.qubits]
+        for root in roots[1:]:
+            parent[root] = roots[0]
+
+    groups: Dict[int, List[int]] = {}
+    for qubit in range(qc.num_qubits):
+        groups.setdefault(find(qubit), []).append(qubit)
+    return list(groups.values())
+
+
+def stabilizer_outcomes(
+    qc: QuantumCircuit, qubits: List[int]
+) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    The outcomes of measuring `qubits` of the Clifford circuit `qc` and their probabilities, by stabilizer simulation.
+    Returns None if `qc` is not Clifford or has too many outcomes to list.
+    """
+    try:
+        state = StabilizerState(qc)
+    except QiskitError:
+        return None
+
+    # every outcome is equally likely, so follow one branch to count the measurements that are random. Deterministic
+    # measurements leave the state as it is, so only random ones need to collapse it
+    branch, bits, random_bits = state, [], 0
+    for qubit in qubits:
+        p0 = branch.probabilities([qubit])[0]
+        if 0 < p0 < 1:
+            random_bits += 1
+            _, branch = branch.measure([qubit])
+        bits.append(int(p0 == 0))
+    if not random_bits:
+        return np.array([bits]).reshape(1, len(qubits)), np.ones(1)
+    if random_bits > MAX_RANDOM_OUTCOME_BITS:
+        return None
+
+    # keys list the last of `qubits` first
+    keys = sorted(state.probabilities_dict(qubits), key=lambda key: int(key, 2))
+    outcomes = np.array([[int(bit) for bit in reversed(key)] for key in keys])
+    probabilities = np.full(len(keys), 1 / len(keys))
+    return outcomes.reshape(len(keys), len(qubits)), probabilities
+
+
+def statevector_outcomes(
+    qc: QuantumCircuit, qubits: List[int]
+) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    The outcomes of measuring `qubits` of `qc` and their probabilities, from its dense statevector. Returns None if
+    `qc` has a gate without a matrix or too many qubits.
+    """
+    n = qc.num_qubits
+    if n > MAX_STATEVECTOR_QUBITS:
+        return None
+    try:
+        probabilities = np.abs(statevector(qc)) ** 2
+    except CircuitError:
+        return None
+
+    # sum out the unmeasured qubits, then order the axes so that bit k of an outcome is qubit `qubits[k]`
+    kept = [n - 1 - qubit for qubit in reversed(qubits)]
+    probabilities = probabilities.sum(
+        axis=tuple(axis for axis in range(n) if axis not in kept)
+    )
+    probabilities = probabilities.transpose(
+        [sorted(kept).index(axis) for axis in kept]
+    ).ravel()
+
+    outcomes = np.flatnonzero(probabilities > 1e-12)
+    probabilities = probabilities[outcomes] / probabilities[outcomes].sum()
+    return (outcomes[:, None] >> np.arange(len(qubits))) & 1, probabilities
+
+
+def distribution(qc: QuantumCircuit) -> Optional[Distribution]:
+    """
+    The exact outcome distribution of `qc`, as the product of its independent subsystems' distributions. Clifford
+    subsystems of more than a few qubits are simulated as stabilizer states and the rest as dense statevectors; subsystems that are not measured
+    are skipped. Returns None for circuits that must go through the shot simulator instead: mid-circuit measurement,
+    resets, classical control, several registers, or a subsystem too large for either simulation.
+    """
+    measured = terminal_measurements(qc)
+    if measured is None or len(qc.cregs) > 1 or not measured:
+        return None
+
+    groups = [group for group in subsystems(qc) if any(q in measured for q in group)]
+    local = {qubit: i for group in groups for i, qubit in enumerate(group)}
+    circuits = {group[0]: QuantumCircuit(len(group)) for group in groups}
+    owner = {qubit: group[0] for group in groups for qubit in group}
+    for instruction in qc.data:
+        if instruction.operation.name in ("measure", "barrier"):
+            continue
+        qubits = [qc.find_bit(qubit).index for qubit in instruction.qubits]
+        if qubits and qubits[0] in owner:
+            circuits[owner[qubits[0]]].append(
+                instruction.operation, [local[qubit] for qubit in qubits]
+            )
+
+    factors = []
+    for group in groups:
+        qubits = [qubit for qubit in group if qubit in measured]
+        targets = [local[qubit] for qubit in qubits]
+        outcomes = None
+        if len(group) > MAX_SMALL_SUBSYSTEM_QUBITS:
+            outcomes = stabilizer_outcomes(circuits[group[0]], targets)
+        if outcomes is None:
+            outcomes = statevector_outcomes(circuits[group[0]], targets)
+        if outcomes is None:
+            return None
+        clbits = np.array([measured[qubit] for qubit in qubits])
+        factors.append((clbits, outcomes[0].astype(np.uint8), outcomes[1]))
+    return qc.num_clbits, factors
+
+
+# one figure per thread, cleared and reused between renders
+_figures = threading.local()
+
+
+def reusable_figure() -> figure.Figure:
+    """
+    A cleared figure with an Agg canvas for the calling thread. Unlike pyplot, it touches no global state, so threads
+    can render concurrently.
+    """
+    fig = getattr(_figures, "figure", None)
+    if fig is None:
+        fig = figure.Figure()
+        backend_agg.FigureCanvasAgg(fig)
+        _figures.figure = fig
+    fig.clear()
+    # tight_layout adjusts the subplot parameters, which clear() keeps
+    fig.subplots_adjust(
+        **{
+            param: rcParams[f"figure.subplot.{param}"]
+            for param in ("left", "bottom", "right", "top", "wspace", "hspace")
+        }
+    )
+    return fig
+
+
+def fit_diagram(fig: figure.Figure, ax: axes.Axes, max_width: float) -> None:
+    """
+    Resizes a circuit drawn into `ax` to the size Qiskit's drawer picks for its own figures, capped at `max_width`
+    inches. Into a given axes, the drawer scales fonts and line widths to the axes' width instead.
+    """
+    (left, right), (bottom, top) = ax.get_xlim(), ax.get_ylim()
+    # Qiskit's conversion from drawing units to inches at scale 1
+    natural_width = (right - left) * 0.8361111
+    width = min(natural_width, max_width)
+
+    # the drawer scaled fonts and line widths by the axes' width over 0.8361111 natural widths; undo that and
+    # scale to `width` instead
+    factor = width / fig.get_figwidth() * 0.8361111**2
+    for artist in ax.get_children():
+        if isinstance(artist, text.Text):
+            artist.set_fontsize(artist.get_fontsize() * factor)
+        elif isinstance(artist, (lines.Line2D, patches.Patch)):
+            artist.set_linewidth(artist.get_linewidth() * factor)
+
+    fig.set_size_inches(width, width * (top - bottom) / (right - left))
+
+
+def compact_svg(svg: str) -> str:
+    """
+    Shrinks a Matplotlib SVG by dropping its metadata, ids and clipping to the figure, rounding coordinates to a tenth
+    of a point (or four significant digits below 10), and removing whitespace between elements.
+    """
+    svg = re.sub(r"<metadata>.*?</metadata>", "", svg, flags=re.DOTALL)
+    svg = re.sub(r' clip-path="url\(#\w+\)"', "", svg)
+    svg = re.sub(r'<g id="[^"]*">', "<g>", svg)
+    svg = re.sub(
+        r"\d+\.\d{3,}",
+        lambda m: f"{float(m[0]):.1f}" if float(m[0]) >= 10 else f"{float(m[0]):.4g}",
+        svg,
+    )
+    svg = re.sub(r"\s*\n\s*", " ", svg)
+    return re.sub(r">\s+<", "><", svg)
 
 
 class QiskitService:
     mock: bool
+    exact: bool
+    dpi: float
+    diagram_width: float
+    plot_size: Tuple[float, float]
 
     def __init__(
         self,
         mock: bool = False,
+        dpi: float = float(os.getenv("RENDER_DPI", 100)),
+        diagram_width: float = 16,
+        plot_size: Tuple[float, float] = (7, 5),
+        exact: bool = True,
     ) -> None:
         self.sim = basic_provider.BasicSimulator()
         self.mock = mock
+        # sample from the exact statevector distribution where the circuit allows, rather than simulating every shot
+        self.exact = exact
+        self.dpi = dpi
+        self.diagram_width = diagram_width
+        self.plot_size = plot_size
 
-    def draw(self, qc: QuantumCircuit) -> str:
-        buffer = io.BytesIO()
+    def draw(self, qc: QuantumCircuit, output_format: str = "png") -> str:
+        """
+        Draws `qc` as a base64 PNG, an SVG document, or Qiskit's text drawing.
+        """
+        if output_format == "text":
+            return str(qc.draw(output="text"))
+
+        fig = reusable_figure()
+        fig.set_size_inches(self.diagram_width, self.diagram_width)
+        ax = fig.add_axes((0, 0, 1, 1))
+        qc.draw(output="mpl", ax=ax)
+        fit_diagram(fig, ax, self.diagram_width)
+        return self._save(fig, output_format, facecolor="white")
 
-        fig: figure.Figure = qc.draw(  # pyrefly: ignore[bad-assignment] # Figure is correct for output='mpl'
-            output="mpl"
+    def run(self, qc: QuantumCircuit, shots: int = 1024) -> dict:
+        if self.exact and (exact := distribution(qc)) is not None:
+            return self._sample(exact, shots)
+        # a single circuit's counts
+        return cast(
+            dict, self._run(transpile(qc.reverse_bits(), self.sim), shots).get_counts()
         )
-        plt.savefig(fname=buffer, format="png")
-        plt.close(fig)
 
-        png_bytes = buffer.getvalue()
-        buffer.close()
+    def run_qasm(self, qasm: str, shots: int = 1024) -> dict:
+        """
+        Like `run`, reusing the distribution or the circuit transpiled for this backend from an identical QASM string
+        earlier.
+        """
+        return self.run_qasm_batch([qasm], shots)[0]
 
-        return base64.b64encode(png_bytes).decode("utf-8")
+    def run_qasm_batch(self, qasms: List[str], shots: int = 1024) -> List[dict]:
+        """
+        Like `run_qasm` for many QASM strings, sending every circuit without an exact distribution to the simulator in
+        a single job.
+        """
+        results: List[dict] = [{} for _ in qasms]
+        pending: Dict[int, QuantumCircuit] = {}
+        for i, qasm in enumerate(qasms):
+            if self.exact:
+                exact = distribution_cache.get(qasm_key(qasm))
+                if exact is None and (exact := distribution(circuit(qasm))) is not None:
+                    distribution_cache.put(qasm_key(qasm), exact)
+                if exact is not None:
+                    results[i] = self._sample(exact, shots)
+                    continue
 
-    def run(self, qc: QuantumCircuit, shots: int = 1024) -> dict:
+            key = f"{qasm_key(qasm)}:{self.sim.name}"
+            transpiled = transpiled_cache.get(key)
+            if transpiled is None:
+                transpiled = transpile(circuit(qasm).reverse_bits(), self.sim)
+                transpiled_cache.put(key, transpiled)
+            pending[i] = transpiled
+
+        if pending:
+            result = self._run(list(pending.values()), shots)
+            for j, i in enumerate(pending):
+                results[i] = cast(dict, result.get_counts(j))
+        return results
+
+    def _sample(self, exact: Distribution, shots: int) -> dict:
+        num_clbits, factors = exact
+        rng = np.random.default_rng(1024 if self.mock else None)
+        if len(factors) == 1:
+            ((clbits, outcomes, probabilities),) = factors
+            counts = rng.multinomial(shots, probabilities)
+            bits = np.zeros((np.count_nonzero(counts), num_clbits), dtype=np.uint8)
+            bits[:, clbits] = outcomes[counts > 0]
+            counts = counts[counts > 0]
+        else:
+            # draw each shot's outcome from every factor independently
+            bits = np.zeros((shots, num_clbits), dtype=np.uint8)
+            for clbits, outcomes, probabilities in factors:
+                bits[:, clbits] = outcomes[
+                    rng.choice(len(probabilities), size=shots, p=probabilities)
+                ]
+            bits, counts = np.unique(bits, axis=0, return_counts=True)
+
+        # counts keys list clbit 0 first, as `run` reverses the bits for the shot simulator
+        keys = (bits + ord("0")).view(f"S{num_clbits}").ravel().astype(str)
+        return {str(k): int(c) for k, c in zip(keys, counts)}
+
+    def _run(
+        self, transpiled: QuantumCircuit | List[QuantumCircuit], shots: int
+    ) -> Result:
         if self.mock:
-            job = self.sim.run(
-                transpile(qc.reverse_bits(), self.sim), shots=shots, seed_simulator=1024
-            )
+            job = self.sim.run(transpiled, shots=shots, seed_simulator=1024)
         else:
-            job = self.sim.run(transpile(qc.reverse_bits(), self.sim), shots=shots)
-        return job.result().get_counts()
+            job = self.sim.run(transpiled, shots=shots)
+        return job.result()
 
-    def plot(self, results: dict) -> str:
-        buffer = io.BytesIO()
+    def plot(self, results: dict, output_format: str = "png") -> str:
+        """
+        Plots a histogram of `results` as a base64 PNG or an SVG document, or returns the counts as JSON for the
+        client to render.
+        """
+        if output_format == "counts":
+            return json.dumps(results, sort_keys=True)
+
+        fig = reusable_figure()
+        fig.set_size_inches(*self.plot_size)
+        ax = fig.add_subplot()
 
-        fig: figure.Figure = plot_histogram(results)
-        plt.savefig(fname=buffer, format="png")
-        plt.close(fig)
+        labels = sorted(results)
+        values = [results[label] for label in labels]
+        bars = ax.bar(labels, values, color="#648fff", zorder=2)
+        ax.bar_label(bars, padding=3, zorder=3)
+        ax.set_xticks(
+            range(len(labels)), labels, rotation=70, ha="right", rotation_mode="anchor"
+        )
+        ax.set_ylabel("Count", fontsize=14)
+        ax.set_ylim(0, 1.1 * max(values, default=1))
+        ax.yaxis.set_major_locator(ticker.MaxNLocator(5))
+        ax.grid(which="major", axis="y", zorder=0, linestyle="--")
+        fig.tight_layout()
+        return self._save(fig, output_format)
+
+    def _save(self, fig: figure.Figure, output_format: str, **kwargs) -> str:
+        if output_format not in ("png", "svg"):
+            raise ValueError(f"Unsupported output format: {output_format}")
 
-        png_bytes = buffer.getvalue()
-        buffer.close()
+        buffer = io.BytesIO()
+        if output_format == "svg":
+            fig.savefig(buffer, format="svg", metadata={"Date": None}, **kwargs)
+        else:
+            fig.savefig(buffer, format="png", dpi=self.dpi, **kwargs)
+        fig.clear()
 
-        return base64.b64encode(png_bytes).decode("utf-8")
+        if output_format == "svg":
+            return compact_svg(buffer.getvalue().decode("utf-8"))
+        return base64.b64encode(buffer.getvalue()).decode("utf-8")
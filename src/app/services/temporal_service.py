@@ -1,21 +1,108 @@
+import asyncio
 import logging
+import time
+import weakref
+from datetime import timedelta
+from typing import ClassVar, Dict, Tuple
 
 from temporalio import client, envconfig
+from temporalio.service import RPCError
 
+from src.app.services import codec_service
 from src.app.temporal import constants
 
 
 class TemporalService:
     config: envconfig.ClientConnectConfig
+    health_check_interval: float
+
+    # process-wide clients shared by every TemporalService, keyed by (host, namespace)
+    _clients: ClassVar[Dict[Tuple[str, str], client.Client]] = {}
+    _last_checked: ClassVar[Dict[Tuple[str, str], float]] = {}
+    # guards connecting and health checking, per event loop as asyncio primitives cannot be shared across loops
+    _locks: ClassVar[
+        weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, Dict[Tuple[str, str], asyncio.Lock]
+        ]
+    ] = weakref.WeakKeyDictionary()
 
     def __init__(
-        self, host: str = "temporal-server:7233", namespace: str = constants.NAMESPACE
+        self,
+        host: str = "temporal-server:7233",
+        namespace: str = constants.NAMESPACE,
+        health_check_interval: float = 30,
     ) -> None:
         logging.basicConfig(level=logging.ERROR)
         config = envconfig.ClientConfig.load_client_connect_config()
         config["target_host"] = host
         config["namespace"] = namespace
         self.config = config
+        self.health_check_interval = health_check_interval
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        return self.config["target_host"], self.config["namespace"]
 
     async def connect(self) -> client.Client:
-        return await client.Client.connect(**self.config)
+        # the worker and the site must agree on the codec to read each other's payloads
+        return await client.Client.connect(
+            **self.config, data_converter=codec_service.data_converter()
+        )
+
+    async def shared_client(self) -> client.Client:
+        """
+        Returns the shared client for this host and namespace, connecting lazily and reconnecting when a periodic
+        health check fails. Concurrent callers wait for a single connect or health check rather than each starting one.
+        """
+        shared = self._clients.get(self.key)
+        if shared is not None and not self._is_check_due():
+            return shared
+
+        locks = self._locks.setdefault(asyncio.get_running_loop(), {})
+        async with locks.setdefault(self.key, asyncio.Lock()):
+            # another caller may have connected or checked while this one waited
+            shared = self._clients.get(self.key)
+            now = time.monotonic()
+
+            if shared is not None and self._is_check_due():
+                if not await self._is_healthy(shared):
+                    shared = None
+                self._last_checked[self.key] = now
+
+            if shared is None:
+                shared = await self.connect()
+                self._clients[self.key] = shared
+                self._last_checked[self.key] = now
+
+            return shared
+
+    def _is_check_due(self) -> bool:
+        return time.monotonic() - self._last_checked[self.key] >= (
+            self.health_check_interval
+        )
+
+    def invalidate(self) -> None:
+        """
+        Drops the shared client so that the next call to `shared_client` reconnects.
+        """
+        self._clients.pop(self.key, None)
+        self._last_checked.pop(self.key, None)
+
+    @classmethod
+    def forget_all(cls) -> None:
+        """
+        Forgets every shared client, so that the next call to `shared_client` connects anew. It does not close their
+        connections, as the SDK has no way to: a connection stays open for as long as anything, such as a workflow
+        handle, still refers to its client.
+        """
+        cls._clients.clear()
+        cls._last_checked.clear()
+
+    @staticmethod
+    async def _is_healthy(shared: client.Client) -> bool:
+        try:
+            return await shared.service_client.check_health(
+                timeout=timedelta(seconds=1)
+            )
+        except RPCError:
+            return False
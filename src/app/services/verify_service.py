@@ -0,0 +1,175 @@
+import os
+import re
+from collections import Counter
+from typing import Any, ClassVar, Dict, Optional, Set, Tuple
+
+from qiskit import QuantumCircuit
+
+from src.app.cmd import mcp
+from src.app.services import qiskit_service
+
+TOOLS = {
+    tool.name: tool
+    for tool in [
+        mcp.bell_state,
+        mcp.deutsch_constant,
+        mcp.deutsch_balanced,
+        mcp.bernstein_vazirani,
+        mcp.three_qubit_bitflip_code,
+        mcp.quantum_teleportation,
+    ]
+}
+
+# every pattern must match the normalized prompt for it to ask for that tool
+INTENTS: Dict[str, Tuple[str, ...]] = {
+    "bell_state": (r"\bbell\b|\bepr\b",),
+    "deutsch_constant": (r"\bdeutsch", r"\bconstant\b"),
+    "deutsch_balanced": (r"\bdeutsch", r"\bbalanced\b"),
+    "bernstein_vazirani": (r"\bbernstein\b|\bvazirani\b",),
+    "three_qubit_bitflip_code": (r"\bbit ?flip\b|\berror correct",),
+    "quantum_teleportation": (r"\bteleport",),
+}
+
+NUMBERS = {
+    word: value
+    for value, word in enumerate(
+        "zero one two three four five six seven eight nine ten eleven twelve".split()
+    )
+} | {"a": 1, "an": 1, "single": 1}
+
+# larger QASM is left to the LLM, as parsing it and rebuilding the expected circuit takes seconds
+MAX_QASM_BYTES = int(os.getenv("VERIFY_MAX_QASM_BYTES", 256 * 2**10))
+
+type Verdict = Tuple[bool, str]
+
+
+class VerifyService:
+    """
+    Verifies tool output without an LLM when the prompt states facts that can be checked against the circuit the
+    selected MCP tool is known to produce. Returns no verdict when the check is inconclusive.
+    """
+
+    decisions: ClassVar[Counter[str]] = Counter()
+
+    def check(
+        self, prompt: str, qasm: str, tool_name: str, tool_args: Dict[str, Any]
+    ) -> Optional[Verdict]:
+        verdict = self._check(prompt, qasm, tool_name, tool_args)
+        if verdict is None:
+            self.decisions["inconclusive"] += 1
+        else:
+            self.decisions["accepted" if verdict[0] else "rejected"] += 1
+        return verdict
+
+    @classmethod
+    def stats(cls) -> dict:
+        checks = sum(cls.decisions.values())
+        decided = cls.decisions["accepted"] + cls.decisions["rejected"]
+        return dict(cls.decisions) | {
+            "decided_rate": decided / checks if checks else 0.0
+        }
+
+    def _check(
+        self, prompt: str, qasm: str, tool_name: str, tool_args: Dict[str, Any]
+    ) -> Optional[Verdict]:
+        if len(qasm) > MAX_QASM_BYTES:
+            return None
+        try:
+            qc = qiskit_service.circuit(qasm)
+        except Exception as e:
+            return False, f"QASM does not parse: {e}"
+
+        if tool_name not in TOOLS:
+            return None
+
+        text = " ".join(re.findall(r"[a-z0-9]+", prompt.lower()))
+        intents = {
+            name
+            for name, patterns in INTENTS.items()
+            if all(re.search(p, text) for p in patterns)
+        }
+        if intents and tool_name not in intents:
+            return False, f"prompt asks for {sorted(intents)}, not {tool_name}"
+
+        try:
+            facts = self._check_facts(text, tool_name, tool_args)
+        except (TypeError, ValueError):
+            # malformed args are left to the LLM
+            facts = None
+        if facts is not None and not facts[0]:
+            return facts
+
+        if (
+            facts is None
+            or intents != {tool_name}
+            or not self._matches_tool(qc, tool_name, tool_args)
+        ):
+            return None
+
+        return True, facts[1] or f"structure matches {tool_name}"
+
+    @staticmethod
+    def _check_facts(
+        text: str, tool_name: str, tool_args: Dict[str, Any]
+    ) -> Optional[Verdict]:
+        """
+        Checks the facts stated in the prompt against the tool's args. No verdict means a fact could not be checked.
+        """
+        if tool_name == "bernstein_vazirani":
+            # only a bitstring next to a word naming it is the secret; one like "10 qubits" may be a count
+            matches: Set[Tuple[str, str]] = set(
+                re.findall(
+                    r"\b(?:secret|string|bitstring) ([01]+)\b(?! (?:qubits?|bits?)\b)"
+                    r"|\b([01]+) (?:secret|string|bitstring)\b",
+                    text,
+                )
+            )
+            secrets = {a or b for a, b in matches}
+            s = str(tool_args.get("s", "0101"))
+            if not secrets:
+                return (True, "") if not re.search(r"\b[01]{2,}\b", text) else None
+            if len(secrets) > 1:
+                return None
+            (secret,) = secrets
+            if secret == s:
+                return True, f"secret {s} matches"
+            if secret == s[::-1]:
+                # bit order is a matter of convention, so leave it to the LLM
+                return None
+            return False, f"prompt asks for secret {secret}, tool was given {s}"
+
+        if tool_name == "quantum_teleportation":
+            counts = {
+                int(m) if m.isdigit() else NUMBERS[m]
+                for m in re.findall(
+                    rf"\b(\d+|{'|'.join(NUMBERS)}) (?:quantum )?(?:states?|qubits?)\b",
+                    text,
+                )
+            }
+            n = int(tool_args.get("n", 1))
+            if not counts:
+                return True, ""
+            if len(counts) > 1:
+                return None
+            (count,) = counts
+            # "3 qubits" may count the qubits transmitted or every qubit in the circuit
+            if count in (n, 3 * n):
+                return True, f"teleports {n} state(s)"
+            return False, f"prompt asks to teleport {count}, tool was given n={n}"
+
+        return True, ""
+
+    @staticmethod
+    def _matches_tool(
+        qc: QuantumCircuit, tool_name: str, tool_args: Dict[str, Any]
+    ) -> bool:
+        try:
+            expected = qiskit_service.circuit(TOOLS[tool_name].fn(**tool_args))
+        except Exception:
+            return False
+
+        return (
+            qc.num_qubits == expected.num_qubits
+            and qc.num_clbits == expected.num_clbits
+            and qc.count_ops() == expected.count_ops()
+        )
@@ -1,3 +1,5 @@
+import base64
+import json
 import random
 from typing import Any
 
@@ -14,6 +16,9 @@ from fasthtml.common import (
     Img,
     Pre,
     Code,
+    Select,
+    Option,
+    Small,
 )
 
 
@@ -56,9 +61,8 @@ def circuit_form() -> Any:
                     name="diagram",
                     type="checkbox",
                     checked=True,
-                    disabled=True,
                 ),
-                "Generate Matplotlib diagram",
+                "Generate circuit diagram",
             ),
             Label(
                 Input(
@@ -66,10 +70,29 @@ def circuit_form() -> Any:
                     name="simulation",
                     type="checkbox",
                     checked=True,
-                    disabled=True,
                 ),
                 "Run ideal simulation",
             ),
+            Label(
+                "Diagram format",
+                Select(
+                    Option("PNG", value="png", selected=True),
+                    Option("SVG", value="svg"),
+                    Option("Text", value="text"),
+                    id="diagram-format",
+                    name="diagram_format",
+                ),
+            ),
+            Label(
+                "Histogram format",
+                Select(
+                    Option("PNG", value="png", selected=True),
+                    Option("SVG", value="svg"),
+                    Option("Counts, drawn by your browser", value="counts"),
+                    id="plot-format",
+                    name="plot_format",
+                ),
+            ),
             Div(Button("Let's Go!", type="submit"), style={"margin-top": "12px"}),
             hx_post="/generate",
             hx_target="#result-area",
@@ -79,6 +102,29 @@ def circuit_form() -> Any:
     )
 
 
+def progress_status(step_description: str) -> Any:
+    return P(
+        f"Status: {step_description}",
+        cls="animate-pulse",
+        sse_swap="step",
+        hx_swap="outerHTML",
+    )
+
+
+def streaming_progress(job_id: str, step_description: str) -> Any:
+    # step changes are pushed over SSE; on completion or a broken stream, fall back to GET /job/{job_id}
+    return Div(
+        progress_status(step_description),
+        Progress(value=None),
+        hx_ext="sse",
+        sse_connect=f"/job/{job_id}/events",
+        hx_get=f"/job/{job_id}",
+        hx_trigger="sse:done, htmx:sseError",
+        hx_target="this",
+        hx_swap="outerHTML",
+    )
+
+
 def polling_progress(job_id: str, step_description: str) -> Any:
     return Div(
         P(f"Status: {step_description}", cls="animate-pulse"),
@@ -90,25 +136,75 @@ def polling_progress(job_id: str, step_description: str) -> Any:
     )
 
 
+def image_src(image: str | bytes, image_format: str) -> str:
+    # the results of workflows run before images were bytes hold base64 PNGs and SVG documents as str
+    if isinstance(image, str) and image_format == "svg":
+        image = image.encode()
+    if isinstance(image, bytes):
+        image = base64.b64encode(image).decode()
+    mime = "image/svg+xml" if image_format == "svg" else "image/png"
+    return f"data:{mime};base64,{image}"
+
+
+def circuit_diagram(diagram: str | bytes, diagram_format: str) -> Any:
+    if diagram_format == "text":
+        return Pre(Code(diagram.decode() if isinstance(diagram, bytes) else diagram))
+    return Img(src=image_src(diagram, diagram_format), alt="Quantum Circuit")
+
+
+def counts_histogram(counts: dict) -> Any:
+    peak = max(counts.values(), default=1)
+    return Div(
+        *[
+            Div(
+                Small(str(count)),
+                Div(
+                    style={
+                        "height": f"{240 * count / peak:.0f}px",
+                        "width": "100%",
+                        "background": "#648fff",
+                    }
+                ),
+                Small(label, style={"writing-mode": "vertical-rl"}),
+                style={
+                    "display": "flex",
+                    "flex": "1",
+                    "flex-direction": "column",
+                    "align-items": "center",
+                },
+            )
+            for label, count in sorted(counts.items())
+        ],
+        role="img",
+        aria_label="Simulation results",
+        style={"display": "flex", "align-items": "flex-end", "gap": "4px"},
+    )
+
+
+def results_plot(plot: str | bytes, plot_format: str) -> Any:
+    if plot_format == "counts":
+        return counts_histogram(json.loads(plot))
+    return Img(src=image_src(plot, plot_format), alt="Simulation results")
+
+
 def circuit_result(result: dict) -> Any:
     return Div(
         Div(id="form-container", hx_swap_oob="true"),
         H3("Results"),
         Pre(Code(result["qasm"])),
         Div(
-            Img(
-                src=f"data:image/png;base64,{result['circuit_diagram']}",
-                alt="Quantum Circuit",
+            circuit_diagram(
+                result["circuit_diagram"], result.get("diagram_format", "png")
             ),
-        ),
+        )
+        if result.get("circuit_diagram") is not None
+        else None,
         Div(
-            Img(
-                src=f"data:image/png;base64,{result['results_plot']}",
-                alt="Simulation results",
-                style={},
-            ),
+            results_plot(result["results_plot"], result.get("plot_format", "png")),
             style={"margin-top": "15px"},
-        ),
+        )
+        if result.get("results_plot") is not None
+        else None,
         Div(
             Button(
                 "Reset",
@@ -1,11 +1,21 @@
-from typing import List
+import asyncio
+import base64
+from typing import List, Optional
 
+import httpx
 from google.genai.types import FunctionCall
 from mcp import types as mcp_types
 from qiskit import QuantumCircuit
 from temporalio import activity
 
-from src.app.services import llm_service, mcp_service, qiskit_service
+from src.app.services import (
+    artifact_service,
+    blob_service,
+    llm_service,
+    mcp_service,
+    qiskit_service,
+    verify_service,
+)
 from src.app.temporal import models
 
 
@@ -16,8 +26,15 @@ async def list_tools(input: models.ListToolsInput) -> List[mcp_types.Tool]:
 
 @activity.defn
 async def choose_tool(input: models.ChooseToolInput) -> FunctionCall:
+    if input.available_tools:
+        available_tools, genai_tools = input.available_tools, None
+    else:
+        # the workflow skipped list_tools, so route against the worker's cached catalog
+        catalog = await mcp_service.MCPService(mock=input.mock).get_tool_catalog()
+        available_tools, genai_tools = catalog.tool_dicts, catalog.genai_tools
+
     tools = await llm_service.LLMService(mock=input.mock).choose_tool(
-        prompt=input.prompt, available_tools=input.available_tools
+        prompt=input.prompt, available_tools=available_tools, genai_tools=genai_tools
     )
 
     if not tools:
@@ -28,21 +45,108 @@ async def choose_tool(input: models.ChooseToolInput) -> FunctionCall:
 
 @activity.defn
 async def use_tool(input: models.UseToolInput) -> str:
-    result = await mcp_service.MCPService(mock=input.mock).call_tool(
-        input.name, input.args
+    # the tools are deterministic, so a tool's QASM for the same args is reused until the server's tool list changes
+    service = mcp_service.MCPService(mock=input.mock)
+    catalog = await service.get_tool_catalog()
+    key = artifact_service.tool_key(
+        input.name, input.args, input.mock, catalog.revision
+    )
+    qasm = artifact_service.artifact_store.get(key)
+    # a large circuit's QASM is cached as a reference, whose blob may have outlived its retention period since
+    if qasm is not None and (
+        not blob_service.is_ref(qasm) or blob_service.default_blob_store().touch(qasm)
+    ):
+        return qasm
+
+    stream = catalog.qasm_stream(input.name)
+    if stream is not None:
+        # a large circuit's QASM is spilled to the blob store as it arrives, and passed on by reference
+        try:
+            qasm = await blob_service.spill(service.stream_tool(stream, input.args))
+        except httpx.HTTPError as e:
+            raise RuntimeError(f"Something went wrong trying to use the tool: {e}")
+    else:
+        result = await service.call_tool(input.name, input.args)
+        if result.is_error or not result.data:
+            raise RuntimeError("Something went wrong trying to use the tool")
+        qasm = result.data
+
+    artifact_service.artifact_store.put(key, qasm)
+    return qasm
+
+
+@activity.defn
+async def plan_and_generate(
+    input: models.PlanAndGenerateInput,
+) -> models.PlanAndGenerateOutput:
+    """
+    Runs list_tools (unless the tools are cached), choose_tool and use_tool in one activity. Each step heartbeats its
+    name and, once chosen, the tool call, so that a retry picks up after the last step that completed.
+    """
+    details = activity.info().heartbeat_details
+    tool: Optional[dict] = details[0].get("tool") if details else None
+
+    if tool is None:
+        available_tools = []
+        if not input.cached_tools:
+            activity.heartbeat({"step": "list_tools"})
+            tools = await list_tools(models.ListToolsInput(mock=input.mock))
+            available_tools = [t.model_dump() for t in tools]
+
+        activity.heartbeat({"step": "choose_tool"})
+        call = await choose_tool(
+            models.ChooseToolInput(
+                prompt=input.prompt, available_tools=available_tools, mock=input.mock
+            )
+        )
+        tool = {"name": call.name, "args": dict(call.args or {})}
+
+    activity.heartbeat({"step": "use_tool", "tool": tool})
+    qasm = await use_tool(
+        models.UseToolInput(name=tool["name"], args=tool["args"], mock=input.mock)
     )
+    return models.PlanAndGenerateOutput(name=tool["name"], args=tool["args"], qasm=qasm)
 
-    if result.is_error or not result.data:
-        raise RuntimeError("Something went wrong trying to use the tool")
 
-    return result.data
+def route_verified(input: models.VerifyQASMInput, is_valid: bool) -> None:
+    """
+    Caches the route to the tool for the prompt once its QASM is accepted, and forgets it once rejected.
+    """
+    if input.mock or not input.tool_name:
+        return
+    call = FunctionCall(name=input.tool_name, args=input.tool_args or {})
+    if is_valid:
+        llm_service.routing_cache.put(input.prompt, call)
+    else:
+        llm_service.routing_cache.evict(input.prompt, call)
 
 
 @activity.defn
 async def verify_qasm(input: models.VerifyQASMInput) -> None:
+    if input.mock:
+        # mock jobs always get bell_state whatever the prompt, which only the mock verdict accepts
+        return
+
+    # reading a spilled blob and parsing its QASM would block the event loop the other activities run on
+    qasm = await asyncio.to_thread(blob_service.resolve, input.qasm)
+    verdict = await asyncio.to_thread(
+        verify_service.VerifyService().check,
+        prompt=input.prompt,
+        qasm=qasm,
+        tool_name=input.tool_name,
+        tool_args=input.tool_args or {},
+    )
+    if verdict is not None:
+        is_valid, reason = verdict
+        route_verified(input, is_valid)
+        if not is_valid:
+            raise RuntimeError(f"Output does not match user input: {reason}")
+        return
+
     is_valid, raw_text = await llm_service.LLMService(
         model_temperature=0.2, mock=input.mock
-    ).validate(tool_output=input.qasm, user_prompt=input.prompt)
+    ).validate(tool_output=qasm, user_prompt=input.prompt)
+    route_verified(input, is_valid)
 
     if not is_valid:
         raise RuntimeError(
@@ -50,27 +154,89 @@ async def verify_qasm(input: models.VerifyQASMInput) -> None:
         )
 
 
-@activity.defn
-def generate_diagram(input: models.GenerateDiagramInput) -> str:
+def parse_circuit(qasm: str) -> QuantumCircuit:
     try:
-        qc = QuantumCircuit().from_qasm_str(qasm_str=input.qasm)
+        return qiskit_service.circuit(qasm)
     except Exception as e:
         raise RuntimeError(
             f"Unable to construct a QuantumCircuit from the provided QASM: {e}"
         )
 
-    return qiskit_service.QiskitService().draw(qc)
+
+def image_bytes(image: str, output_format: str) -> bytes:
+    # PNGs are drawn as base64, but passed on as they are rather than a third larger
+    return base64.b64decode(image) if output_format == "png" else image.encode()
 
 
 @activity.defn
-def simulate(input: models.SimulateInput) -> str:
-    try:
-        qc = QuantumCircuit().from_qasm_str(qasm_str=input.qasm)
-    except Exception as e:
-        raise RuntimeError(
-            f"Unable to construct a QuantumCircuit from the provided QASM: {e}"
-        )
+def generate_diagram(input: models.GenerateDiagramInput) -> bytes:
+    service = qiskit_service.QiskitService()
+    diagram = artifact_service.artifact_store.fetch(
+        artifact_service.diagram_key(input.qasm, input.output_format, service),
+        lambda: service.draw(
+            parse_circuit(blob_service.resolve(input.qasm)),
+            output_format=input.output_format,
+        ),
+    )
+    return image_bytes(diagram, input.output_format)
+
 
+@activity.defn
+def simulate(input: models.SimulateInput) -> bytes:
     service = qiskit_service.QiskitService(mock=input.mock)
-    results = service.run(qc)
-    return service.plot(results=results)
+
+    def plot() -> str:
+        qasm = blob_service.resolve(input.qasm)
+        parse_circuit(qasm)
+        results = service.run_qasm(qasm)
+        return service.plot(results=results, output_format=input.output_format)
+
+    if not input.mock:
+        # every unseeded simulation draws new shots
+        return image_bytes(plot(), input.output_format)
+    histogram = artifact_service.artifact_store.fetch(
+        artifact_service.plot_key(input.qasm, input.output_format, service), plot
+    )
+    return image_bytes(histogram, input.output_format)
+
+
+@activity.defn
+def simulate_batch(input: models.SimulateBatchInput) -> List[models.BatchResult]:
+    """
+    Generates the circuits of a chunk with the MCP tools' own functions, without a round trip to the server, and
+    simulates them together. An item that cannot be generated, parsed or simulated fails alone rather than the whole
+    chunk.
+    """
+    results = [models.BatchResult(counts={}) for _ in input.items]
+    qasms = {}
+    for i, item in enumerate(input.items):
+        if not item.qasm and item.tool_name not in verify_service.TOOLS:
+            results[i].error = f"Unknown tool: {item.tool_name}"
+            continue
+        try:
+            if item.qasm:
+                qasm = blob_service.resolve(item.qasm)
+            else:
+                tool = verify_service.TOOLS[item.tool_name]
+                qasm = tool.fn(**(item.tool_args or {}))
+            qiskit_service.circuit(qasm)
+        except Exception as e:
+            results[i].error = f"Unable to construct a QuantumCircuit: {e}"
+        else:
+            qasms[i] = qasm
+
+    service = qiskit_service.QiskitService(mock=input.mock)
+    try:
+        batch = service.run_qasm_batch(list(qasms.values()), shots=input.shots)
+        counts = dict(zip(qasms, batch))
+    except Exception:
+        # a circuit the simulator rejects fails the whole job, so simulate each alone to fail only that one
+        counts = {}
+        for i, qasm in qasms.items():
+            try:
+                [counts[i]] = service.run_qasm_batch([qasm], shots=input.shots)
+            except Exception as e:
+                results[i].error = f"Unable to simulate the circuit: {e}"
+    for i, item_counts in counts.items():
+        results[i].counts = item_counts
+    return results
@@ -1,3 +1,7 @@
 NAMESPACE = "daq"
 TASK_QUEUE = "daq-task-queue"
 WORKFLOW_KEY = "daq"
+
+# CPU-bound activities are scheduled on the workflow's task queue with this suffix
+CPU_TASK_QUEUE_SUFFIX = "-cpu"
+CPU_TASK_QUEUE = TASK_QUEUE + CPU_TASK_QUEUE_SUFFIX
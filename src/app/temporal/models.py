@@ -1,18 +1,36 @@
 from dataclasses import dataclass
-from typing import List
+from typing import Dict, List, Literal, Optional
+
+DiagramFormat = Literal["png", "svg", "text"]
+# "counts" leaves the histogram for the client to render from the raw counts
+PlotFormat = Literal["png", "svg", "counts"]
 
 
 @dataclass
 class DAQWorkflowInput:
     prompt: str
     mock: bool
+    # skip the list_tools activity and let choose_tool use the worker's cached tool catalog
+    cached_tools: bool = False
+    # start generate_diagram and simulate alongside verify_qasm rather than after it
+    speculative_render: bool = False
+    diagram_format: DiagramFormat = "png"
+    plot_format: PlotFormat = "png"
+    # the QASM is always generated; the diagram and simulation are skipped unless wanted
+    want_diagram: bool = True
+    want_simulation: bool = True
+    # run list_tools, choose_tool and use_tool as the one plan_and_generate activity
+    plan_and_generate: bool = False
 
 
 @dataclass
 class DAQWorkflowOutput:
     qasm: str
-    circuit_diagram: str
-    results_plot: str
+    # a PNG as it is, or the UTF-8 of the text formats; base64 PNGs and str in workflows run before they were bytes
+    circuit_diagram: Optional[bytes]
+    results_plot: Optional[bytes]
+    diagram_format: DiagramFormat = "png"
+    plot_format: PlotFormat = "png"
 
 
 @dataclass
@@ -29,25 +47,81 @@ class ChooseToolInput:
 
 @dataclass
 class UseToolInput:
-    available_tools: List[dict]
     name: str
     args: dict
     mock: bool
 
 
+@dataclass
+class PlanAndGenerateInput:
+    prompt: str
+    mock: bool
+    cached_tools: bool = False
+
+
+@dataclass
+class PlanAndGenerateOutput:
+    # the tool call that generated `qasm`
+    name: str
+    args: dict
+    qasm: str
+
+
 @dataclass
 class VerifyQASMInput:
     prompt: str
     qasm: str
     mock: bool
+    # the tool call that produced `qasm`, used to verify it without the LLM where possible
+    tool_name: str = ""
+    tool_args: Optional[dict] = None
 
 
 @dataclass
 class GenerateDiagramInput:
     qasm: str
+    output_format: DiagramFormat = "png"
 
 
 @dataclass
 class SimulateInput:
     qasm: str
     mock: bool
+    output_format: PlotFormat = "png"
+
+
+@dataclass
+class BatchItem:
+    # either an MCP tool call to generate the circuit from, or the circuit's QASM
+    tool_name: str = ""
+    tool_args: Optional[dict] = None
+    qasm: str = ""
+
+
+@dataclass
+class BatchResult:
+    # only the outcomes that were measured, or an empty dict if the item could not be simulated
+    counts: Dict[str, int]
+    error: str = ""
+
+
+@dataclass
+class DAQBatchWorkflowInput:
+    items: List[BatchItem]
+    mock: bool
+    shots: int = 1024
+    # items simulated by each activity
+    chunk_size: int = 64
+
+
+@dataclass
+class DAQBatchWorkflowOutput:
+    results: List[BatchResult]
+    circuits_per_second: float
+
+
+@dataclass
+class SimulateBatchInput:
+    items: List[BatchItem]
+    mock: bool
+    shots: int = 1024
@@ -1,21 +1,115 @@
+import asyncio
 from datetime import timedelta
+from typing import Dict, List, Tuple
 
 from temporalio import workflow, common
+from temporalio.exceptions import ApplicationError
 
-from src.app.temporal import models
+from src.app.temporal import constants, models
+
+# histories recorded before this patch ran verify_qasm, generate_diagram and simulate one after the other
+CONCURRENT_RENDER_PATCH = "concurrent-render"
+# and scheduled generate_diagram and simulate on the workflow's own task queue
+CPU_TASK_QUEUE_PATCH = "cpu-task-queue"
 
 
 @workflow.defn
 class DAQWorkflow:
+    step: str
+
+    def __init__(self) -> None:
+        self.step = ""
+
+    @workflow.query
+    def progress(self) -> str:
+        return self.step
+
+    @workflow.update(unfinished_policy=workflow.HandlerUnfinishedPolicy.ABANDON)
+    async def wait_for_step(self, step: str) -> str:
+        """
+        Blocks until the workflow has moved past `step` and returns the new step, letting callers be pushed step
+        changes instead of polling. A caller still waiting when the workflow finishes is told so by the update failing,
+        so that is not warned about. Nothing follows "done", so a caller already past it is answered at once rather than
+        holding the workflow open until it times out.
+        """
+        await workflow.wait_condition(lambda: self.step != step or self.step == "done")
+        return self.step
+
     @workflow.run
     async def run(self, input: models.DAQWorkflowInput) -> models.DAQWorkflowOutput:
-        available_tools = await workflow.execute_activity(
-            "list_tools",
-            models.ListToolsInput(mock=input.mock),
-            retry_policy=common.RetryPolicy(maximum_attempts=1),
-            start_to_close_timeout=timedelta(seconds=5),
+        if input.plan_and_generate:
+            tool, qasm = await self._plan_and_generate(input)
+        else:
+            tool, qasm = await self._generate(input)
+
+        verify_input = models.VerifyQASMInput(
+            prompt=input.prompt,
+            qasm=qasm,
+            mock=input.mock,
+            tool_name=tool["name"],
+            tool_args=tool["args"],
+        )
+
+        if not workflow.patched(CONCURRENT_RENDER_PATCH):
+            self.step = "verify_qasm"
+            await self._verify_qasm(verify_input)
+
+            self.step = "generate_diagram"
+            circuit_diagram = await self._start_generate_diagram(
+                qasm, input.diagram_format
+            )
+
+            self.step = "simulate"
+            simulation_result = await self._start_simulate(
+                qasm, input.mock, input.plot_format
+            )
+        else:
+            if input.speculative_render:
+                # render while verifying, discarding the results if verification fails
+                renders = self._start_renders(qasm, input)
+                self.step = "verify_qasm"
+                try:
+                    await self._verify_qasm(verify_input)
+                except Exception:
+                    for handle in renders.values():
+                        handle.cancel()
+                    raise
+            else:
+                self.step = "verify_qasm"
+                await self._verify_qasm(verify_input)
+                renders = self._start_renders(qasm, input)
+
+            results = {}
+            if renders:
+                self.step = "render" if len(renders) > 1 else next(iter(renders))
+                results = dict(zip(renders, await asyncio.gather(*renders.values())))
+            circuit_diagram = results.get("generate_diagram")
+            simulation_result = results.get("simulate")
+
+        # release any callers still waiting on a step change before completing
+        self.step = "done"
+        await workflow.wait_condition(workflow.all_handlers_finished)
+
+        return models.DAQWorkflowOutput(
+            qasm=qasm,
+            circuit_diagram=circuit_diagram,
+            results_plot=simulation_result,
+            diagram_format=input.diagram_format,
+            plot_format=input.plot_format,
         )
 
+    async def _generate(self, input: models.DAQWorkflowInput) -> Tuple[dict, str]:
+        available_tools = []
+        if not input.cached_tools:
+            self.step = "list_tools"
+            available_tools = await workflow.execute_activity(
+                "list_tools",
+                models.ListToolsInput(mock=input.mock),
+                retry_policy=common.RetryPolicy(maximum_attempts=1),
+                start_to_close_timeout=timedelta(seconds=5),
+            )
+
+        self.step = "choose_tool"
         tool = await workflow.execute_activity(
             "choose_tool",
             models.ChooseToolInput(
@@ -25,39 +119,152 @@ class DAQWorkflow:
             start_to_close_timeout=timedelta(seconds=10),
         )
 
+        self.step = "use_tool"
         qasm = await workflow.execute_activity(
             "use_tool",
             models.UseToolInput(
-                available_tools=available_tools,
                 name=tool["name"],
                 args=tool["args"],
                 mock=input.mock,
             ),
             retry_policy=common.RetryPolicy(maximum_attempts=1),
-            start_to_close_timeout=timedelta(seconds=3),
+            # long enough to stream the QASM of a very large circuit
+            start_to_close_timeout=timedelta(seconds=30),
         )
 
+        return tool, qasm
+
+    async def _plan_and_generate(
+        self, input: models.DAQWorkflowInput
+    ) -> Tuple[dict, str]:
+        """
+        Generates the QASM with one activity rather than one per step, saving a round trip through the server and
+        six history events for each step left out.
+        """
+        self.step = "plan_and_generate"
+        output = await workflow.execute_activity(
+            "plan_and_generate",
+            models.PlanAndGenerateInput(
+                prompt=input.prompt, mock=input.mock, cached_tools=input.cached_tools
+            ),
+            result_type=models.PlanAndGenerateOutput,
+            # a retry resumes after the last step the activity heartbeat
+            retry_policy=common.RetryPolicy(maximum_attempts=2),
+            # the sum of the separate steps' timeouts
+            start_to_close_timeout=timedelta(seconds=45),
+            # the activity heartbeats before each step, so it is lost once silent for longer than the longest step
+            heartbeat_timeout=timedelta(seconds=30),
+        )
+        return {"name": output.name, "args": output.args}, output.qasm
+
+    async def _verify_qasm(self, verify_input: models.VerifyQASMInput) -> None:
         await workflow.execute_activity(
             "verify_qasm",
-            models.VerifyQASMInput(prompt=input.prompt, qasm=qasm, mock=input.mock),
+            verify_input,
             retry_policy=common.RetryPolicy(maximum_attempts=1),
             start_to_close_timeout=timedelta(seconds=10),
         )
 
-        circuit_diagram = await workflow.execute_activity(
+    @staticmethod
+    def _cpu_task_queue() -> str | None:
+        if not workflow.patched(CPU_TASK_QUEUE_PATCH):
+            return None
+        return workflow.info().task_queue + constants.CPU_TASK_QUEUE_SUFFIX
+
+    def _start_renders(
+        self, qasm: str, input: models.DAQWorkflowInput
+    ) -> Dict[str, workflow.ActivityHandle[bytes]]:
+        """
+        Starts the requested render activities, keyed by activity name.
+        """
+        renders = {}
+        if input.want_diagram:
+            renders["generate_diagram"] = self._start_generate_diagram(
+                qasm, input.diagram_format
+            )
+        if input.want_simulation:
+            renders["simulate"] = self._start_simulate(
+                qasm, input.mock, input.plot_format
+            )
+        return renders
+
+    def _start_generate_diagram(
+        self, qasm: str, diagram_format: models.DiagramFormat
+    ) -> workflow.ActivityHandle[bytes]:
+        # without a result type, so that the str results of activities run before they returned bytes still decode
+        return workflow.start_activity(
             "generate_diagram",
-            models.GenerateDiagramInput(qasm=qasm),
+            models.GenerateDiagramInput(qasm=qasm, output_format=diagram_format),
+            task_queue=self._cpu_task_queue(),
             retry_policy=common.RetryPolicy(maximum_attempts=1),
             start_to_close_timeout=timedelta(seconds=5),
         )
 
-        simulation_result = await workflow.execute_activity(
+    def _start_simulate(
+        self, qasm: str, mock: bool, plot_format: models.PlotFormat
+    ) -> workflow.ActivityHandle[bytes]:
+        return workflow.start_activity(
             "simulate",
-            models.SimulateInput(qasm=qasm, mock=input.mock),
+            models.SimulateInput(qasm=qasm, mock=mock, output_format=plot_format),
+            task_queue=self._cpu_task_queue(),
             retry_policy=common.RetryPolicy(maximum_attempts=1),
             start_to_close_timeout=timedelta(seconds=5),
         )
 
-        return models.DAQWorkflowOutput(
-            qasm=qasm, circuit_diagram=circuit_diagram, results_plot=simulation_result
+
+@workflow.defn
+class DAQBatchWorkflow:
+    """
+    Generates and simulates many circuits from tool calls or QASM, without the LLM. Each chunk of items is simulated
+    by one activity, so a failed chunk is retried alone and the chunks already done are kept in the history.
+    """
+
+    completed: int
+    total: int
+
+    def __init__(self) -> None:
+        self.completed = self.total = 0
+
+    @workflow.query
+    def progress(self) -> str:
+        return f"{self.completed}/{self.total}"
+
+    @workflow.run
+    async def run(
+        self, input: models.DAQBatchWorkflowInput
+    ) -> models.DAQBatchWorkflowOutput:
+        if input.chunk_size < 1:
+            raise ApplicationError(
+                f"chunk_size must be at least 1, not {input.chunk_size}",
+                non_retryable=True,
+            )
+        started_at = workflow.now()
+        self.total = len(input.items)
+        chunks = [
+            input.items[i : i + input.chunk_size]
+            for i in range(0, len(input.items), input.chunk_size)
+        ]
+        results = await asyncio.gather(
+            *(self._simulate_chunk(chunk, input) for chunk in chunks)
+        )
+
+        elapsed = (workflow.now() - started_at).total_seconds()
+        return models.DAQBatchWorkflowOutput(
+            results=[result for chunk in results for result in chunk],
+            circuits_per_second=self.total / elapsed if elapsed else 0.0,
+        )
+
+    async def _simulate_chunk(
+        self, chunk: List[models.BatchItem], input: models.DAQBatchWorkflowInput
+    ) -> List[models.BatchResult]:
+        results = await workflow.execute_activity(
+            "simulate_batch",
+            models.SimulateBatchInput(items=chunk, mock=input.mock, shots=input.shots),
+            result_type=List[models.BatchResult],
+            task_queue=workflow.info().task_queue + constants.CPU_TASK_QUEUE_SUFFIX,
+            # simulation is idempotent, so a lost chunk is worth retrying
+            retry_policy=common.RetryPolicy(maximum_attempts=3),
+            start_to_close_timeout=timedelta(minutes=1),
         )
+        self.completed += len(chunk)
+        return results
@@ -0,0 +1,86 @@
+"""
+Throughput of the simulate_batch activity in chunks against one simulate activity per circuit, over every 8-bit
+Bernstein-Vazirani secret and teleportation of 1 to 20 states, and of BasicSimulator jobs of many circuits against
+one job per circuit.
+
+    python -m src.bench.batch --chunk-sizes 1 16 64 256
+"""
+
+import argparse
+import itertools
+import time
+from typing import Any, Callable, List
+
+from src.app.cmd import mcp
+from src.app.services import qiskit_service, verify_service
+from src.app.temporal import activities, models
+
+
+def clear_caches() -> None:
+    qiskit_service.circuit_cache.clear()
+    qiskit_service.transpiled_cache.clear()
+    qiskit_service.distribution_cache.clear()
+
+
+def measure(name: str, circuits: int, run: Callable[[], Any]) -> None:
+    clear_caches()
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    print(f"{name:>36}: {circuits / elapsed:8.1f} circuits/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[1, 16, 64, 256])
+    parser.add_argument("--max-teleport", type=int, default=20)
+    args = parser.parse_args()
+
+    items = [
+        models.BatchItem(tool_name="bernstein_vazirani", tool_args={"s": "".join(s)})
+        for s in itertools.product("01", repeat=8)
+    ] + [
+        models.BatchItem(tool_name="quantum_teleportation", tool_args={"n": n})
+        for n in range(1, args.max_teleport + 1)
+    ]
+
+    def one_activity_per_circuit() -> None:
+        for item in items:
+            qasm = verify_service.TOOLS[item.tool_name].fn(**item.tool_args or {})
+            activities.simulate(
+                models.SimulateInput(qasm=qasm, mock=True, output_format="counts")
+            )
+
+    measure("simulate, one per circuit", len(items), one_activity_per_circuit)
+    for chunk_size in args.chunk_sizes:
+
+        def chunked(chunk_size: int = chunk_size) -> None:
+            for i in range(0, len(items), chunk_size):
+                activities.simulate_batch(
+                    models.SimulateBatchInput(
+                        items=items[i : i + chunk_size], mock=True
+                    )
+                )
+
+        measure(f"simulate_batch, chunks of {chunk_size}", len(items), chunked)
+
+    # the shot simulator alone, on the circuits it can run
+    qasms: List[str] = [
+        mcp.bernstein_vazirani.fn(s="".join(s))
+        for s in itertools.product("01", repeat=8)
+    ]
+    service = qiskit_service.QiskitService(mock=True, exact=False)
+    measure(
+        "BasicSimulator, one job per circuit",
+        len(qasms),
+        lambda: [service.run_qasm(qasm) for qasm in qasms],
+    )
+    measure(
+        "BasicSimulator, one job for all",
+        len(qasms),
+        lambda: service.run_qasm_batch(qasms),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Time for the MCP server's parameterized tools to generate QASM as n grows, building the circuit and from the server's
+byte-bounded LRU of generated QASM.
+
+    python -m src.bench.circuit_builders --sizes 1 10 100 1000 --repeat 5
+"""
+
+import argparse
+import time
+from typing import Callable
+
+from src.app.cmd import mcp
+
+
+def measure(
+    name: str,
+    build: Callable[[], str],
+    repeat: int,
+) -> None:
+    timings = []
+    for _ in range(repeat):
+        mcp.qasm_cache.clear()
+        start = time.perf_counter()
+        build()
+        timings.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    build()
+    hit = time.perf_counter() - start
+    print(
+        f"{name:>30}: build {min(timings) * 1000:8.2f} ms, cached {hit * 1e6:6.1f} us"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        measure(
+            f"quantum_teleportation({n})",
+            lambda: mcp.quantum_teleportation.fn(n=n),
+            args.repeat,
+        )
+    for n in args.sizes:
+        measure(
+            f"bernstein_vazirani({n} bits)",
+            lambda: mcp.bernstein_vazirani.fn(s="1" * n),
+            args.repeat,
+        )
+
+
+if __name__ == "__main__":
+    main()
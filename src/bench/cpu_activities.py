@@ -0,0 +1,51 @@
+"""
+Throughput of the CPU-bound activities (generate_diagram and simulate) on a thread pool against a pre-warmed process
+pool, for an increasing number of workers.
+
+    python -m src.bench.cpu_activities --circuits 64 --workers 1 2 4 8
+"""
+
+import argparse
+import itertools
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+
+from src.app.cmd import mcp, worker
+from src.app.temporal import activities, models
+
+
+def render(qasm: str) -> int:
+    diagram = activities.generate_diagram(models.GenerateDiagramInput(qasm=qasm))
+    plot = activities.simulate(models.SimulateInput(qasm=qasm, mock=True))
+    return len(diagram) + len(plot)
+
+
+def measure(name: str, executor: Executor, qasms: list[str]) -> None:
+    with executor:
+        start = time.perf_counter()
+        list(executor.map(render, qasms))
+        elapsed = time.perf_counter() - start
+    print(f"{name:>12}: {len(qasms) / elapsed:6.1f} circuits/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--circuits", type=int, default=64)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    # distinct secrets, so that no worker serves a circuit from its caches
+    secrets = ("".join(bits) for bits in itertools.product("01", repeat=8))
+    qasms = [mcp.bernstein_vazirani.fn(s=next(secrets)) for _ in range(args.circuits)]
+
+    for workers in args.workers:
+        measure(f"{workers} threads", ThreadPoolExecutor(workers), qasms)
+        measure(
+            f"{workers} processes",
+            worker.cpu_activity_executor("process", workers),
+            qasms,
+        )
+
+
+if __name__ == "__main__":
+    main()
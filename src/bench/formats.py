@@ -0,0 +1,53 @@
+"""
+Render time and payload size of each diagram and histogram output format.
+
+    python -m src.bench.formats --repeats 10
+"""
+
+import argparse
+import statistics
+import time
+from typing import Callable, get_args
+
+from src.app.cmd import mcp
+from src.app.services import qiskit_service
+from src.app.temporal import models
+
+
+def measure(name: str, render: Callable[[], str], repeats: int) -> None:
+    output = render()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        output = render()
+        timings.append(time.perf_counter() - start)
+    print(
+        f"{name:>16}: {statistics.median(timings) * 1000:7.1f} ms, {len(output.encode()):7d} bytes"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=10)
+    args = parser.parse_args()
+
+    service = qiskit_service.QiskitService(mock=True)
+    qc = qiskit_service.circuit(mcp.quantum_teleportation.fn(n=2))
+    counts = service.run(qc)
+
+    for diagram_format in get_args(models.DiagramFormat):
+        measure(
+            f"diagram {diagram_format}",
+            lambda: service.draw(qc, output_format=diagram_format),
+            args.repeats,
+        )
+    for plot_format in get_args(models.PlotFormat):
+        measure(
+            f"plot {plot_format}",
+            lambda: service.plot(counts, output_format=plot_format),
+            args.repeats,
+        )
+
+
+if __name__ == "__main__":
+    main()
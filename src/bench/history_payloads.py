@@ -0,0 +1,127 @@
+"""
+Bytes of payload one DAQWorkflow run writes to its history, and the time to encode and decode them, for circuits of
+growing size. The payloads are the workflow's input and output and each activity's input and result, with the default
+(uncached) tool list. They are compared as they were before images were bytes and before UseToolInput dropped the tool
+list, with Temporal's default data converter, against the current payloads with the site and worker's data converter,
+without and with large payloads claim-checked to the blob store.
+
+    python -m src.bench.history_payloads --sizes 1 10 100 --repeat 5
+"""
+
+import argparse
+import asyncio
+import base64
+import dataclasses
+import os
+import pathlib
+import tempfile
+import time
+from typing import Any, List, Tuple
+
+from temporalio import converter
+
+from src.app.cmd import mcp
+from src.app.services import (
+    blob_service,
+    codec_service,
+    qiskit_service,
+    verify_service,
+)
+from src.app.temporal import models
+
+
+def workflow_payloads(n: int) -> Tuple[List[Any], List[Any]]:
+    """
+    The payloads of a run, as they were and as they are now.
+    """
+    service = qiskit_service.QiskitService(mock=True)
+    prompt = f"teleport {n} qubits"
+    tools = [t.to_mcp_tool().model_dump() for t in verify_service.TOOLS.values()]
+    tool = {"name": "quantum_teleportation", "args": {"n": n}}
+    qasm = mcp.quantum_teleportation.fn(n=n)
+    qc = qiskit_service.circuit(qasm)
+    diagram = service.draw(qc)
+    plot = service.plot(service.run(qc))
+    output = models.DAQWorkflowOutput(
+        qasm=qasm,
+        circuit_diagram=base64.b64decode(diagram),
+        results_plot=base64.b64decode(plot),
+    )
+    common = [
+        models.DAQWorkflowInput(prompt=prompt, mock=True),
+        models.ListToolsInput(mock=True),
+        tools,
+        models.ChooseToolInput(prompt=prompt, available_tools=tools, mock=True),
+        tool,
+        qasm,
+        models.VerifyQASMInput(
+            prompt=prompt,
+            qasm=qasm,
+            mock=True,
+            tool_name=tool["name"],
+            tool_args=tool["args"],
+        ),
+        models.GenerateDiagramInput(qasm=qasm),
+        models.SimulateInput(qasm=qasm, mock=True),
+    ]
+    before = common + [
+        {"available_tools": tools, "mock": True, **tool},
+        diagram,
+        plot,
+        dataclasses.asdict(output) | {"circuit_diagram": diagram, "results_plot": plot},
+    ]
+    after = common + [
+        models.UseToolInput(mock=True, **tool),
+        output.circuit_diagram,
+        output.results_plot,
+        output,
+    ]
+    return before, after
+
+
+async def measure(
+    data_converter: converter.DataConverter, values: List[Any], repeat: int
+) -> Tuple[float, float]:
+    timings, size = [], 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        payloads = await data_converter.encode(values)
+        await data_converter.decode(payloads)
+        timings.append(time.perf_counter() - start)
+        size = sum(p.ByteSize() for p in payloads)
+    return size / 2**10, min(timings) * 1000
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="daq-blobs-")
+    os.environ["BLOB_STORE_PATH"] = root
+    converters = {
+        "before": converter.DataConverter.default,
+        "binary + zlib": codec_service.data_converter(claim_check_threshold=2**40),
+        "+ claim check": codec_service.data_converter(),
+    }
+    for n in args.sizes:
+        before, after = workflow_payloads(n)
+        print(f"quantum_teleportation({n}):")
+        for name, data_converter in converters.items():
+            size, elapsed = await measure(
+                data_converter, before if name == "before" else after, args.repeat
+            )
+            blobs = list(pathlib.Path(root).iterdir())
+            print(
+                f"{name:>15}: {size:8.1f} KiB in history, "
+                f"{sum(b.stat().st_size for b in blobs) / 2**10:8.1f} KiB in {len(blobs)} blobs, "
+                f"{elapsed:6.1f} ms to encode and decode"
+            )
+            for blob in blobs:
+                blob.unlink()
+    blob_service.default_blob_store.cache_clear()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
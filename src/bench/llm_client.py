@@ -0,0 +1,111 @@
+"""
+Per-call overhead of building a genai.Client (and re-reading .env) per LLM call against the shared client, using a
+local fake Gemini endpoint so that only client-side and connection setup costs are measured.
+
+    python -m src.bench.llm_client --calls 200
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import time
+from typing import Awaitable, Callable
+
+import uvicorn
+from dotenv import load_dotenv
+from google import genai
+from starlette import applications, requests, responses, routing
+
+from src.app.services import llm_service
+
+connections: set[tuple[str, int]] = set()
+
+
+async def generate_content(request: requests.Request) -> responses.Response:
+    if request.client:
+        connections.add((request.client.host, request.client.port))
+    return responses.JSONResponse(
+        {"candidates": [{"content": {"role": "model", "parts": [{"text": "true"}]}}]}
+    )
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def fresh_client_validate(prompt: str, qasm: str) -> None:
+    # the previous LLMService behaviour: .env read and a new client per call
+    load_dotenv()
+    with genai.Client(  # pyrefly: ignore[bad-context-manager]
+        api_key=os.environ["GOOGLE_API_KEY"]
+    ) as genai_client:
+        await genai_client.aio.models.generate_content(
+            model="gemini-3-flash-preview",
+            contents=genai.types.Part.from_text(text=f"{prompt}\n{qasm}"),
+            config=genai.types.GenerateContentConfig(
+                response_schema=genai.types.Schema(type=genai.types.Type.BOOLEAN),
+                temperature=0.2,
+            ),
+        )
+
+
+async def shared_client_validate(prompt: str, qasm: str) -> None:
+    await llm_service.LLMService(model_temperature=0.2).validate(qasm, prompt)
+
+
+async def measure(
+    name: str, call: Callable[[str, str], Awaitable[None]], calls: int
+) -> None:
+    connections.clear()
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        await call("Generate a bell state", "OPENQASM 2.0;")
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+
+    print(
+        f"{name:>7}: p50 {statistics.median(latencies) * 1000:6.2f} ms"
+        f"  p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:6.2f} ms"
+        f"  {len(connections)} TCP connections for {calls} calls"
+    )
+
+
+async def main(calls: int) -> None:
+    port = free_port()
+    os.environ["GOOGLE_API_KEY"] = "bench"
+    os.environ["GOOGLE_GEMINI_BASE_URL"] = f"http://127.0.0.1:{port}"
+
+    app = applications.Starlette(
+        routes=[
+            routing.Route(
+                "/{version}/models/{model}:generateContent",
+                generate_content,
+                methods=["POST"],
+            )
+        ]
+    )
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="error")
+    )
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    await measure("fresh", fresh_client_validate, calls)
+    await measure("shared", shared_client_validate, calls)
+
+    await llm_service.close_clients()
+    server.should_exit = True
+    await serving
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.calls))
@@ -0,0 +1,95 @@
+"""
+Per-call latency of a fresh FastMCP SSE session per call against the pooled session, using an in-process server.
+
+    python -m src.bench.mcp_client --calls 200 --concurrency 8
+"""
+
+import argparse
+import asyncio
+import socket
+import statistics
+import time
+from typing import Awaitable, Callable
+
+import httpx
+from fastmcp import Client as FastMCPClient
+
+from src.app.cmd import mcp
+from src.app.services import mcp_service
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_until_healthy(port: int) -> None:
+    async with httpx.AsyncClient() as http:
+        for _ in range(100):
+            try:
+                await http.get(f"http://127.0.0.1:{port}/health")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.05)
+    raise RuntimeError("MCP server did not start")
+
+
+async def measure(
+    name: str, call: Callable[[], Awaitable[object]], calls: int, concurrency: int
+) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed() -> float:
+        async with semaphore:
+            start = time.perf_counter()
+            await call()
+            return time.perf_counter() - start
+
+    start = time.perf_counter()
+    latencies = sorted(await asyncio.gather(*(timed() for _ in range(calls))))
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"{name:>8}: {calls / elapsed:8.1f} calls/s"
+        f"  p50 {statistics.median(latencies) * 1000:7.2f} ms"
+        f"  p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:7.2f} ms"
+    )
+
+
+async def main(calls: int, concurrency: int) -> None:
+    port = free_port()
+    server = asyncio.create_task(
+        mcp.mcp.run_http_async(
+            show_banner=False,
+            transport="sse",
+            host="127.0.0.1",
+            port=port,
+            log_level="error",
+        )
+    )
+    await wait_until_healthy(port)
+    server_addr = f"http://127.0.0.1:{port}/sse"
+
+    async def fresh() -> object:
+        async with FastMCPClient(server_addr) as fastmcp_client:
+            return await fastmcp_client.call_tool(mcp.bell_state.name, {})
+
+    async def pooled() -> object:
+        return await mcp_service.MCPService(server_addr).call_tool(
+            mcp.bell_state.name, {}
+        )
+
+    await measure("fresh", fresh, calls, concurrency)
+    await measure("pooled", pooled, calls, concurrency)
+
+    await mcp_service.close_pools()
+    server.cancel()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+    asyncio.run(main(args.calls, args.concurrency))
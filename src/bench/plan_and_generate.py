@@ -0,0 +1,120 @@
+"""
+DAQWorkflow runs against a Temporal server, with list_tools, choose_tool and use_tool as separate activities and as the
+one plan_and_generate activity. Reports the history events per run, the time from the workflow starting to its QASM
+being generated, and the time the generating activities spent waiting to be started, all read from the histories.
+
+    python -m src.bench.plan_and_generate --host localhost:7233 --runs 20
+"""
+
+import argparse
+import asyncio
+import statistics
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from temporalio.client import Client
+from temporalio.worker import Worker, workflow_sandbox
+
+from src.app.cmd import worker
+from src.app.services import mcp_service, temporal_service
+from src.app.temporal import activities, constants, models, workflow
+
+GENERATING_ACTIVITIES = {"list_tools", "choose_tool", "use_tool", "plan_and_generate"}
+
+
+async def run(
+    client: Client, task_queue: str, cached_tools: bool, plan_and_generate: bool
+) -> tuple[int, float, float]:
+    handle = await client.start_workflow(
+        workflow.DAQWorkflow.run,
+        args=[
+            models.DAQWorkflowInput(
+                prompt="bell state",
+                mock=True,
+                cached_tools=cached_tools,
+                want_diagram=False,
+                want_simulation=False,
+                plan_and_generate=plan_and_generate,
+            )
+        ],
+        id=f"bench-{uuid.uuid4()}",
+        task_queue=task_queue,
+    )
+    await handle.result()
+
+    events = [e async for e in handle.fetch_history_events()]
+    started = events[0].event_time.ToDatetime()
+    scheduled, generated, waiting = {}, started, 0.0
+    for event in events:
+        if event.HasField("activity_task_scheduled_event_attributes"):
+            attributes = event.activity_task_scheduled_event_attributes
+            if attributes.activity_type.name in GENERATING_ACTIVITIES:
+                scheduled[event.event_id] = event.event_time.ToDatetime()
+        elif event.HasField("activity_task_started_event_attributes"):
+            attributes = event.activity_task_started_event_attributes
+            if attributes.scheduled_event_id in scheduled:
+                waiting += (
+                    event.event_time.ToDatetime()
+                    - scheduled[attributes.scheduled_event_id]
+                ).total_seconds()
+        elif event.HasField("activity_task_completed_event_attributes"):
+            attributes = event.activity_task_completed_event_attributes
+            if attributes.scheduled_event_id in scheduled:
+                generated = event.event_time.ToDatetime()
+    return len(events), (generated - started).total_seconds(), waiting
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="localhost:7233")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    client = await temporal_service.TemporalService(host=args.host).connect()
+    task_queue = f"bench-{uuid.uuid4()}"
+    async with (
+        Worker(
+            client,
+            task_queue=task_queue,
+            workflows=[workflow.DAQWorkflow],
+            activities=[
+                activities.list_tools,
+                activities.choose_tool,
+                activities.use_tool,
+                activities.plan_and_generate,
+                activities.verify_qasm,
+            ],
+            max_heartbeat_throttle_interval=worker.HEARTBEAT_THROTTLE_INTERVAL,
+            workflow_runner=workflow_sandbox.SandboxedWorkflowRunner(
+                restrictions=workflow_sandbox.SandboxedWorkflowRunner.restrictions.with_passthrough_modules(
+                    "beartype"
+                )
+            ),
+        ),
+        worker.cpu_worker(
+            client,
+            task_queue + constants.CPU_TASK_QUEUE_SUFFIX,
+            ThreadPoolExecutor(),
+            max_concurrent_activities=4,
+        ),
+    ):
+        for cached_tools in (False, True):
+            for plan_and_generate in (False, True):
+                # one run first, so that neither option pays for warming the MCP client and caches
+                await run(client, task_queue, cached_tools, plan_and_generate)
+                results = [
+                    await run(client, task_queue, cached_tools, plan_and_generate)
+                    for _ in range(args.runs)
+                ]
+                events, generating, waiting = zip(*results)
+                print(
+                    f"cached_tools={cached_tools!s:>5}, plan_and_generate={plan_and_generate!s:>5}: "
+                    f"{statistics.mean(events):5.1f} history events, "
+                    f"QASM after {statistics.median(generating) * 1000:6.1f} ms, "
+                    f"{statistics.median(waiting) * 1000:5.1f} ms waiting to start"
+                )
+    await mcp_service.close_pools()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+"""
+Peak memory of receiving quantum_teleportation(n)'s QASM as n grows, through an MCP tool call against streaming it and
+spilling it to the blob store, measured with tracemalloc in this process against an MCP server in another process. Also
+reports the server's peak memory for generating the whole string against generating it in chunks.
+
+    python -m src.bench.qasm_stream --sizes 1000 10000 100000 --port 8765
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import urllib.request
+from typing import Any, Awaitable, Callable, Tuple
+
+from src.app.cmd import mcp
+from src.app.services import blob_service, mcp_service
+
+SERVER = """
+import sys, uvicorn
+from src.app.cmd import mcp
+uvicorn.run(mcp.mcp.http_app(transport="sse"), port=int(sys.argv[1]), log_level="error")
+"""
+
+
+def start_server(port: int) -> subprocess.Popen:
+    server = subprocess.Popen([sys.executable, "-c", SERVER, str(port)])
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/health")
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("MCP server did not start")
+
+
+async def traced(receive: Callable[[], Awaitable[Any]]) -> Tuple[float, float]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    await receive()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 2**20, elapsed
+
+
+def traced_generation(generate: Callable[[], Any]) -> float:
+    tracemalloc.start()
+    generate()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 2**20
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    os.environ["BLOB_STORE_PATH"] = tempfile.mkdtemp(prefix="daq-blobs-")
+    server = start_server(args.port)
+    service = mcp_service.MCPService(f"http://127.0.0.1:{args.port}/sse")
+    path = "/qasm/quantum_teleportation"
+    try:
+        for n in args.sizes:
+            size = len("\n".join(mcp.quantum_teleportation_statements(n))) / 2**20
+            whole = traced_generation(
+                lambda: "\n".join(mcp.quantum_teleportation_statements(n))
+            )
+            chunked = traced_generation(
+                lambda: all(mcp.qasm_chunks(mcp.quantum_teleportation_statements(n)))
+            )
+            called, called_time = await traced(
+                lambda: service.call_tool("quantum_teleportation", {"n": n})
+            )
+            streamed, streamed_time = await traced(
+                lambda: blob_service.spill(service.stream_tool(path, {"n": n}))
+            )
+            print(
+                f"n={n:>6} ({size:6.1f} MiB of QASM): server whole {whole:7.1f} MiB, chunked {chunked:5.1f} MiB | "
+                f"worker call_tool {called:7.1f} MiB in {called_time:5.2f} s, "
+                f"stream + spill {streamed:5.1f} MiB in {streamed_time:5.2f} s"
+            )
+    finally:
+        await mcp_service.close_pools()
+        server.terminate()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
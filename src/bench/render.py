@@ -0,0 +1,44 @@
+"""
+Throughput of QiskitService rendering (a circuit diagram and a histogram per circuit) serially and across threads.
+Every render is checked against the serial output.
+
+    python -m src.bench.render --renders 64 --threads 1 2 4 8
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.app.cmd import mcp
+from src.app.services import qiskit_service
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--renders", type=int, default=64)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--dpi", type=float, default=100)
+    args = parser.parse_args()
+
+    service = qiskit_service.QiskitService(mock=True, dpi=args.dpi)
+    qc = qiskit_service.circuit(mcp.quantum_teleportation.fn(n=2))
+    counts = service.run(qc)
+
+    def render(_: int) -> tuple[str, str]:
+        return service.draw(qc), service.plot(counts)
+
+    expected = render(0)
+    for threads in args.threads:
+        with ThreadPoolExecutor(threads) as executor:
+            render(0)
+            start = time.perf_counter()
+            rendered = list(executor.map(render, range(args.renders)))
+            elapsed = time.perf_counter() - start
+        corrupted = sum(r != expected for r in rendered)
+        print(
+            f"{threads:>2} threads: {args.renders / elapsed:6.1f} renders/s, {corrupted} corrupted"
+        )
+
+
+if __name__ == "__main__":
+    main()
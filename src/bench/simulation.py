@@ -0,0 +1,72 @@
+"""
+Time to simulate the MCP tools' circuits with the exact fast path against BasicSimulator's shots, as the circuits grow.
+Circuits wider than --max-shot-qubits are only simulated exactly, as BasicSimulator runs out of memory or time.
+
+    python -m src.bench.simulation --shots 1024 --teleport 1 2 4 8 16 32 --secret-lengths 4 8 16 20 32 64 128
+"""
+
+import argparse
+import time
+
+from src.app.cmd import mcp
+from src.app.services import qiskit_service
+
+
+def measure(name: str, qasm: str, shots: int, max_shot_qubits: int) -> None:
+    qc = qiskit_service.circuit(qasm)
+    timings = []
+    for exact in (True, False):
+        if not exact and qc.num_qubits > max_shot_qubits:
+            break
+        service = qiskit_service.QiskitService(mock=True, exact=exact)
+        start = time.perf_counter()
+        service.run(qc, shots=shots)
+        timings.append(time.perf_counter() - start)
+
+    shots_column = "shots         n/a"
+    if len(timings) > 1:
+        shots_column = (
+            f"shots {timings[1] * 1000:8.1f} ms, {timings[1] / timings[0]:6.1f}x"
+        )
+    print(
+        f"{name:>28}: {qc.num_qubits:3} qubits, {len(qiskit_service.subsystems(qc)):3} subsystems, "
+        f"exact {timings[0] * 1000:8.1f} ms, {shots_column}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shots", type=int, default=1024)
+    parser.add_argument("--teleport", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument(
+        "--secret-lengths", type=int, nargs="+", default=[4, 8, 16, 20, 32, 64, 128]
+    )
+    parser.add_argument("--max-shot-qubits", type=int, default=21)
+    args = parser.parse_args()
+
+    measure("bell_state", mcp.bell_state.fn(), args.shots, args.max_shot_qubits)
+    measure(
+        "three_qubit_bitflip_code",
+        mcp.three_qubit_bitflip_code.fn(),
+        args.shots,
+        args.max_shot_qubits,
+    )
+    for n in args.teleport:
+        measure(
+            f"quantum_teleportation({n})",
+            mcp.quantum_teleportation.fn(n=n),
+            args.shots,
+            args.max_shot_qubits,
+        )
+    for length in args.secret_lengths:
+        # an all-ones secret entangles every qubit with the ancilla, so the circuit does not split
+        measure(
+            f"bernstein_vazirani({length} bits)",
+            mcp.bernstein_vazirani.fn(s="1" * length),
+            args.shots,
+            args.max_shot_qubits,
+        )
+
+
+if __name__ == "__main__":
+    main()
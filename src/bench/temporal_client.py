@@ -0,0 +1,76 @@
+"""
+Load test comparing a fresh Temporal connection per site request against the shared client.
+
+    python -m src.bench.temporal_client --host localhost:7233 --requests 200 --concurrency 20
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Awaitable, Callable
+
+from temporalio import client
+from temporalio.service import RPCError
+
+from src.app.services import temporal_service
+
+
+async def poll(get_client: Callable[[], Awaitable[client.Client]]) -> float:
+    start = time.perf_counter()
+    handle = (await get_client()).get_workflow_handle(workflow_id="bench-missing")
+    try:
+        await handle.describe()
+    except RPCError:
+        # the workflow does not exist, but the full describe round-trip still happened
+        pass
+    return time.perf_counter() - start
+
+
+async def load(
+    name: str,
+    get_client: Callable[[], Awaitable[client.Client]],
+    requests: int,
+    concurrency: int,
+    connects: list[int],
+) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded() -> float:
+        async with semaphore:
+            return await poll(get_client)
+
+    connects[0] = 0
+    start = time.perf_counter()
+    latencies = sorted(await asyncio.gather(*(bounded() for _ in range(requests))))
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"{name:>10}: {connects[0] / elapsed:8.1f} connections/s"
+        f"  p50 {statistics.median(latencies) * 1000:7.2f} ms"
+        f"  p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:7.2f} ms"
+    )
+
+
+async def main(host: str, requests: int, concurrency: int) -> None:
+    service = temporal_service.TemporalService(host=host)
+    connects = [0]
+    connect = service.connect
+
+    async def counted_connect() -> client.Client:
+        connects[0] += 1
+        return await connect()
+
+    service.connect = counted_connect  # pyrefly: ignore[bad-assignment]
+
+    await load("per-poll", service.connect, requests, concurrency, connects)
+    await load("shared", service.shared_client, requests, concurrency, connects)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="localhost:7233")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.host, args.requests, args.concurrency))
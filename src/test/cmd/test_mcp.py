@@ -1,10 +1,12 @@
 import math
 from collections import Counter
 
+import pytest
 from fastmcp import Client
 from qiskit import QuantumCircuit, circuit
 from qiskit.circuit import CircuitInstruction
 from qiskit.circuit.library import XGate, UGate
+from starlette.testclient import TestClient
 
 from src.app.cmd import mcp
 from src.app.services import qiskit_service
@@ -200,3 +202,74 @@ async def test_quantum_teleportation_complex_state() -> None:
     assert gates["u"] == 2
     for result in sim_results.keys():
         assert result[2] == "0"
+
+
+async def test_parameterized_tools_are_memoized() -> None:
+    mcp.qasm_cache.clear()
+    mcp.qasm_cache.hits = mcp.qasm_cache.misses = 0
+
+    async with Client(mcp.mcp) as client:
+        first = await client.call_tool(
+            name=mcp.quantum_teleportation.name, arguments={"n": 2}
+        )
+        second = await client.call_tool(
+            name=mcp.quantum_teleportation.name, arguments={"n": 2}
+        )
+
+    assert first.data == second.data == mcp.quantum_teleportation.fn(2)
+    assert mcp.qasm_cache.misses == 1
+    assert mcp.qasm_cache.hits == 2
+
+
+def test_large_qasm_is_not_cached(monkeypatch) -> None:
+    monkeypatch.setattr(mcp, "QASM_CACHE_MAX_ITEM_BYTES", 1000)
+    mcp.qasm_cache.clear()
+
+    small, large = mcp.quantum_teleportation.fn(1), mcp.quantum_teleportation.fn(20)
+
+    assert len(small) <= 1000 < len(large)
+    assert len(mcp.qasm_cache) == 1
+    assert mcp.qasm_cache.weight == len(small)
+
+
+def test_stream_qasm() -> None:
+    client = TestClient(mcp.mcp.http_app(transport="sse"))
+
+    response = client.post("/qasm/quantum_teleportation", json={"n": 3})
+    assert response.status_code == 200
+    assert response.text == mcp.quantum_teleportation.fn(n=3)
+    assert "".join(
+        mcp.qasm_chunks(mcp.bernstein_vazirani_statements("1" * 10), size=4)
+    ) == (mcp.bernstein_vazirani.fn(s="1" * 10))
+
+    assert client.post("/qasm/bell_state", json={}).status_code == 404
+    assert (
+        client.post("/qasm/quantum_teleportation", json={"n": "x"}).status_code == 400
+    )
+
+
+@pytest.mark.parametrize(
+    "name,args",
+    [
+        ("quantum_teleportation", {"n": 0}),
+        ("quantum_teleportation", {"n": -1}),
+        ("bernstein_vazirani", {"s": ""}),
+        ("bernstein_vazirani", {"s": "01a1"}),
+        ("bernstein_vazirani", {"s": "0]; x q[0"}),
+    ],
+)
+async def test_parameterized_tools_reject_invalid_args(name: str, args: dict) -> None:
+    client = TestClient(mcp.mcp.http_app(transport="sse"))
+
+    assert client.post(f"/qasm/{name}", json=args).status_code == 400
+    async with Client(mcp.mcp) as mcp_client:
+        result = await mcp_client.call_tool(
+            name=name, arguments=args, raise_on_error=False
+        )
+    assert result.is_error
+
+
+def test_health_check() -> None:
+    response = TestClient(mcp.mcp.http_app(transport="sse")).get("/health")
+
+    assert response.status_code == 200
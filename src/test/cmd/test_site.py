@@ -1,11 +1,16 @@
 import asyncio
+import dataclasses
+import re
 from unittest.mock import AsyncMock
 
+import pytest
+from fasthtml.common import to_xml
 from pytest_mock import MockerFixture
 from starlette.testclient import TestClient
 
 from src.app.cmd import site
-from src.app.temporal import constants
+from src.app.services import cache_service
+from src.app.temporal import constants, models
 from src.test.conftest import TemporalClientFixture
 
 test_client = TestClient(site.app)
@@ -48,6 +53,103 @@ async def test_post_generate(
     assert constants.WORKFLOW_KEY in workflows[0].id
 
 
+async def test_post_generate_coalesces_identical_requests(
+    mocker: MockerFixture, temporal_client: TemporalClientFixture
+):
+    mock_connect = mocker.patch(
+        target="src.app.services.temporal_service.TemporalService.connect",
+        new_callable=AsyncMock,
+    )
+    mock_connect.return_value = temporal_client
+
+    job_ids = [
+        re.findall(f"{constants.WORKFLOW_KEY}-[0-9a-f]+", response.text)[0]
+        for response in [
+            test_client.post(url="/generate", data={"prompt": prompt})
+            for prompt in (
+                "Generate a Bell state",
+                " generate a  BELL state",
+                "Generate a Bell state!",
+                "GHZ",
+            )
+        ]
+    ]
+    # case and whitespace are folded, punctuation is not
+    assert job_ids[0] == job_ids[1]
+    assert len({job_ids[0], job_ids[2], job_ids[3]}) == 3
+
+    workflows = []
+    for _ in range(25):
+        workflows = [w async for w in temporal_client.list_workflows()]
+        if len(workflows) >= 3:
+            break
+        await asyncio.sleep(0.1)
+
+    assert sorted(w.id for w in workflows) == sorted(set(job_ids))
+
+
+def test_request_job_id_normalizes_prompt() -> None:
+    first = models.DAQWorkflowInput(prompt="Generate a Bell state", mock=False)
+    second = models.DAQWorkflowInput(prompt="generate a  bell state", mock=False)
+
+    assert site.request_job_id(first) == site.request_job_id(second)
+    assert site.request_job_id(first) != site.request_job_id(
+        dataclasses.replace(first, prompt="Generate a Bell state!")
+    )
+    assert site.request_job_id(first) != site.request_job_id(
+        dataclasses.replace(first, want_diagram=False)
+    )
+
+
+def test_request_job_id_keeps_letters_and_symbols() -> None:
+    prompts = ["生成贝尔态", "量子隐形传态", "?!", "¿?", "bell state", "bell state?"]
+
+    ids = {
+        site.request_job_id(models.DAQWorkflowInput(prompt=p, mock=False))
+        for p in prompts
+    }
+
+    assert len(ids) == len(prompts)
+    assert site.request_job_id(
+        models.DAQWorkflowInput(prompt="ＢＥＬＬ\u3000state", mock=False)
+    ) == site.request_job_id(models.DAQWorkflowInput(prompt="bell state", mock=False))
+
+
+def test_post_generate_returns_cached_result(mocker: MockerFixture) -> None:
+    mock_connect = mocker.patch(
+        target="src.app.services.temporal_service.TemporalService.connect",
+        new_callable=AsyncMock,
+    )
+    mocker.patch.object(site, "results", cache_service.LRUCache())
+    input = models.DAQWorkflowInput(
+        prompt="bell state",
+        mock=False,
+        cached_tools=True,
+        speculative_render=True,
+        want_diagram=False,
+        want_simulation=False,
+        plan_and_generate=True,
+    )
+    site.results.put(
+        site.request_job_id(input),
+        {"qasm": "OPENQASM 2.0;", "circuit_diagram": None, "results_plot": None},
+    )
+
+    response = test_client.post(url="/generate", data={"prompt": " Bell  state"})
+
+    assert "OPENQASM 2.0;" in response.text
+    mock_connect.assert_not_awaited()
+
+
+def test_post_generate_rejects_unknown_format() -> None:
+    response = test_client.post(
+        url="/generate", data={"prompt": "some user prompt", "diagram_format": "gif"}
+    )
+
+    assert response.status_code == 200
+    assert "Something went wrong" in response.text
+
+
 async def test_get_job(mocker: MockerFixture, temporal_client: TemporalClientFixture):
     mock_connect = mocker.patch(
         target="src.app.services.temporal_service.TemporalService.connect",
@@ -72,3 +174,71 @@ async def test_get_job(mocker: MockerFixture, temporal_client: TemporalClientFix
     response = test_client.get(url=f"/job/{job_id}")
 
     assert response.status_code == 200
+
+
+def test_get_job_events(mocker: MockerFixture):
+    mocker.patch.object(site, "jobs", cache_service.LRUCache())
+    mocker.patch.object(site, "results", cache_service.LRUCache())
+    mock_handle = mocker.MagicMock()
+    mock_handle.execute_update = AsyncMock(
+        side_effect=["list_tools", "simulate", "done"]
+    )
+    mock_handle.result = AsyncMock(
+        return_value={
+            "qasm": "OPENQASM 2.0;",
+            "circuit_diagram": None,
+            "results_plot": None,
+        }
+    )
+    mock_client = mocker.MagicMock()
+    mock_client.get_workflow_handle.return_value = mock_handle
+    mocker.patch(
+        target="src.app.services.temporal_service.TemporalService.connect",
+        new_callable=AsyncMock,
+        return_value=mock_client,
+    )
+
+    response = test_client.get(url="/job/some-job/events")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text.count("event: step") == 2
+    assert site.STATUS_MESSAGES["simulate"] in response.text
+    assert response.text.endswith("event: done\ndata: <div></div>\n\n")
+    # done is only sent once the output can be served
+    assert site.results.get("some-job")
+
+
+@pytest.mark.parametrize("fails", [False, True])
+async def test_get_job_polls_are_served_from_memory(mocker: MockerFixture, fails: bool):
+    mocker.patch.object(site, "jobs", cache_service.LRUCache())
+    mocker.patch.object(site, "results", cache_service.LRUCache())
+    mock_handle = mocker.MagicMock()
+    mock_handle.execute_update = AsyncMock(side_effect=["plan_and_generate", "done"])
+    mock_handle.result = AsyncMock(
+        side_effect=RuntimeError("workflow failed") if fails else None,
+        return_value={
+            "qasm": "OPENQASM 2.0;",
+            "circuit_diagram": None,
+            "results_plot": None,
+        },
+    )
+    mock_client = mocker.MagicMock()
+    mock_client.get_workflow_handle.return_value = mock_handle
+    mocker.patch(
+        target="src.app.services.temporal_service.TemporalService.connect",
+        new_callable=AsyncMock,
+        return_value=mock_client,
+    )
+
+    job = site.watch("some-job")
+    assert job.watcher
+    await job.watcher
+
+    for _ in range(3):
+        response = to_xml(await site.get_job("some-job"))
+        assert ("Something went wrong" in response) == fails
+        assert ("OPENQASM 2.0;" in response) != fails
+    assert job.steps == ["plan_and_generate", "done"]
+    mock_handle.result.assert_awaited_once()
+    mock_handle.describe.assert_not_called()
@@ -0,0 +1,27 @@
+import asyncio
+import logging
+
+import pytest
+from pytest_mock import MockerFixture
+
+from src.app.cmd import mcp, worker
+from src.app.services import cache_service, qiskit_service
+
+
+async def test_log_stats_logs_cache_stats(
+    mocker: MockerFixture, caplog: pytest.LogCaptureFixture
+) -> None:
+    mocker.patch.object(qiskit_service, "circuit_cache", cache_service.LRUCache())
+    qiskit_service.circuit(mcp.bell_state.fn())
+    qiskit_service.circuit(mcp.bell_state.fn())
+
+    with caplog.at_level(logging.INFO, logger=worker.__name__):
+        task = asyncio.create_task(worker.log_stats(interval=0))
+        await asyncio.sleep(0.01)
+        task.cancel()
+
+    assert caplog.records
+    assert worker.cache_stats()["circuits"]["hits"] == 1
+    assert "routes" in worker.cache_stats()
+    assert "decided_rate" in worker.cache_stats()["verifier"]
+    assert str(worker.cache_stats()["circuits"]) in caplog.records[0].getMessage()
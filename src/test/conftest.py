@@ -1,7 +1,13 @@
 import os
+import pathlib
+from typing import Iterator
+
+import pytest
 import pytest_asyncio
 from temporalio import client, testing
 
+from src.app.services import blob_service, codec_service, temporal_service
+
 
 def pytest_configure(config) -> None:
     os.environ["MPLBACKEND"] = "Agg"
@@ -10,7 +16,25 @@ def pytest_configure(config) -> None:
 type TemporalClientFixture = client.Client
 
 
+@pytest.fixture(autouse=True)
+def reset_shared_temporal_clients():
+    yield
+    temporal_service.TemporalService.forget_all()
+
+
+@pytest.fixture(autouse=True)
+def blob_store(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> Iterator[blob_service.BlobStore | blob_service.S3BlobStore]:
+    monkeypatch.setenv("BLOB_STORE_PATH", str(tmp_path / "blobs"))
+    blob_service.default_blob_store.cache_clear()
+    yield blob_service.default_blob_store()
+    blob_service.default_blob_store.cache_clear()
+
+
 @pytest_asyncio.fixture
 async def temporal_client():
-    async with await testing.WorkflowEnvironment.start_local() as env:
+    async with await testing.WorkflowEnvironment.start_local(
+        data_converter=codec_service.data_converter()
+    ) as env:
         yield env.client
@@ -0,0 +1,47 @@
+from unittest.mock import MagicMock
+
+from src.app.cmd import mcp
+from src.app.services import artifact_service, qiskit_service
+
+
+def test_fetch_creates_once() -> None:
+    store = artifact_service.ArtifactStore()
+    create = MagicMock(return_value="artifact")
+
+    assert store.fetch("key", create) == store.fetch("key", create) == "artifact"
+    create.assert_called_once()
+
+
+def test_keys_are_content_addressed() -> None:
+    service = qiskit_service.QiskitService()
+    qasm = mcp.bell_state.fn()
+    commented = "// a bell state\n" + qasm.replace(";\n", ";  \n\n")
+    key = artifact_service.diagram_key(qasm, "png", service)
+
+    assert key == artifact_service.diagram_key(commented, "png", service)
+    assert key != artifact_service.diagram_key(qasm, "svg", service)
+    assert key != artifact_service.plot_key(qasm, "png", service)
+    assert key != artifact_service.diagram_key(
+        qasm, "png", qiskit_service.QiskitService(dpi=200)
+    )
+    assert artifact_service.tool_key("bernstein_vazirani", {"s": "01"}, False) != (
+        artifact_service.tool_key("bernstein_vazirani", {"s": "10"}, False)
+    )
+
+
+def test_warm_stores_tools_without_args() -> None:
+    store = artifact_service.ArtifactStore()
+    service = qiskit_service.QiskitService(mock=True)
+
+    store.warm()
+
+    qasm = mcp.bell_state.fn()
+    assert store.get(artifact_service.tool_key("bell_state", {}, False)) == qasm
+    assert store.get(artifact_service.diagram_key(qasm, "png", service)) == (
+        service.draw(qiskit_service.circuit(qasm))
+    )
+    assert store.get(artifact_service.plot_key(qasm, "png", service)) == (
+        service.plot(service.run_qasm(qasm))
+    )
+    assert store.get(artifact_service.tool_key("bernstein_vazirani", {}, False)) is None
+    assert len(store.cache) == 4 * 3
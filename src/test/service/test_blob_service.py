@@ -0,0 +1,113 @@
+import io
+import os
+import pathlib
+from typing import Any, AsyncIterator, Dict
+
+import pytest
+
+from src.app.services import blob_service
+
+
+class LocalS3:
+    """
+    A stand-in for a boto3 S3 client, holding objects in memory.
+    """
+
+    class exceptions:
+        ClientError = KeyError
+
+    objects: Dict[str, bytes]
+
+    def __init__(self) -> None:
+        self.objects = {}
+
+    def put_object(self, Bucket: str, Key: str, Body: Any) -> None:
+        self.objects[f"{Bucket}/{Key}"] = (
+            Body if isinstance(Body, bytes) else Body.read()
+        )
+
+    def get_object(self, Bucket: str, Key: str, Range: str = "") -> dict:
+        data = self.objects[f"{Bucket}/{Key}"]
+        if Range:
+            data = data[: int(Range.split("-")[1]) + 1]
+        return {"Body": io.BytesIO(data)}
+
+    def head_object(self, Bucket: str, Key: str) -> dict:
+        return {"ContentLength": len(self.objects[f"{Bucket}/{Key}"])}
+
+    def copy_object(
+        self, Bucket: str, Key: str, CopySource: dict, MetadataDirective: str
+    ) -> None:
+        source = f"{CopySource['Bucket']}/{CopySource['Key']}"
+        self.objects[f"{Bucket}/{Key}"] = self.objects[source]
+
+
+async def chunks(*texts: str) -> AsyncIterator[str]:
+    for text in texts:
+        yield text
+
+
+def test_put_is_content_addressed(blob_store: blob_service.BlobStore) -> None:
+    ref = blob_store.put(b"qasm")
+
+    assert blob_service.is_ref(ref)
+    assert blob_store.put(b"qasm") == ref
+    assert blob_store.get(ref) == b"qasm"
+    assert len(list(pathlib.Path(blob_store.root).iterdir())) == 1
+    with pytest.raises(ValueError):
+        blob_store.path("blob:../../etc/passwd")
+
+
+async def test_s3_store_matches_file_store(blob_store: blob_service.BlobStore) -> None:
+    client = LocalS3()
+    store = blob_service.S3BlobStore(client, "bucket", "daq/")
+
+    ref = store.put(b"qasm")
+    streamed = await store.put_stream(
+        text.encode() async for text in chunks("OPENQASM", " 2.0;")
+    )
+
+    assert ref == blob_store.put(b"qasm")
+    assert streamed == blob_store.put(b"OPENQASM 2.0;")
+    assert store.get(ref) == b"qasm"
+    assert store.read(streamed, 4) == b"OPEN"
+    assert store.size(streamed) == 13
+    assert sorted(client.objects) == sorted(
+        f"bucket/daq/{blob_service.digest(r)}" for r in (ref, streamed)
+    )
+
+
+def test_sweep_deletes_blobs_past_retention(
+    blob_store: blob_service.BlobStore,
+) -> None:
+    old, touched, new = blob_store.put(b"old"), blob_store.put(b"touched"), b"new"
+    for ref in (old, touched):
+        os.utime(blob_store.path(ref), (0, 0))
+    assert blob_store.touch(touched)
+    new_ref = blob_store.put(new)
+
+    assert blob_store.sweep(max_age=60) == 1
+
+    assert not blob_store.touch(old)
+    assert blob_store.get(touched) == b"touched"
+    assert blob_store.get(new_ref) == new
+    # storing content again restarts its retention period
+    os.utime(blob_store.path(new_ref), (0, 0))
+    blob_store.put(new)
+    assert blob_store.sweep(max_age=60) == 0
+
+
+async def test_spill_keeps_short_text_inline() -> None:
+    assert await blob_service.spill(chunks("OPENQASM", " 2.0;"), threshold=16) == (
+        "OPENQASM 2.0;"
+    )
+
+
+async def test_spill_stores_long_text(blob_store: blob_service.BlobStore) -> None:
+    ref = await blob_service.spill(chunks("a" * 10, "b" * 10, "c" * 10), threshold=16)
+
+    assert blob_service.is_ref(ref)
+    assert blob_service.resolve(ref) == "a" * 10 + "b" * 10 + "c" * 10
+    assert ref == blob_store.put(("a" * 10 + "b" * 10 + "c" * 10).encode())
+    assert blob_service.preview(ref, 12) == "a" * 10 + "bb\n// ... 18 more bytes"
+    assert blob_service.preview("inline", 2) == "inline"
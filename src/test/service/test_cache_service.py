@@ -0,0 +1,89 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from pytest_mock import MockerFixture
+
+from src.app.services import cache_service
+
+
+def test_content_key_is_stable() -> None:
+    assert cache_service.content_key("a", {"x": 1, "y": 2}) == (
+        cache_service.content_key("a", {"y": 2, "x": 1})
+    )
+    assert cache_service.content_key("a", 1) != cache_service.content_key("a", 2)
+
+
+def test_lru_cache_evicts_least_recently_used() -> None:
+    cache = cache_service.LRUCache(maxsize=2)
+    cache.put("first", 1)
+    cache.put("second", 2)
+    cache.get("first")
+
+    cache.put("third", 3)
+
+    assert cache.get("first") == 1
+    assert cache.get("second") is None
+    assert cache.get("third") == 3
+    assert cache.stats() == {
+        "size": 2,
+        "weight": 0,
+        "hits": 3,
+        "misses": 1,
+        "evictions": 1,
+        "hit_rate": 0.75,
+    }
+
+
+def test_lru_cache_evicts_by_weight() -> None:
+    cache = cache_service.LRUCache(maxweight=10, weigh=len)
+    cache.put("first", "aaaa")
+    cache.put("second", "bbbb")
+
+    cache.put("third", "cccc")
+
+    assert cache.get("first") is None
+    assert cache.get("second") == "bbbb"
+    assert cache.stats()["weight"] == 8
+
+
+def test_lru_cache_expires_after_ttl(mocker: MockerFixture) -> None:
+    monotonic = mocker.patch("time.monotonic", return_value=100.0)
+    cache = cache_service.LRUCache(ttl=10, weigh=len)
+    cache.put("key", "value")
+
+    monotonic.return_value = 109.0
+    assert cache.get("key") == "value"
+
+    monotonic.return_value = 110.0
+    assert cache.get("key") is None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["weight"] == 0
+
+
+def test_sqlite_cache_shared_between_instances(tmp_path) -> None:
+    path = str(tmp_path / "cache.sqlite")
+    cache_service.SQLiteCache(path).put("key", {"value": [1, 2]})
+
+    cache = cache_service.SQLiteCache(path)
+
+    assert cache.get("key") == {"value": [1, 2]}
+    assert cache.get("missing") is None
+    assert cache.stats()["hit_rate"] == 0.5
+
+
+def test_sqlite_cache_evicts_oldest(tmp_path) -> None:
+    cache = cache_service.SQLiteCache(str(tmp_path / "cache.sqlite"), maxsize=2)
+    for key in ["first", "second", "third"]:
+        cache.put(key, key)
+
+    assert cache.get("first") is None
+    assert cache.get("third") == "third"
+    assert cache.stats()["size"] == 2
+
+
+def test_sqlite_cache_across_threads(tmp_path) -> None:
+    cache = cache_service.SQLiteCache(str(tmp_path / "cache.sqlite"))
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda i: cache.put(str(i), i), range(20)))
+
+    assert [cache.get(str(i)) for i in range(20)] == list(range(20))
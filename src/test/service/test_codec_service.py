@@ -0,0 +1,62 @@
+import pathlib
+
+from temporalio import converter
+
+from src.app.services import blob_service, codec_service
+from src.app.temporal import models
+
+
+async def test_large_payloads_are_claim_checked(
+    blob_store: blob_service.BlobStore,
+) -> None:
+    data_converter = codec_service.data_converter(claim_check_threshold=256)
+    qasm = "OPENQASM 2.0;\n" + "h q[0];\n" * 100
+    values = [
+        models.GenerateDiagramInput(qasm=qasm),
+        models.SimulateInput(qasm=qasm, mock=True),
+        models.SimulateInput(qasm=qasm, mock=True),
+        "bell_state",
+    ]
+
+    payloads = await data_converter.encode(values)
+
+    assert [p.metadata["encoding"] for p in payloads] == 3 * [
+        codec_service.CLAIM_CHECK_ENCODING
+    ] + [b"json/plain"]
+    assert all(p.ByteSize() < 256 for p in payloads)
+    # the two identical inputs are stored once
+    assert len(list(pathlib.Path(blob_store.root).iterdir())) == 2
+    assert (await data_converter.decode(payloads, [type(v) for v in values])) == values
+
+
+async def test_images_are_binary_and_payloads_compressed() -> None:
+    data_converter = codec_service.data_converter(claim_check_threshold=2**20)
+    codec = codec_service.CompressionCodec()
+    output = models.DAQWorkflowOutput(
+        qasm="OPENQASM 2.0;\n" + "h q[0];\n" * 200,
+        circuit_diagram=bytes(range(256)) * 4,
+        results_plot=None,
+    )
+
+    [payload] = await data_converter.encode([output])
+    [uncompressed] = await codec.decode([payload])
+
+    assert payload.metadata["encoding"] == codec_service.ZLIB_ENCODING
+    assert uncompressed.metadata["encoding"] == b"binary/dataclass-fields"
+    assert output.circuit_diagram and output.circuit_diagram in uncompressed.data
+    assert await data_converter.decode([payload], [models.DAQWorkflowOutput]) == [
+        output
+    ]
+    [result] = await data_converter.decode([payload])
+    assert result["circuit_diagram"] == output.circuit_diagram
+
+
+async def test_unchecked_payloads_decode() -> None:
+    output = models.DAQWorkflowOutput(
+        qasm="OPENQASM 2.0;", circuit_diagram=b"x" * 4096, results_plot=None
+    )
+    payloads = await converter.DataConverter.default.encode([output])
+
+    assert await codec_service.data_converter(claim_check_threshold=256).decode(
+        payloads, [models.DAQWorkflowOutput]
+    ) == [output]
@@ -1,5 +1,10 @@
+from unittest.mock import AsyncMock
+
 import pytest
-from src.app.services import llm_service
+from google import genai
+from pytest_mock import MockerFixture
+
+from src.app.services import cache_service, llm_service
 
 
 def test_init_api_key_missing(monkeypatch) -> None:
@@ -44,3 +49,184 @@ async def test_validate_mock(monkeypatch):
     is_valid = await llm_service.LLMService(mock=True).validate(output, prompt)
 
     assert is_valid
+
+
+async def test_shared_client_reused() -> None:
+    first = llm_service.shared_client("key")
+    second = llm_service.shared_client("key")
+
+    assert first is second
+    assert llm_service.shared_client("other key") is not first
+    await llm_service.close_clients()
+
+
+async def test_close_clients() -> None:
+    first = llm_service.shared_client("key")
+
+    await llm_service.close_clients()
+
+    assert llm_service.shared_client("key") is not first
+    await llm_service.close_clients()
+
+
+def test_routing_cache_exact_hit() -> None:
+    cache = llm_service.RoutingCache()
+    cache.put(
+        "Generate a bell state", genai.types.FunctionCall(name="bell_state", args={})
+    )
+
+    route = cache.get("  generate a BELL\tstate", tool_names={"bell_state"})
+
+    assert route
+    assert route.name == "bell_state"
+    assert cache.stats()["exact_hits"] == 1
+
+
+def test_routing_cache_similar_hit() -> None:
+    cache = llm_service.RoutingCache()
+    cache.put(
+        "Demonstrate quantum teleportation of a quantum state",
+        genai.types.FunctionCall(name="quantum_teleportation", args={"n": 1}),
+    )
+
+    route = cache.get(
+        "Can you demonstrate the quantum teleportation of a quantum state?",
+        tool_names={"quantum_teleportation"},
+    )
+
+    assert route
+    assert route.args == {"n": 1}
+    assert cache.stats()["similar_hits"] == 1
+
+
+def test_routing_cache_miss() -> None:
+    cache = llm_service.RoutingCache()
+    cache.put(
+        "Show me Deutsch's algorithm implementing a balanced oracle",
+        genai.types.FunctionCall(name="deutsch_balanced", args={}),
+    )
+    cache.put(
+        "Encode the string `01101` as a Bernstein-Vazirani oracle",
+        genai.types.FunctionCall(name="bernstein_vazirani", args={"s": "01101"}),
+    )
+    tool_names = {"deutsch_balanced", "bernstein_vazirani"}
+
+    # a different oracle, a different secret, and a tool the server no longer has
+    assert not cache.get(
+        "Show me Deutsch's algorithm implementing a constant oracle", tool_names
+    )
+    assert not cache.get(
+        "Encode the string `01100` as a Bernstein-Vazirani oracle", tool_names
+    )
+    assert not cache.get(
+        "Show me Deutsch's algorithm implementing a balanced oracle", set()
+    )
+    assert cache.stats()["misses"] == 3
+
+
+def test_routing_cache_keeps_non_ascii_prompts_apart() -> None:
+    cache = llm_service.RoutingCache()
+    cache.put("生成贝尔态", genai.types.FunctionCall(name="bell_state", args={}))
+
+    assert cache.get(" 生成贝尔态\n", {"bell_state"})
+    assert not cache.get("量子隐形传态", {"bell_state"})
+    assert not cache.get("¿?", {"bell_state"})
+    assert cache.stats()["exact_hits"] == 1
+
+
+def test_routing_cache_evict() -> None:
+    cache = llm_service.RoutingCache(maxsize=2)
+    call = genai.types.FunctionCall(name="bell_state", args={})
+    cache.put("Generate a bell state", call)
+
+    cache.evict("Please generate a bell state", call)
+    cache.put("Show me Deutsch's algorithm", call)
+    cache.put("Teleport a quantum state", call)
+
+    assert not cache.get("Generate a bell state", {"bell_state"})
+    assert cache.get("Show me Deutsch's algorithm", {"bell_state"})
+    assert cache.get("Teleport a quantum state", {"bell_state"})
+
+
+def test_routing_cache_evicts_least_recently_used() -> None:
+    cache = llm_service.RoutingCache(maxsize=2)
+    for name in ["first", "second"]:
+        cache.put(f"{name} prompt", genai.types.FunctionCall(name=name, args={}))
+    cache.get("first prompt", {"first"})
+
+    cache.put("third prompt", genai.types.FunctionCall(name="third", args={}))
+
+    assert cache.get("first prompt", {"first"})
+    assert cache.get("third prompt", {"third"})
+    assert not cache.get("second prompt", {"second"})
+    assert cache.stats()["size"] == 2
+
+
+async def test_choose_tool_uses_routing_cache(mocker: MockerFixture, monkeypatch):
+    monkeypatch.setenv("GOOGLE_API_KEY", "key")
+    cache = llm_service.RoutingCache()
+    cache.put(
+        "Generate a bell state", genai.types.FunctionCall(name="bell_state", args={})
+    )
+    mock_client = mocker.patch.object(llm_service, "shared_client")
+
+    function_calls = await llm_service.LLMService(routing_cache=cache).choose_tool(
+        "generate a bell state", [{"name": "bell_state"}]
+    )
+
+    assert function_calls
+    assert function_calls[0].name == "bell_state"
+    mock_client.assert_not_called()
+
+
+async def test_validate_uses_verdict_cache(mocker: MockerFixture, monkeypatch):
+    monkeypatch.setenv("GOOGLE_API_KEY", "key")
+    response = mocker.MagicMock(parsed=True, text="true")
+    mock_client = mocker.patch.object(llm_service, "shared_client")
+    mock_client.return_value.aio.models.generate_content = AsyncMock(
+        return_value=response
+    )
+    service = llm_service.LLMService(verdict_cache=cache_service.LRUCache())
+    qasm = 'OPENQASM 2.0;\ninclude "qelib1.inc";\nqreg q[2];\nh q[0];\n'
+
+    first = await service.validate(qasm, "Generate a bell state")
+    second = await service.validate(
+        f"// cached\n{qasm.replace(' ', '  ')}\n\n", "  generate a BELL state"
+    )
+
+    assert first == second == (True, "true")
+    mock_client.return_value.aio.models.generate_content.assert_awaited_once()
+
+
+async def test_validate_keys_verdicts_on_whole_prompt(
+    mocker: MockerFixture, monkeypatch
+):
+    monkeypatch.setenv("GOOGLE_API_KEY", "key")
+    response = mocker.MagicMock(parsed=True, text="true")
+    mock_client = mocker.patch.object(llm_service, "shared_client")
+    mock_client.return_value.aio.models.generate_content = AsyncMock(
+        return_value=response
+    )
+    service = llm_service.LLMService(verdict_cache=cache_service.LRUCache())
+    qasm = 'OPENQASM 2.0;\ninclude "qelib1.inc";\nqreg q[2];\nh q[0];\n'
+
+    for prompt in ["生成贝尔态", "量子隐形传态", "?!", "¿?"]:
+        await service.validate(qasm, prompt)
+
+    assert mock_client.return_value.aio.models.generate_content.await_count == 4
+
+
+async def test_validate_does_not_cache_rejections(mocker: MockerFixture, monkeypatch):
+    monkeypatch.setenv("GOOGLE_API_KEY", "key")
+    response = mocker.MagicMock(parsed=False, text="false")
+    mock_client = mocker.patch.object(llm_service, "shared_client")
+    mock_client.return_value.aio.models.generate_content = AsyncMock(
+        return_value=response
+    )
+    service = llm_service.LLMService(verdict_cache=cache_service.LRUCache())
+
+    await service.validate("qasm", "prompt")
+    is_valid, _ = await service.validate("qasm", "prompt")
+
+    assert not is_valid
+    assert mock_client.return_value.aio.models.generate_content.await_count == 2
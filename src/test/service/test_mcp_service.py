@@ -1,3 +1,12 @@
+import asyncio
+
+import httpx
+
+from fastmcp import Client
+from mcp import types as mcp_types
+from pytest_mock import MockerFixture
+
+from src.app.cmd import mcp
 from src.app.services import mcp_service
 
 
@@ -9,3 +18,141 @@ def test_init() -> None:
 
     assert service.server_addr == server_addr
     assert service.mock == mock
+
+
+async def test_client_pool_reuses_session() -> None:
+    pool = mcp_service.MCPClientPool(mcp.mcp)
+
+    async with pool.session() as first:
+        tools = await first.list_tools()
+    async with pool.session() as second:
+        result = await second.call_tool(name=mcp.bell_state.name, arguments={})
+
+    assert first is second
+    assert pool.is_connected()
+    assert {t.name for t in tools} >= {mcp.bell_state.name}
+    assert result.data == mcp.bell_state.fn()
+    await pool.close()
+
+
+async def test_client_pool_bounds_concurrency() -> None:
+    pool = mcp_service.MCPClientPool(mcp.mcp, max_concurrency=2)
+    active = 0
+    peak = 0
+
+    async def call(_) -> None:
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+
+    await asyncio.gather(*(pool.run(call) for _ in range(6)))
+
+    assert peak == 2
+    await pool.close()
+
+
+async def test_client_pool_closes_when_idle() -> None:
+    pool = mcp_service.MCPClientPool(mcp.mcp, idle_timeout=0.01)
+
+    async with pool.session():
+        pass
+    await asyncio.sleep(0.1)
+
+    assert not pool.is_connected()
+
+
+async def test_client_pool_reconnects_after_close() -> None:
+    pool = mcp_service.MCPClientPool(mcp.mcp)
+
+    first = await pool.run(lambda fastmcp_client: fastmcp_client.list_tools())
+    await pool.close()
+    second = await pool.run(lambda fastmcp_client: fastmcp_client.list_tools())
+
+    assert first == second
+    await pool.close()
+
+
+def test_client_pool_per_event_loop() -> None:
+    async def pool() -> mcp_service.MCPClientPool:
+        return mcp_service.client_pool("server_addr")
+
+    assert asyncio.run(pool()) is not asyncio.run(pool())
+
+
+async def test_tool_catalog_converts_every_tool() -> None:
+    catalog = mcp_service.ToolCatalog()
+    async with Client(mcp.mcp) as client:
+        catalog.update(await client.list_tools())
+
+    assert catalog.is_fresh()
+    assert [t["name"] for t in catalog.tool_dicts] == [t.name for t in catalog.tools]
+    assert [
+        d.name for t in catalog.genai_tools for d in t.function_declarations or []
+    ] == [t.name for t in catalog.tools]
+    assert catalog.genai_tools is catalog.genai_tools
+
+
+def test_tool_catalog_expires() -> None:
+    catalog = mcp_service.ToolCatalog(ttl=0)
+
+    catalog.update([mcp.bell_state.to_mcp_tool()])
+
+    assert not catalog.is_fresh()
+
+
+async def test_tool_catalog_invalidated_on_list_changed() -> None:
+    catalog = mcp_service.ToolCatalog()
+    catalog.update([mcp.bell_state.to_mcp_tool()])
+
+    await mcp_service.ToolListChangedHandler(catalog).on_tool_list_changed(
+        mcp_types.ToolListChangedNotification()
+    )
+
+    assert not catalog.is_fresh()
+    assert catalog.revision == 1
+
+
+def test_tool_catalog_revised_when_tools_change() -> None:
+    catalog = mcp_service.ToolCatalog()
+    catalog.update([mcp.bell_state.to_mcp_tool()])
+    catalog.update([mcp.bell_state.to_mcp_tool()])
+
+    assert catalog.revision == 0
+
+    catalog.update([mcp.bell_state.to_mcp_tool(), mcp.bernstein_vazirani.to_mcp_tool()])
+
+    assert catalog.revision == 1
+
+
+async def test_get_available_tools_uses_fresh_catalog(mocker: MockerFixture) -> None:
+    server_addr = "cached_server_addr"
+    mcp_service.tool_catalog(server_addr).update([mcp.bell_state.to_mcp_tool()])
+    mock_run = mocker.patch.object(mcp_service.MCPClientPool, "run")
+
+    tools = await mcp_service.MCPService(server_addr).get_available_tools()
+
+    assert [t.name for t in tools] == [mcp.bell_state.name]
+    mock_run.assert_not_called()
+
+
+async def test_stream_tool(mocker: MockerFixture) -> None:
+    mocker.patch.object(
+        mcp_service,
+        "stream_client",
+        lambda: httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=mcp.mcp.http_app(transport="sse"))
+        ),
+    )
+    catalog = mcp_service.ToolCatalog()
+    async with Client(mcp.mcp) as client:
+        catalog.update(await client.list_tools())
+
+    path = catalog.qasm_stream(mcp.quantum_teleportation.name)
+    assert path is not None
+    assert catalog.qasm_stream(mcp.bell_state.name) is None
+
+    service = mcp_service.MCPService("http://mcp-server:8080/sse")
+    chunks = [chunk async for chunk in service.stream_tool(path, {"n": 2})]
+    assert "".join(chunks) == mcp.quantum_teleportation.fn(n=2)
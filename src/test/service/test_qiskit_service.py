@@ -1,5 +1,14 @@
+import base64
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from pytest_mock import MockerFixture
 from qiskit import QuantumCircuit
+from qiskit.quantum_info import Statevector
 
+from src.app.cmd import mcp
 from src.app.services import qiskit_service
 
 
@@ -19,3 +28,171 @@ def test_run() -> None:
 
     assert "0" in result
     assert result["0"] == shots
+
+
+def test_canonical_qasm() -> None:
+    qasm = 'OPENQASM 2.0;\ninclude "qelib1.inc";\nqreg q[2];\nh q[0];\n'
+
+    assert qiskit_service.canonical_qasm(qasm) == qiskit_service.canonical_qasm(
+        f"// comment\n\n  {qasm.replace(' ', '   ')}  // trailing\n"
+    )
+    assert qiskit_service.canonical_qasm(qasm) != qiskit_service.canonical_qasm(
+        qasm.replace("h q[0]", "x q[0]")
+    )
+
+
+def test_circuit_is_cached() -> None:
+    qasm = 'OPENQASM 2.0;\ninclude "qelib1.inc";\nqreg q[1];\ncreg c[1];\nx q[0];\nmeasure q[0] -> c[0];\n'
+    qiskit_service.circuit_cache.clear()
+
+    qc = qiskit_service.circuit(qasm)
+
+    assert qiskit_service.circuit(qasm) is qc
+    assert qiskit_service.circuit_cache.stats()["hits"] >= 1
+    assert qiskit_service.circuit_cache.weight == qiskit_service.circuit_size(qc)
+
+
+def test_run_qasm_reuses_transpiled_circuit() -> None:
+    qasm = 'OPENQASM 2.0;\ninclude "qelib1.inc";\nqreg q[1];\ncreg c[1];\nx q[0];\nmeasure q[0] -> c[0];\n'
+    service = qiskit_service.QiskitService(mock=True, exact=False)
+    qiskit_service.transpiled_cache.clear()
+
+    first = service.run_qasm(qasm, shots=10)
+    second = service.run_qasm(qasm, shots=10)
+
+    assert first == second == service.run(qiskit_service.circuit(qasm), shots=10)
+    assert len(qiskit_service.transpiled_cache) == 1
+
+
+def test_run_qasm_batch_simulates_in_one_job(mocker: MockerFixture) -> None:
+    # the mid-circuit measurement has no exact distribution
+    qasms = [
+        'OPENQASM 2.0;\ninclude "qelib1.inc";\nqreg q[1];\ncreg c[1];\nx q[0];\nmeasure q[0] -> c[0];\n',
+        'OPENQASM 2.0;\ninclude "qelib1.inc";\nqreg q[1];\ncreg c[2];\nmeasure q[0] -> c[0];\nx q[0];\nmeasure q[0] -> c[1];\n',
+        'OPENQASM 2.0;\ninclude "qelib1.inc";\nqreg q[2];\ncreg c[2];\nx q[1];\nmeasure q -> c;\n',
+    ]
+    service = qiskit_service.QiskitService(mock=True, exact=False)
+    spy = mocker.spy(service.sim, "run")
+
+    assert service.run_qasm_batch(qasms, shots=10) == [
+        {"1": 10},
+        {"01": 10},
+        {"01": 10},
+    ]
+    assert spy.call_count == 1
+
+    service.exact = True
+    assert service.run_qasm_batch(qasms, shots=10) == [
+        {"1": 10},
+        {"01": 10},
+        {"01": 10},
+    ]
+    assert spy.call_count == 2
+
+
+def test_concurrent_renders_are_not_corrupted() -> None:
+    qasms = [
+        'OPENQASM 2.0;\ninclude "qelib1.inc";\nqreg q[2];\ncreg c[2];\nh q[0];\ncx q[0],q[1];\nmeasure q -> c;\n',
+        'OPENQASM 2.0;\ninclude "qelib1.inc";\nqreg q[3];\ncreg c[3];\nx q[2];\nh q;\nmeasure q -> c;\n',
+    ]
+    service = qiskit_service.QiskitService(mock=True, dpi=50)
+
+    def render(qasm: str) -> tuple[str, str]:
+        qc = qiskit_service.circuit(qasm)
+        return service.draw(qc), service.plot(service.run(qc, shots=64))
+
+    expected = [render(qasm) for qasm in qasms]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        rendered = list(executor.map(render, qasms * 8))
+
+    assert rendered == expected * 8
+    for diagram, plot in rendered:
+        for png in (diagram, plot):
+            assert base64.b64decode(png).startswith(b"\x89PNG\r\n\x1a\n")
+
+
+def test_output_formats() -> None:
+    service = qiskit_service.QiskitService(mock=True)
+    qc = qiskit_service.circuit(
+        'OPENQASM 2.0;\ninclude "qelib1.inc";\nqreg q[1];\ncreg c[1];\nh q[0];\nmeasure q[0] -> c[0];\n'
+    )
+    counts = service.run(qc, shots=16)
+
+    assert "q: ┤ H ├┤M├" in service.draw(qc, output_format="text")
+    assert service.draw(qc, output_format="svg").startswith("<?xml")
+    assert "<metadata>" not in service.plot(counts, output_format="svg")
+    assert json.loads(service.plot(counts, output_format="counts")) == counts
+    with pytest.raises(ValueError):
+        service.draw(qc, output_format="gif")
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        "x q[0];\nmeasure q -> c;\n",
+        "x q[0];\nh q[2];\nmeasure q[0] -> c[2];\nmeasure q[2] -> c[0];\n",
+        "h q[0];\ncx q[0],q[1];\nbarrier q;\nmeasure q[1] -> c[1];\n",
+        "h q[0];\nt q[0];\nh q[0];\nh q[1];\ncx q[1],q[2];\nmeasure q -> c;\n",
+    ],
+)
+def test_exact_run_matches_shot_simulator(body: str) -> None:
+    qc = qiskit_service.circuit(
+        f'OPENQASM 2.0;\ninclude "qelib1.inc";\nqreg q[3];\ncreg c[3];\n{body}'
+    )
+
+    exact = qiskit_service.QiskitService(mock=True).run(qc, shots=2048)
+    shots = qiskit_service.QiskitService(mock=True, exact=False).run(qc, shots=2048)
+
+    assert exact.keys() == shots.keys()
+    assert sum(exact.values()) == 2048
+    for key in exact:
+        assert abs(exact[key] - shots[key]) < 200
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        "h q[0];\nmeasure q[0] -> c[0];\nx q[0];\nmeasure q[0] -> c[1];\n",
+        "h q[0];\nmeasure q[0] -> c[0];\nif(c==1) x q[1];\nmeasure q[1] -> c[1];\n",
+        "h q[0];\nreset q[0];\nmeasure q -> c;\n",
+    ],
+)
+def test_distribution_falls_back_to_shot_simulator(body: str) -> None:
+    qc = qiskit_service.circuit(
+        f'OPENQASM 2.0;\ninclude "qelib1.inc";\nqreg q[2];\ncreg c[2];\n{body}'
+    )
+
+    assert qiskit_service.distribution(qc) is None
+
+
+def test_statevector_matches_qiskit() -> None:
+    qc = qiskit_service.circuit(
+        'OPENQASM 2.0;\ninclude "qelib1.inc";\nqreg q[4];\n'
+        "h q[0];\nrx(0.3) q[1];\nu(0.1,0.2,0.3) q[3];\ncx q[0],q[2];\nccx q[0],q[1],q[3];\n"
+        "cz q[2],q[3];\nswap q[1],q[2];\nt q[0];\ncu(0.4,0.5,0.6,0.7) q[3],q[0];\nx q[1];\n"
+    )
+
+    assert np.allclose(
+        qiskit_service.statevector(qc).ravel(), Statevector(qc).data, atol=1e-12
+    )
+
+
+def test_subsystems() -> None:
+    qc = qiskit_service.circuit(mcp.quantum_teleportation.fn(n=2))
+
+    assert qiskit_service.subsystems(qc) == [[0, 1, 2], [3, 4, 5]]
+
+
+def test_distribution_scales_past_dense_simulation() -> None:
+    service = qiskit_service.QiskitService(mock=True)
+
+    secret = "1101" * 10
+    bv = qiskit_service.circuit(mcp.bernstein_vazirani.fn(s=secret))
+    assert service.run(bv) == {secret: 1024}
+
+    # Bob always receives |0>, while Alice's bits are uniformly random
+    teleportation = qiskit_service.circuit(mcp.quantum_teleportation.fn(n=10))
+    counts = service.run(teleportation)
+    assert sum(counts.values()) == 1024
+    assert all(key[2::3] == "0" * 10 for key in counts)
+    assert len(counts) > 1000
@@ -1,3 +1,8 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+from pytest_mock import MockerFixture
+
 from src.app.services import temporal_service
 
 
@@ -10,3 +15,65 @@ def test_init() -> None:
     assert service.config["target_host"] == host
     assert service.config["namespace"] == namespace
     assert "tls" not in service.config
+
+
+async def test_client_is_shared(mocker: MockerFixture) -> None:
+    mock_connect = mocker.patch.object(
+        temporal_service.TemporalService, "connect", new_callable=AsyncMock
+    )
+    mock_connect.return_value = object()
+
+    first = await temporal_service.TemporalService().shared_client()
+    second = await temporal_service.TemporalService().shared_client()
+
+    assert first is second
+    assert mock_connect.await_count == 1
+
+
+async def test_concurrent_first_calls_connect_once(mocker: MockerFixture) -> None:
+    shared = object()
+
+    async def connect(_) -> object:
+        await asyncio.sleep(0.01)
+        return shared
+
+    mock_connect = mocker.patch.object(
+        temporal_service.TemporalService, "connect", autospec=True, side_effect=connect
+    )
+
+    clients = await asyncio.gather(
+        *(temporal_service.TemporalService().shared_client() for _ in range(3))
+    )
+
+    assert clients == [shared] * 3
+    assert mock_connect.await_count == 1
+
+
+async def test_client_reconnects_after_invalidate(mocker: MockerFixture) -> None:
+    mock_connect = mocker.patch.object(
+        temporal_service.TemporalService, "connect", new_callable=AsyncMock
+    )
+    mock_connect.side_effect = [object(), object()]
+    service = temporal_service.TemporalService()
+
+    first = await service.shared_client()
+    service.invalidate()
+    second = await service.shared_client()
+
+    assert first is not second
+    assert mock_connect.await_count == 2
+
+
+async def test_client_reconnects_when_unhealthy(mocker: MockerFixture) -> None:
+    unhealthy = mocker.MagicMock()
+    unhealthy.service_client.check_health = AsyncMock(return_value=False)
+    healthy = object()
+    mock_connect = mocker.patch.object(
+        temporal_service.TemporalService, "connect", new_callable=AsyncMock
+    )
+    mock_connect.side_effect = [unhealthy, healthy]
+    service = temporal_service.TemporalService(health_check_interval=0)
+
+    assert await service.shared_client() is unhealthy
+    assert await service.shared_client() is healthy
+    unhealthy.service_client.check_health.assert_awaited_once()
@@ -0,0 +1,125 @@
+import pytest
+
+from src.app.cmd import mcp
+from src.app.services import verify_service
+
+
+@pytest.mark.parametrize(
+    "prompt,tool_name,tool_args",
+    [
+        ("Generate a bell state", "bell_state", {}),
+        (
+            "Show me Deutsch's algorithm implementing a balanced oracle",
+            "deutsch_balanced",
+            {},
+        ),
+        (
+            "Use an error correction code to decode and interpret a bit-flip syndrome",
+            "three_qubit_bitflip_code",
+            {},
+        ),
+        (
+            "Demonstrate quantum teleportation of a quantum state",
+            "quantum_teleportation",
+            {},
+        ),
+        (
+            "Encode the little-endian string `01101` as a Bernstein–Vazirani oracle",
+            "bernstein_vazirani",
+            {"s": "01101"},
+        ),
+    ],
+)
+def test_check_accepts(prompt: str, tool_name: str, tool_args: dict) -> None:
+    qasm = verify_service.TOOLS[tool_name].fn(**tool_args)
+
+    verdict = verify_service.VerifyService().check(prompt, qasm, tool_name, tool_args)
+
+    assert verdict is not None and verdict[0]
+
+
+@pytest.mark.parametrize(
+    "prompt,tool_name,tool_args",
+    [
+        (
+            "Show me Deutsch's algorithm implementing a balanced oracle",
+            "deutsch_constant",
+            {},
+        ),
+        ("Teleport three quantum states", "quantum_teleportation", {"n": 2}),
+        (
+            "Encode the string `01101` as a Bernstein–Vazirani oracle",
+            "bernstein_vazirani",
+            {"s": "0111"},
+        ),
+    ],
+)
+def test_check_rejects(prompt: str, tool_name: str, tool_args: dict) -> None:
+    qasm = verify_service.TOOLS[tool_name].fn(**tool_args)
+
+    verdict = verify_service.VerifyService().check(prompt, qasm, tool_name, tool_args)
+
+    assert verdict is not None and not verdict[0]
+
+
+def test_check_rejects_unparsable_qasm() -> None:
+    verdict = verify_service.VerifyService().check(
+        "Generate a bell state", "not qasm", "bell_state", {}
+    )
+
+    assert verdict is not None and not verdict[0]
+
+
+@pytest.mark.parametrize(
+    "prompt,qasm,tool_name,tool_args",
+    [
+        ("Make something entangled", mcp.bell_state.fn(), "bell_state", {}),
+        ("Generate a bell state", mcp.deutsch_constant.fn(), "bell_state", {}),
+        (
+            "Encode `10110` as a Bernstein–Vazirani oracle",
+            mcp.bernstein_vazirani.fn(s="01101"),
+            "bernstein_vazirani",
+            {"s": "01101"},
+        ),
+        ("Generate a bell state", mcp.bell_state.fn(), "unknown_tool", {}),
+        (
+            "Teleport 2000 quantum states",
+            mcp.quantum_teleportation.fn(n=2000),
+            "quantum_teleportation",
+            {"n": 2000},
+        ),
+        # 10 counts the qubits rather than giving the secret
+        (
+            "Run Bernstein-Vazirani on 10 qubits with every bit set",
+            mcp.bernstein_vazirani.fn(s="1" * 10),
+            "bernstein_vazirani",
+            {"s": "1" * 10},
+        ),
+        (
+            "Run Bernstein-Vazirani with a secret string 11 bits long",
+            mcp.bernstein_vazirani.fn(s="1" * 11),
+            "bernstein_vazirani",
+            {"s": "1" * 11},
+        ),
+    ],
+)
+def test_check_is_inconclusive(
+    prompt: str, qasm: str, tool_name: str, tool_args: dict
+) -> None:
+    assert (
+        verify_service.VerifyService().check(prompt, qasm, tool_name, tool_args) is None
+    )
+
+
+def test_stats() -> None:
+    verify_service.VerifyService.decisions.clear()
+    service = verify_service.VerifyService()
+
+    service.check("Generate a bell state", mcp.bell_state.fn(), "bell_state", {})
+    service.check("Make something entangled", mcp.bell_state.fn(), "bell_state", {})
+
+    assert verify_service.VerifyService.stats() == {
+        "accepted": 1,
+        "inconclusive": 1,
+        "decided_rate": 0.5,
+    }
@@ -0,0 +1,162 @@
+import dataclasses
+
+import pytest
+from google.genai.types import FunctionCall
+from pytest_mock import MockerFixture
+from temporalio.testing import ActivityEnvironment
+
+from src.app.cmd import mcp
+from src.app.services import (
+    artifact_service,
+    blob_service,
+    llm_service,
+    mcp_service,
+    qiskit_service,
+)
+from src.app.temporal import activities, models
+
+
+async def test_plan_and_generate_resumes_after_last_heartbeat(
+    mocker: MockerFixture, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setenv("GOOGLE_API_KEY", "key")
+    env = ActivityEnvironment()
+    heartbeats = []
+    env.on_heartbeat = lambda *details: heartbeats.append(details[0])
+    input = models.PlanAndGenerateInput(prompt="test", mock=True)
+
+    output = await env.run(activities.plan_and_generate, input)
+
+    assert [h["step"] for h in heartbeats] == ["list_tools", "choose_tool", "use_tool"]
+    assert output.qasm == mcp.bell_state.fn()
+
+    choose_tool = mocker.patch.object(activities, "choose_tool")
+    env.info = dataclasses.replace(env.info, heartbeat_details=[heartbeats[-1]])
+
+    assert await env.run(activities.plan_and_generate, input) == output
+    choose_tool.assert_not_called()
+
+
+async def test_use_tool_refetches_once_the_tool_list_changes(
+    mocker: MockerFixture,
+) -> None:
+    mocker.patch.object(
+        artifact_service, "artifact_store", artifact_service.ArtifactStore()
+    )
+    catalog = mcp_service.ToolCatalog()
+    catalog.update([mcp.bell_state.to_mcp_tool()])
+    mocker.patch.object(
+        mcp_service.MCPService, "get_tool_catalog", return_value=catalog
+    )
+    call_tool = mocker.patch.object(
+        mcp_service.MCPService,
+        "call_tool",
+        side_effect=[
+            mocker.Mock(is_error=False, data="OPENQASM 2.0;"),
+            mocker.Mock(is_error=False, data="OPENQASM 3.0;"),
+        ],
+    )
+    env = ActivityEnvironment()
+    input = models.UseToolInput(name=mcp.bell_state.name, args={}, mock=False)
+
+    assert await env.run(activities.use_tool, input) == "OPENQASM 2.0;"
+    assert await env.run(activities.use_tool, input) == "OPENQASM 2.0;"
+    catalog.invalidate()
+    assert await env.run(activities.use_tool, input) == "OPENQASM 3.0;"
+    assert call_tool.await_count == 2
+
+
+async def test_verify_qasm_caches_route_once_accepted(mocker: MockerFixture) -> None:
+    cache = mocker.patch.object(
+        llm_service, "routing_cache", llm_service.RoutingCache()
+    )
+    env = ActivityEnvironment()
+    prompt = "Show me Deutsch's algorithm implementing a balanced oracle"
+    cache.put(prompt, FunctionCall(name="deutsch_constant", args={}))
+
+    with pytest.raises(RuntimeError):
+        await env.run(
+            activities.verify_qasm,
+            models.VerifyQASMInput(
+                prompt=prompt,
+                qasm=mcp.deutsch_constant.fn(),
+                mock=False,
+                tool_name="deutsch_constant",
+            ),
+        )
+
+    assert not cache.get(prompt, {"deutsch_constant", "deutsch_balanced"})
+
+    await env.run(
+        activities.verify_qasm,
+        models.VerifyQASMInput(
+            prompt=prompt,
+            qasm=mcp.deutsch_balanced.fn(),
+            mock=False,
+            tool_name="deutsch_balanced",
+        ),
+    )
+
+    route = cache.get(prompt, {"deutsch_constant", "deutsch_balanced"})
+    assert route and route.name == "deutsch_balanced"
+
+
+async def test_verify_qasm_accepts_mock_output_for_any_prompt() -> None:
+    # the mock tool is always bell_state, whatever the prompt asks for
+    await ActivityEnvironment().run(
+        activities.verify_qasm,
+        models.VerifyQASMInput(
+            prompt="Demonstrate quantum teleportation of a quantum state",
+            qasm=mcp.bell_state.fn(),
+            mock=True,
+            tool_name="bell_state",
+            tool_args={},
+        ),
+    )
+
+
+def test_simulate_batch_fails_only_the_item_that_cannot_be_simulated(
+    mocker: MockerFixture,
+) -> None:
+    run_qasm_batch = qiskit_service.QiskitService.run_qasm_batch
+
+    def reject_marked(self, qasms, shots=1024):
+        if any("// unsupported" in qasm for qasm in qasms):
+            raise RuntimeError("simulator rejected the circuit")
+        return run_qasm_batch(self, qasms, shots)
+
+    mocker.patch.object(qiskit_service.QiskitService, "run_qasm_batch", reject_marked)
+    rejected = f"{mcp.bell_state.fn()}// unsupported\n"
+    items = [
+        models.BatchItem(qasm=mcp.bell_state.fn()),
+        models.BatchItem(qasm=rejected),
+        models.BatchItem(tool_name="bernstein_vazirani", tool_args={"s": "01"}),
+    ]
+
+    results = ActivityEnvironment().run(
+        activities.simulate_batch, models.SimulateBatchInput(items=items, mock=True)
+    )
+
+    assert results[0].counts.keys() == {"00", "11"} and not results[0].error
+    assert not results[1].counts and "simulator rejected" in results[1].error
+    assert results[2].counts == {"01": 1024}
+
+
+def test_simulate_batch_reports_an_unknown_tool_apart_from_a_failing_one(
+    mocker: MockerFixture,
+) -> None:
+    mocker.patch.object(
+        blob_service, "resolve", side_effect=KeyError("blob ref has no key")
+    )
+    items = [
+        models.BatchItem(tool_name="no_such_tool"),
+        models.BatchItem(qasm="blob:missing"),
+    ]
+
+    results = ActivityEnvironment().run(
+        activities.simulate_batch, models.SimulateBatchInput(items=items, mock=True)
+    )
+
+    assert results[0].error == "Unknown tool: no_such_tool"
+    assert "Unknown tool" not in results[1].error
+    assert "blob ref has no key" in results[1].error
@@ -1,16 +1,65 @@
+import contextlib
+import pathlib
 import uuid
 from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator
 from unittest.mock import AsyncMock
 
+import pytest
 from pytest_mock import MockerFixture
-from temporalio.worker import Worker, workflow_sandbox
+from temporalio.client import WorkflowFailureError, WorkflowHistory
+from temporalio.worker import Replayer, Worker, workflow_sandbox
 
-from src.app.temporal import workflow, activities, models
+from src.app.cmd import mcp, worker
+from src.app.services import codec_service
+from src.app.temporal import workflow, activities, constants, models
 from src.test.conftest import TemporalClientFixture
 
 
+HISTORIES = pathlib.Path(__file__).parent / "histories"
+
+
+@contextlib.asynccontextmanager
+async def daq_worker(
+    temporal_client: TemporalClientFixture, task_queue_name: str
+) -> AsyncIterator[None]:
+    async with (
+        Worker(
+            temporal_client,
+            task_queue=task_queue_name,
+            workflows=[workflow.DAQWorkflow, workflow.DAQBatchWorkflow],
+            activities=[
+                activities.list_tools,
+                activities.choose_tool,
+                activities.use_tool,
+                activities.plan_and_generate,
+                activities.verify_qasm,
+            ],
+            max_heartbeat_throttle_interval=worker.HEARTBEAT_THROTTLE_INTERVAL,
+            workflow_runner=workflow_sandbox.SandboxedWorkflowRunner(
+                restrictions=workflow_sandbox.SandboxedWorkflowRunner.restrictions.with_passthrough_modules(
+                    "beartype"
+                )
+            ),
+        ),
+        worker.cpu_worker(
+            temporal_client,
+            task_queue_name + constants.CPU_TASK_QUEUE_SUFFIX,
+            ThreadPoolExecutor(),
+            max_concurrent_activities=4,
+        ),
+    ):
+        yield
+
+
+@pytest.mark.parametrize(
+    "cached_tools,speculative_render", [(False, False), (True, False), (True, True)]
+)
 async def test_workflow_success(
-    mocker: MockerFixture, temporal_client: TemporalClientFixture
+    mocker: MockerFixture,
+    temporal_client: TemporalClientFixture,
+    cached_tools: bool,
+    speculative_render: bool,
 ):
     mock_connect = mocker.patch(
         target="src.app.services.temporal_service.TemporalService.connect",
@@ -19,32 +68,269 @@ async def test_workflow_success(
     mock_connect.return_value = temporal_client
 
     task_queue_name = str(uuid.uuid4())
-    async with Worker(
-        temporal_client,
-        task_queue=task_queue_name,
-        workflows=[workflow.DAQWorkflow],
-        activities=[
-            activities.list_tools,
-            activities.choose_tool,
-            activities.use_tool,
-            activities.verify_qasm,
-            activities.generate_diagram,
-            activities.simulate,
-        ],
-        activity_executor=ThreadPoolExecutor(),
-        workflow_runner=workflow_sandbox.SandboxedWorkflowRunner(
-            restrictions=workflow_sandbox.SandboxedWorkflowRunner.restrictions.with_passthrough_modules(
-                "beartype"
-            )
-        ),
-    ):
+    async with daq_worker(temporal_client, task_queue_name):
         result = await temporal_client.execute_workflow(
             workflow.DAQWorkflow.run,
-            args=[models.DAQWorkflowInput(prompt="test", mock=True)],
+            args=[
+                models.DAQWorkflowInput(
+                    prompt="test",
+                    mock=True,
+                    cached_tools=cached_tools,
+                    speculative_render=speculative_render,
+                )
+            ],
             id=str(uuid.uuid4()),
             task_queue=task_queue_name,
         )
         assert result
         assert len(result.qasm) == 123
-        assert len(result.circuit_diagram) == 10248
-        assert len(result.results_plot) == 13168
+        assert result.circuit_diagram and len(result.circuit_diagram) == 8909
+        assert result.circuit_diagram.startswith(b"\x89PNG")
+        assert result.results_plot and len(result.results_plot) == 11105
+
+
+@pytest.mark.parametrize(
+    "prompt",
+    [
+        "Demonstrate quantum teleportation of a quantum state",
+        "Show me Deutsch's algorithm implementing a balanced oracle",
+    ],
+)
+async def test_workflow_mock_accepts_any_prompt(
+    temporal_client: TemporalClientFixture, prompt: str
+):
+    task_queue_name = str(uuid.uuid4())
+    async with daq_worker(temporal_client, task_queue_name):
+        result = await temporal_client.execute_workflow(
+            workflow.DAQWorkflow.run,
+            args=[
+                models.DAQWorkflowInput(
+                    prompt=prompt, mock=True, want_diagram=False, want_simulation=False
+                )
+            ],
+            id=str(uuid.uuid4()),
+            task_queue=task_queue_name,
+        )
+
+        assert result.qasm == mcp.bell_state.fn()
+
+
+@pytest.mark.parametrize(
+    "want_diagram,want_simulation", [(True, False), (False, False)]
+)
+async def test_workflow_skips_unwanted_stages(
+    temporal_client: TemporalClientFixture, want_diagram: bool, want_simulation: bool
+):
+    task_queue_name = str(uuid.uuid4())
+    async with daq_worker(temporal_client, task_queue_name):
+        handle = await temporal_client.start_workflow(
+            workflow.DAQWorkflow.run,
+            args=[
+                models.DAQWorkflowInput(
+                    prompt="test",
+                    mock=True,
+                    want_diagram=want_diagram,
+                    want_simulation=want_simulation,
+                )
+            ],
+            id=str(uuid.uuid4()),
+            task_queue=task_queue_name,
+        )
+        result = await handle.result()
+
+        assert (result.circuit_diagram is not None) == want_diagram
+        assert (result.results_plot is not None) == want_simulation
+        activity_types = {
+            event.activity_task_scheduled_event_attributes.activity_type.name
+            async for event in handle.fetch_history_events()
+            if event.HasField("activity_task_scheduled_event_attributes")
+        }
+        assert ("generate_diagram" in activity_types) == want_diagram
+        assert "simulate" not in activity_types
+
+
+@pytest.mark.parametrize("cached_tools", [False, True])
+async def test_workflow_plan_and_generate(
+    temporal_client: TemporalClientFixture, cached_tools: bool
+):
+    task_queue_name = str(uuid.uuid4())
+    async with daq_worker(temporal_client, task_queue_name):
+        lengths = []
+        for plan_and_generate in (False, True):
+            handle = await temporal_client.start_workflow(
+                workflow.DAQWorkflow.run,
+                args=[
+                    models.DAQWorkflowInput(
+                        prompt="test",
+                        mock=True,
+                        cached_tools=cached_tools,
+                        plan_and_generate=plan_and_generate,
+                    )
+                ],
+                id=str(uuid.uuid4()),
+                task_queue=task_queue_name,
+            )
+            result = await handle.result()
+            assert len(result.qasm) == 123
+            lengths.append(len([e async for e in handle.fetch_history_events()]))
+
+        # six events for each activity left out
+        assert lengths[0] - lengths[1] == (6 if cached_tools else 12)
+
+
+async def test_workflow_plan_and_generate_resumes_after_failed_tool(
+    temporal_client: TemporalClientFixture, mocker: MockerFixture
+):
+    task_queue_name = str(uuid.uuid4())
+    async with daq_worker(temporal_client, task_queue_name):
+        choose_tool = mocker.patch.object(
+            activities, "choose_tool", wraps=activities.choose_tool
+        )
+        use_tool = mocker.patch.object(
+            activities,
+            "use_tool",
+            side_effect=[RuntimeError("tool failed"), mcp.bell_state.fn()],
+        )
+
+        result = await temporal_client.execute_workflow(
+            workflow.DAQWorkflow.run,
+            args=[
+                models.DAQWorkflowInput(
+                    prompt="test", mock=True, plan_and_generate=True
+                )
+            ],
+            id=str(uuid.uuid4()),
+            task_queue=task_queue_name,
+        )
+
+        assert result.qasm == mcp.bell_state.fn()
+        assert use_tool.await_count == 2
+        # the retry picked up the tool call from the heartbeat of the attempt that failed
+        choose_tool.assert_awaited_once()
+
+
+@pytest.mark.parametrize("step", ["done", "simulate"])
+async def test_wait_for_step_returns_once_done(mocker: MockerFixture, step: str):
+    wait_condition = mocker.patch.object(
+        workflow.workflow, "wait_condition", new_callable=AsyncMock
+    )
+    daq_workflow = workflow.DAQWorkflow()
+    daq_workflow.step = "done"
+
+    assert await workflow.DAQWorkflow.wait_for_step(daq_workflow, step) == "done"
+    (condition,), _ = wait_condition.call_args
+    assert condition()
+
+
+async def test_workflow_pushes_step_changes(temporal_client: TemporalClientFixture):
+    task_queue_name = str(uuid.uuid4())
+    async with daq_worker(temporal_client, task_queue_name):
+        handle = await temporal_client.start_workflow(
+            workflow.DAQWorkflow.run,
+            args=[models.DAQWorkflowInput(prompt="test", mock=True)],
+            id=str(uuid.uuid4()),
+            task_queue=task_queue_name,
+        )
+
+        steps = [""]
+        while steps[-1] != "done":
+            steps.append(
+                await handle.execute_update("wait_for_step", steps[-1], result_type=str)
+            )
+
+        assert await handle.result()
+        assert await handle.query(workflow.DAQWorkflow.progress) == "done"
+        assert len(set(steps)) == len(steps)
+
+
+async def test_workflow_discards_speculative_render_when_verification_fails(
+    mocker: MockerFixture, temporal_client: TemporalClientFixture
+):
+    mocker.patch(
+        target="src.app.services.verify_service.VerifyService.check",
+        return_value=(False, "wrong circuit"),
+    )
+
+    task_queue_name = str(uuid.uuid4())
+    async with daq_worker(temporal_client, task_queue_name):
+        with pytest.raises(WorkflowFailureError):
+            await temporal_client.execute_workflow(
+                workflow.DAQWorkflow.run,
+                args=[
+                    models.DAQWorkflowInput(
+                        prompt="test", mock=True, speculative_render=True
+                    )
+                ],
+                id=str(uuid.uuid4()),
+                task_queue=task_queue_name,
+            )
+
+
+async def test_batch_workflow(temporal_client: TemporalClientFixture):
+    secrets = ["0101", "1100", "1111"]
+    items = [
+        *(
+            models.BatchItem(tool_name="bernstein_vazirani", tool_args={"s": s})
+            for s in secrets
+        ),
+        models.BatchItem(qasm=mcp.bell_state.fn()),
+        models.BatchItem(tool_name="unknown_tool"),
+        models.BatchItem(qasm="not qasm"),
+    ]
+
+    task_queue_name = str(uuid.uuid4())
+    async with daq_worker(temporal_client, task_queue_name):
+        handle = await temporal_client.start_workflow(
+            workflow.DAQBatchWorkflow.run,
+            args=[models.DAQBatchWorkflowInput(items=items, mock=True, chunk_size=2)],
+            id=str(uuid.uuid4()),
+            task_queue=task_queue_name,
+        )
+        result = await handle.result()
+
+        assert [r.counts for r in result.results[:3]] == [{s: 1024} for s in secrets]
+        assert result.results[3].counts.keys() == {"00", "11"}
+        assert "Unknown tool" in result.results[4].error
+        assert not result.results[5].counts and result.results[5].error
+        assert result.circuits_per_second > 0
+        assert await handle.query(workflow.DAQBatchWorkflow.progress) == "6/6"
+
+
+async def test_batch_workflow_rejects_empty_chunks(
+    temporal_client: TemporalClientFixture,
+):
+    task_queue_name = str(uuid.uuid4())
+    async with daq_worker(temporal_client, task_queue_name):
+        with pytest.raises(WorkflowFailureError):
+            await temporal_client.execute_workflow(
+                workflow.DAQBatchWorkflow.run,
+                args=[
+                    models.DAQBatchWorkflowInput(
+                        items=[models.BatchItem(qasm=mcp.bell_state.fn())],
+                        mock=True,
+                        chunk_size=0,
+                    )
+                ],
+                id=str(uuid.uuid4()),
+                task_queue=task_queue_name,
+            )
+
+
+# a run recorded before the concurrent-render and cpu-task-queue patches, and one taking both patched branches
+@pytest.mark.parametrize(
+    "history", ["daq_workflow_before_patches.json", "daq_workflow_patched.json"]
+)
+async def test_workflow_replays_recorded_history(history: str):
+    replayer = Replayer(
+        workflows=[workflow.DAQWorkflow, workflow.DAQBatchWorkflow],
+        data_converter=codec_service.data_converter(),
+        workflow_runner=workflow_sandbox.SandboxedWorkflowRunner(
+            restrictions=workflow_sandbox.SandboxedWorkflowRunner.restrictions.with_passthrough_modules(
+                "beartype"
+            )
+        ),
+    )
+
+    await replayer.replay_workflow(
+        WorkflowHistory.from_json(history, (HISTORIES / history).read_text())
+    )